@@ -0,0 +1,155 @@
+import itertools
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+# (key, yearly series)
+KeyedSeries = tuple[Any, NDArray[Any]]
+
+
+class TrendAccumulator:
+    """
+    Yearly series per key, summed from fetched columns.
+
+    Rows can be added in several chunks. Every chunk is integer coded with
+    ``numpy.unique`` and summed into one key × year matrix with a single
+    ``bincount`` (or ``add.at`` for whole series), instead of one Python
+    ``+=`` per row.
+    """
+
+    def __init__(self, start_year: int, year_count: int) -> None:
+        self.start_year = start_year
+        self.year_count = year_count
+        self.labels: list[Any] = []
+        self.matrix = numpy.zeros((0, year_count), dtype=numpy.int64)
+        self._lookup: dict[Any, int] = {}
+
+    def add(
+        self,
+        keys: Sequence[Any],
+        years: Sequence[Any],
+        counts: Sequence[Any],
+    ) -> None:
+        """
+        Add ``count`` to the ``year`` of ``key`` for every row.
+
+        Years outside of the series are ignored.
+
+        :param keys: key column.
+        :param years: year column, numbers or numeric strings.
+        :param counts: count column.
+        """
+        if not len(keys):
+            return
+        offsets = numpy.asarray(years).astype(numpy.int64) - self.start_year
+        in_range = (offsets >= 0) & (offsets < self.year_count)  # noqa: WPS465
+        codes = self._encode(keys)[in_range]
+        flat = codes * self.year_count + offsets[in_range]
+        self.matrix += (
+            numpy.bincount(
+                flat,
+                weights=numpy.asarray(counts, dtype=numpy.float64)[in_range],
+                minlength=self.matrix.size,
+            )
+            .astype(numpy.int64)
+            .reshape(self.matrix.shape)
+        )
+
+    def add_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        """
+        Add ``(key, year, count)`` rows.
+
+        :param rows: fetched rows.
+        """
+        if rows:
+            self.add(*zip(*rows))
+
+    def add_series(self, keys: Sequence[Any], series: Sequence[Sequence[int]]) -> None:
+        """
+        Add whole yearly series, starting at ``start_year``.
+
+        Series are zero padded or cut to the length of the accumulator.
+
+        :param keys: key of every series.
+        :param series: one series per key.
+        """
+        if not len(keys):
+            return
+        codes = self._encode(keys)
+        rows = numpy.zeros((len(series), self.year_count), dtype=numpy.int64)
+        for position, values in enumerate(series):
+            values = values[: self.year_count]
+            rows[position, : len(values)] = values
+        numpy.add.at(self.matrix, codes, rows)
+
+    def to_dict(self) -> dict[Any, NDArray[numpy.int64]]:
+        """
+        Series keyed by key.
+
+        :return: one row of the matrix per key.
+        """
+        return dict(zip(self.labels, self.matrix))
+
+    def _encode(self, keys: Sequence[Any]) -> NDArray[numpy.int64]:
+        """
+        Codes of ``keys``, new keys get new rows.
+
+        NULL keys can not be sorted with the others, they are coded apart
+        and kept as a ``None`` key, like the per-row loop did.
+
+        :param keys: key column.
+        :return: row of every key.
+        """
+        key_array = numpy.asarray(keys, dtype=object)
+        null = numpy.array([key is None for key in key_array], dtype=bool)
+        unique, inverse = numpy.unique(key_array[~null], return_inverse=True)
+        codes = numpy.empty(len(key_array), dtype=numpy.int64)
+        codes[~null] = self._register(unique)[inverse.ravel()]
+        if null.any():
+            codes[null] = self._register([None])[0]
+        return codes
+
+    def _register(self, labels: Sequence[Any]) -> NDArray[numpy.int64]:
+        new_labels = [label for label in labels if label not in self._lookup]
+        new_codes = itertools.count(len(self.labels))
+        self._lookup.update(zip(new_labels, new_codes))
+        self.labels.extend(new_labels)
+        self._grow()
+        return numpy.fromiter(
+            (self._lookup[label] for label in labels),
+            dtype=numpy.int64,
+            count=len(labels),
+        )
+
+    def _grow(self) -> None:
+        missing = len(self.labels) - self.matrix.shape[0]
+        if missing > 0:
+            padding = numpy.zeros((missing, self.year_count), dtype=numpy.int64)
+            self.matrix = numpy.vstack([self.matrix, padding])
+
+
+def top_series(
+    series: Mapping[Any, NDArray[Any]],
+    limit: Optional[int] = None,
+) -> list[KeyedSeries]:
+    """
+    Series with the largest last value, largest first.
+
+    Ties keep the order of ``series``, like a stable sort of its items,
+    so the same ``limit`` keys are kept on every run.
+
+    :param series: yearly series keyed by key.
+    :param limit: number of series to keep, all of them by default.
+    :return: ``(key, series)`` pairs.
+    """
+    if not series:
+        return []
+    keys = list(series)
+    last = numpy.fromiter(
+        (values[-1] for values in series.values()),
+        dtype=numpy.float64,
+        count=len(keys),
+    )
+    order = numpy.argsort(-last, kind="stable")[:limit]
+    return [(keys[code], series[keys[code]]) for code in order]
@@ -0,0 +1,222 @@
+import collections
+import logging
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+# parent category -> its child categories
+Children = dict[str, list[str]]
+
+
+class Membership:
+    """
+    Sparse 0/1 matrix stored as ``(row, col)`` index pairs.
+
+    Rows are parents and columns are children, so multiplying the matrix
+    with per-child values gives per-parent sums.
+    """
+
+    def __init__(
+        self,
+        rows: NDArray[numpy.int64],
+        cols: NDArray[numpy.int64],
+        shape: tuple[int, int],
+    ) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.shape = shape
+
+    def dot(  # noqa: WPS210
+        self,
+        values: NDArray[Any],
+        codes: Optional[NDArray[numpy.int64]] = None,
+    ) -> NDArray[Any]:
+        """
+        Multiply the matrix with ``values``.
+
+        :param values: one entry (or row) per column, or per code of ``codes``.
+        :param codes: column codes of ``values``, defaults to every column.
+        :return: one entry (or row) per matrix row.
+        """
+        position = numpy.arange(self.shape[1])
+        if codes is not None:
+            position = numpy.full(self.shape[1], -1)
+            position[codes] = numpy.arange(len(codes))
+        col_positions = position[self.cols]
+        hit = col_positions >= 0
+        out_shape = (self.shape[0], *values.shape[1:])
+        out = numpy.zeros(out_shape, dtype=values.dtype)
+        hit_values = values[col_positions[hit]]
+        numpy.add.at(out, self.rows[hit], hit_values)
+        return out
+
+    def touched(self, codes: NDArray[numpy.int64]) -> NDArray[numpy.int64]:
+        """
+        Rows that have at least one of the given columns.
+
+        :param codes: column codes.
+        :return: sorted row codes.
+        """
+        return numpy.unique(self.rows[numpy.isin(self.cols, codes)])
+
+
+def _compose(outer: Membership, inner: Membership) -> Membership:  # noqa: WPS210
+    """
+    Boolean product of two memberships.
+
+    The rows of ``inner`` are grouped once, then every ``(row, middle)``
+    pair of ``outer`` is expanded into the columns of row ``middle``. A
+    pair is kept once however many paths join it.
+
+    :param outer: rows to middle codes.
+    :param inner: middle codes to columns.
+    :return: rows of ``outer`` to columns of ``inner``.
+    """
+    order = numpy.argsort(inner.rows, kind="stable")
+    indptr = numpy.zeros(inner.shape[0] + 1, dtype=numpy.int64)
+    inner_sizes = numpy.bincount(inner.rows, minlength=inner.shape[0])
+    numpy.cumsum(inner_sizes, out=indptr[1:])
+    starts = indptr[outer.cols]
+    lengths = indptr[outer.cols + 1] - starts
+    # concatenated ranges of the inner rows reached by every outer pair
+    entries = numpy.arange(lengths.sum()) - numpy.repeat(
+        numpy.cumsum(lengths) - lengths - starts,
+        lengths,
+    )
+    shape = (outer.shape[0], inner.shape[1])
+    columns = inner.cols[order[entries]]
+    outer_rows = numpy.repeat(outer.rows, lengths)
+    pairs = numpy.unique(outer_rows * shape[1] + columns)
+    return Membership(pairs // shape[1], pairs % shape[1], shape)
+
+
+class CategoryIndex:
+    """
+    In-memory copy of the ``cat_ancestor`` hierarchy.
+
+    Every category, whatever its level, gets one code. ``parents[level]``
+    maps a category to its ancestors at ``level`` (0 or 1), and ``l0_via_l1``
+    links a level 0 category to the leaves below its level 1 children.
+    """
+
+    def __init__(self, rows: Sequence[Sequence[Any]]) -> None:  # noqa: WPS210
+        labels = sorted({cat for row in rows for cat in row[:2]})
+        self.cats = numpy.array(labels, dtype=object)
+        self.lookup = {cat: code for code, cat in enumerate(labels)}
+
+        pairs = collections.defaultdict(list)
+        self.children: dict[int, Children] = {
+            0: collections.defaultdict(list),
+            1: collections.defaultdict(list),
+        }
+        for cat, parent_cat, parent_level in rows:
+            row_level = int(parent_level)
+            link = (self.lookup[parent_cat], self.lookup[cat])
+            pairs[row_level].append(link)
+            self.children[row_level][parent_cat].append(cat)
+
+        shape = (len(labels), len(labels))
+        self.parents = {}
+        for level in (0, 1):
+            codes = numpy.array(pairs[level], dtype=numpy.int64)
+            parent_codes, child_codes = codes.reshape(-1, 2).T
+            self.parents[level] = Membership(parent_codes, child_codes, shape)
+        self.l0_via_l1 = _compose(self.parents[0], self.parents[1])
+
+    @classmethod
+    async def load(cls, pool: Any) -> "CategoryIndex":
+        """
+        Read the level 0 and level 1 ancestors from MySQL.
+
+        :param pool: aiomysql pool.
+        :return: category index.
+        """
+        sql = """
+            SELECT c.cat, c.parent_cat, c.parent_level
+            FROM cat_ancestor as c
+            WHERE c.parent_level IN (0, 1);
+        """
+        async with pool.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute(sql)
+            rows = await cur.fetchall()
+        index = cls(rows)
+        logging.info("category index: %s categories", len(index.cats))  # noqa: WPS323
+        return index
+
+    def encode(
+        self,
+        cats: Mapping[str, Any],
+    ) -> tuple[NDArray[numpy.int64], list[Any]]:
+        """
+        Codes of the known categories of ``cats`` and their values.
+
+        :param cats: values keyed by category.
+        :return: codes and values in the same order.
+        """
+        known = [
+            (self.lookup[cat], value)
+            for cat, value in cats.items()
+            if cat in self.lookup
+        ]
+        codes = numpy.array([code for code, _ in known], dtype=numpy.int64)
+        return codes, [value for _, value in known]
+
+    def ingredient_tree(  # noqa: WPS210
+        self,
+        counts: Mapping[str, int],
+    ) -> list[dict[str, Any]]:
+        """
+        Roll leaf counts up into a level 0 -> level 1 tree.
+
+        A level 1 node sums its leaves. A level 0 node sums the distinct
+        leaves below its level 1 children, so a leaf shared by two of them
+        is only counted once.
+
+        :param counts: leaf counts keyed by category.
+        :return: level 0 nodes with their level 1 children.
+        """
+        codes, leaf_counts = self.encode(counts)
+        values = numpy.array(leaf_counts, dtype=numpy.int64)
+        l1_values = self.parents[1].dot(values, codes)
+        l1_present = numpy.zeros(len(self.cats), dtype=bool)
+        l1_present[self.parents[1].touched(codes)] = True
+        l0_values = self.l0_via_l1.dot(values, codes)
+
+        result = []
+        for l0_code in self.parents[0].touched(numpy.flatnonzero(l1_present)):
+            l0_name = self.cats[l0_code]
+            result.append(
+                {
+                    "name": l0_name,
+                    "value": int(l0_values[l0_code]),
+                    "children": [
+                        {"name": l1_name, "value": int(l1_values[l1_code])}
+                        for l1_name, l1_code in self._children(l0_name)
+                        if l1_present[l1_code]
+                    ],
+                },
+            )
+        return result
+
+    def level0_trend(
+        self,
+        series: Mapping[str, NDArray[numpy.int64]],
+    ) -> dict[str, NDArray[numpy.int64]]:
+        """
+        Sum yearly series into their level 0 ancestors.
+
+        :param series: yearly counts keyed by category.
+        :return: yearly counts keyed by level 0 category.
+        """
+        codes, rows = self.encode(series)
+        if not rows:
+            return {}
+        sums = self.parents[0].dot(numpy.vstack(rows), codes)
+        touched = self.parents[0].touched(codes)
+        return {self.cats[code]: sums[code] for code in touched}
+
+    def _children(self, l0_name: str) -> list[tuple[str, int]]:
+        names = self.children[0][l0_name]
+        return [(name, self.lookup[name]) for name in names]
@@ -0,0 +1,274 @@
+import logging
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+# flow -> table with one (country, cat, year, count) row per cell
+PAPER_CUBE_TABLES = {
+    "paper": "artSizeByCatAndCtryAndYear",
+    "export": "exportByCtryAndCatAndYear",
+    "import": "importByCtryAndCatAndYear",
+}
+
+_AXES = ("country", "cat")
+_CELLS_SQL = "SELECT c.country, c.cat, c.year, c.count FROM {table} as c;"
+
+# country labels, category labels and their counts
+CubeMatrix = tuple[
+    NDArray[numpy.str_],
+    NDArray[numpy.str_],
+    NDArray[numpy.int64],
+]
+
+
+class PaperCube:
+    """
+    Country × category × year count cube held in memory.
+
+    The cube is sparse: only the non-empty cells of the source table are
+    kept, as integer coded coordinates plus their counts. The cells are
+    indexed by country and by category, so a query only touches the cells
+    of the requested countries (or categories) and is answered with a
+    ``bincount`` over the other axis.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        labels: dict[str, NDArray[numpy.str_]],
+        codes: dict[str, NDArray[numpy.int32]],
+        years: NDArray[numpy.int32],
+        year_codes: NDArray[numpy.int32],
+        counts: NDArray[numpy.int64],
+    ) -> None:
+        self.labels = labels
+        self.codes = codes
+        self.years = years
+        self.year_codes = year_codes
+        self.counts = counts
+
+        self._lookup = {
+            axis: {label: code for code, label in enumerate(labels[axis])}
+            for axis in _AXES
+        }
+        self._index = {axis: self._build_index(axis) for axis in _AXES}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[Any]]) -> "PaperCube":  # noqa: WPS210
+        """
+        Build the cube from ``(country, cat, year, count)`` rows.
+
+        :param rows: rows of one of the paper aggregate tables.
+        :return: cube over the rows.
+        """
+        if not rows:
+            empty = numpy.zeros(0, dtype=numpy.int32)
+            return cls(
+                labels={axis: numpy.array([], dtype=str) for axis in _AXES},
+                codes={axis: empty for axis in _AXES},
+                years=empty,
+                year_codes=empty,
+                counts=numpy.zeros(0, dtype=numpy.int64),
+            )
+
+        columns = list(zip(*rows))
+        labels, codes = {}, {}
+        for axis, column in zip(_AXES, columns):
+            axis_labels, inverse = numpy.unique(
+                numpy.array(column, dtype=str),
+                return_inverse=True,
+            )
+            labels[axis] = axis_labels
+            codes[axis] = inverse.astype(numpy.int32)
+        years, year_codes = numpy.unique(
+            numpy.array(columns[2], dtype=numpy.int32),
+            return_inverse=True,
+        )
+        return cls(
+            labels=labels,
+            codes=codes,
+            years=years,
+            year_codes=year_codes.astype(numpy.int32),
+            counts=numpy.array(columns[3], dtype=numpy.int64),
+        )
+
+    @property
+    def size(self) -> int:
+        """
+        Number of non-empty cells.
+
+        :return: cells kept in the cube.
+        """
+        return int(self.counts.shape[0])
+
+    def totals(  # noqa: WPS210
+        self,
+        group_by: str,
+        labels: Iterable[str],
+        years: Iterable[int],
+    ) -> dict[str, int]:
+        """
+        Sum the counts of the selected cells per ``group_by`` label.
+
+        :param group_by: "cat" to sum per category for the given countries,
+            "country" to sum per country for the given categories.
+        :param labels: labels on the other axis to select.
+        :param years: years to select.
+        :return: totals keyed by label, for every label of the selected
+            cells, like the ``GROUP BY`` of the source table.
+        """
+        positions = self._select(_other_axis(group_by), labels)
+        year_mask = numpy.isin(self.years, numpy.fromiter(years, dtype=numpy.int32))
+        positions = positions[year_mask[self.year_codes[positions]]]
+
+        sums = numpy.bincount(
+            self.codes[group_by][positions],
+            weights=self.counts[positions],
+            minlength=len(self.labels[group_by]),
+        ).astype(numpy.int64)
+        present = numpy.unique(self.codes[group_by][positions])
+        return {
+            str(label): int(value)
+            for label, value in zip(self.labels[group_by][present], sums[present])
+        }
+
+    def trend(  # noqa: WPS210
+        self,
+        group_by: str,
+        labels: Iterable[str],
+        start_year: int,
+        end_year: int,
+    ) -> dict[str, NDArray[numpy.int64]]:
+        """
+        Yearly counts of the selected cells per ``group_by`` label.
+
+        :param group_by: "cat" or "country", see ``totals``.
+        :param labels: labels on the other axis to select.
+        :param start_year: first year of the series.
+        :param end_year: last year of the series, inclusive.
+        :return: series of ``end_year - start_year + 1`` counts keyed by label.
+        """
+        year_count = end_year - start_year + 1
+        positions = self._select(_other_axis(group_by), labels)
+        offsets = self.years[self.year_codes[positions]] - start_year
+        in_range = (offsets >= 0) & (offsets < year_count)  # noqa: WPS465
+        positions, offsets = positions[in_range], offsets[in_range]
+
+        group_count = len(self.labels[group_by])
+        matrix = (
+            numpy.bincount(
+                self.codes[group_by][positions] * year_count + offsets,
+                weights=self.counts[positions],
+                minlength=group_count * year_count,
+            )
+            .astype(numpy.int64)
+            .reshape(group_count, year_count)
+        )
+        present = numpy.unique(self.codes[group_by][positions])
+        group_labels = self.labels[group_by]
+        return {str(group_labels[code]): matrix[code] for code in present}
+
+    def matrix(
+        self,
+        years: Iterable[int],
+        cats: Optional[Iterable[str]] = None,
+    ) -> CubeMatrix:
+        """
+        Country × category counts summed over ``years``.
+
+        :param years: years to select.
+        :param cats: categories to select, all of them by default.
+        :return: country labels, category labels and the counts, without
+            empty rows or columns.
+        """
+        if cats is None:
+            positions = numpy.arange(self.size)
+        else:
+            positions = self._select("cat", cats)
+        year_mask = numpy.isin(self.years, numpy.fromiter(years, dtype=numpy.int32))
+        positions = positions[year_mask[self.year_codes[positions]]]
+
+        counts = self._cell_counts(positions)
+        rows = numpy.flatnonzero(counts.any(axis=1))
+        columns = numpy.flatnonzero(counts.any(axis=0))
+        return (
+            self.labels["country"][rows],
+            self.labels["cat"][columns],
+            counts[numpy.ix_(rows, columns)],
+        )
+
+    def _build_index(
+        self,
+        axis: str,
+    ) -> tuple[NDArray[numpy.intp], NDArray[numpy.int64]]:
+        order = numpy.argsort(self.codes[axis], kind="stable")
+        label_count = len(self.labels[axis])
+        indptr = numpy.zeros(label_count + 1, dtype=numpy.int64)
+        numpy.cumsum(
+            numpy.bincount(self.codes[axis], minlength=label_count),
+            out=indptr[1:],
+        )
+        return order, indptr
+
+    def _select(  # noqa: WPS210
+        self,
+        axis: str,
+        labels: Iterable[str],
+    ) -> NDArray[numpy.intp]:
+        """
+        Positions of the cells whose ``axis`` label is one of ``labels``.
+
+        :param axis: "country" or "cat".
+        :param labels: labels to select, unknown ones are ignored.
+        :return: cell positions, grouped by label.
+        """
+        lookup = self._lookup[axis]
+        selected = numpy.array(
+            sorted({lookup[label] for label in labels if label in lookup}),
+            dtype=numpy.int64,
+        )
+        order, indptr = self._index[axis]
+        starts, stops = indptr[selected], indptr[selected + 1]
+        lengths = stops - starts
+        # concatenated ranges [start, stop) of every selected label
+        ranges = numpy.arange(lengths.sum()) - numpy.repeat(
+            numpy.cumsum(lengths) - lengths - starts,
+            lengths,
+        )
+        return order[ranges]
+
+    def _cell_counts(self, positions: NDArray[numpy.intp]) -> NDArray[numpy.int64]:
+        shape = (self.labels["country"].size, self.labels["cat"].size)
+        country_codes = self.codes["country"][positions]
+        cat_codes = self.codes["cat"][positions]
+        cells = country_codes * shape[1] + cat_codes
+        counts = numpy.bincount(
+            cells,
+            weights=self.counts[positions],
+            minlength=shape[0] * shape[1],
+        )
+        return counts.astype(numpy.int64).reshape(shape)
+
+
+def _other_axis(axis: str) -> str:
+    if axis not in _AXES:
+        raise ValueError(f"unknown cube axis {axis}")
+    return _AXES[1 - _AXES.index(axis)]
+
+
+async def load_paper_cubes(pool: Any) -> dict[str, PaperCube]:  # noqa: WPS210
+    """
+    Load every paper aggregate table into a cube.
+
+    :param pool: aiomysql pool.
+    :return: cubes keyed by flow.
+    """
+    cubes = {}
+    for flow, table_name in PAPER_CUBE_TABLES.items():
+        async with pool.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute(_CELLS_SQL.format(table=table_name))
+            rows = await cur.fetchall()
+        cubes[flow] = PaperCube.from_rows(rows)
+        logging.info("paper cube %s: %s cells", flow, cubes[flow].size)  # noqa: WPS323
+    return cubes
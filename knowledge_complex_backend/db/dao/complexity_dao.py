@@ -1,17 +1,79 @@
 import collections
+import functools
 import json
 import logging
+from typing import Any, Callable, Optional
 
 import numpy
 from fastapi import Depends
-from fastapi_cache.decorator import cache
-
-from knowledge_complex_backend.db.dependencies import get_db_pool
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.db.accumulator import TrendAccumulator, top_series
+from knowledge_complex_backend.db.cube import PAPER_CUBE_TABLES
+from knowledge_complex_backend.db.dependencies import (
+    get_category_index,
+    get_paper_cubes,
+    get_patent_store,
+    get_proximity,
+    get_read_db_pool,
+    get_rollups,
+)
+from knowledge_complex_backend.db.github_rank import GITHUB_TOP_RANK, load_github_rank
+from knowledge_complex_backend.db.patent_store import PATENT_END_YEAR, PATENT_START_YEAR
+from knowledge_complex_backend.db.query_builder import AggregateQuery
+from knowledge_complex_backend.db.streaming import chunk_size_for, stream_rows
+from knowledge_complex_backend.services.cache import Unordered, cache
+from knowledge_complex_backend.services.complexity import (
+    CountrySimilarity,
+    IndexCache,
+    complexity,
+    count_matrix,
+)
+from knowledge_complex_backend.settings import settings
+
+# countries served by the subject tree maps
+TOP_COUNTRIES = 20
+
+# series drawn by the stacked trend charts
+TOP_SERIES = 20
+
+# WO, EP 是专利局, 不是国家
+PATENT_OFFICES = frozenset(("WO", "EP"))
+IPC_SECTIONS = frozenset("ABCDEFGH")
+
+_PATENT_MATRIX_SQL = """
+    SELECT c.country_code, c.ipc_prefix, c.data
+    FROM patents_country_ipc_trend as c
+    WHERE c.ipc_level = %s;
+"""  # noqa: WPS323
+
+# (flow, start_year, end_year) -> CountrySimilarity of this worker
+similarity_indexes = IndexCache(
+    settings.similarity_cache_size,
+    settings.similarity_cache_ttl,
+)
 
 
 class ComplexityDAO:
-    def __init__(self, pool=Depends(get_db_pool)):
+    def __init__(  # noqa: WPS211
+        self,
+        pool=Depends(get_read_db_pool),
+        paper_cubes=Depends(get_paper_cubes),
+        category_index=Depends(get_category_index),
+        patent_store=Depends(get_patent_store),
+        proximity=Depends(get_proximity),
+        rollups=Depends(get_rollups),
+    ):
         self.pool = pool
+        # flow -> PaperCube, empty when the cube is disabled
+        self.paper_cubes = paper_cubes
+        self.category_index = category_index
+        # table name -> PatentSeriesTable, empty when the store is disabled
+        self.patent_store = patent_store
+        # dataset -> ProximityMatrix, empty when it is disabled
+        self.proximity = proximity
+        # RollupCatalog, empty when the rollups are disabled or stale
+        self.rollups = rollups
 
     async def test(self):
         async with self.pool.acquire() as conn:
@@ -22,7 +84,7 @@ class ComplexityDAO:
             logging.info(r)
             return r
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def number_of_papers_per_year_by_country_dx(self, flow: str):
         """国家历年的新增的论文数,只返回 top 20 的国家"""
         table_name = {
@@ -36,60 +98,60 @@ class ComplexityDAO:
 
         start_year = 1980
         end_year = 2022
-        sql = f"""
-            SELECT country, year, SUM(count) as total_count
-            FROM {table_name} WHERE year >= {start_year} AND year <= {end_year}
-            GROUP BY country, year
-            ORDER BY country, year;
-            """
+        query = AggregateQuery(
+            table_name,
+            group_by=["country", "year"],
+            years=range(start_year, end_year + 1),
+            order_by=["country", "year"],
+        )
         data_collect = collections.defaultdict(
             lambda: [0] * (end_year - start_year + 1)
         )
         data_collect_rank = collections.defaultdict(int)
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql)
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for c, y, t in query_results:
-                data_collect[c][int(y) - start_year] = int(t)
-                if y == str(end_year):
-                    data_collect_rank[c] += int(t)
-
-            # top20 [('US', 20099300), ('CN', 10463941), ('GB', 4937061), ('DE', 4034381),...]
-
-            # name top 20
-            # top_end_year = sorted(data_collect_rank.items(), key=lambda x:x[1], reverse=True)
-
-            # header = ['year', *[year for year in range(start_year, end_year+1)]]
-            # logging.info(data_collect)
-            # tmp = [[v[0],*data_collect[v[0]]] for v in top20]
-            data = []
-            data_collect_list = [[k, v] for k, v in data_collect.items()]
-            data_collect_list = sorted(
-                data_collect_list,
-                key=lambda x: data_collect_rank.get(x[0], float("-inf")),
-                reverse=True,
-            )
-
-            legend = []
-            for k, v in data_collect_list:
-                data.append(v)
-                legend.append(k)
+        query_results = await query.fetch(self.pool)
+
+        for c, y, t in query_results:
+            data_collect[c][int(y) - start_year] = int(t)
+            if int(y) == end_year:
+                data_collect_rank[c] += int(t)
+
+        # top20 [('US', 20099300), ('CN', 10463941), ('GB', 4937061), ('DE', 4034381),...]
+
+        # name top 20
+        # top_end_year = sorted(data_collect_rank.items(), key=lambda x:x[1], reverse=True)
+
+        # header = ['year', *[year for year in range(start_year, end_year+1)]]
+        # logging.info(data_collect)
+        # tmp = [[v[0],*data_collect[v[0]]] for v in top20]
+        data = []
+        data_collect_list = [[k, v] for k, v in data_collect.items()]
+        data_collect_list = sorted(
+            data_collect_list,
+            key=lambda x: data_collect_rank.get(x[0], float("-inf")),
+            reverse=True,
+        )
 
-            array = numpy.array(data)
-            ranks = array.shape[0] - numpy.argsort(numpy.argsort(array, axis=0), axis=0)
-            ranks_list = ranks.tolist()
-            return {
-                "legend": legend,
-                "year": [year for year in range(start_year, end_year + 1)],
-                "rank": ranks_list,
-                "data": data,
-            }
+        legend = []
+        for k, v in data_collect_list:
+            data.append(v)
+            legend.append(k)
+
+        array = numpy.array(data)
+        ranks = array.shape[0] - numpy.argsort(numpy.argsort(array, axis=0), axis=0)
+        ranks_list = ranks.tolist()
+        return {
+            "legend": legend,
+            "year": [year for year in range(start_year, end_year + 1)],
+            "rank": ranks_list,
+            "data": data,
+        }
 
     async def paper_ingredient(
-        self, mode: str, flow: str, countries: list[str], years: list[int]
+        self,
+        mode: str,
+        flow: str,
+        countries: Unordered[str],
+        years: Unordered[int],
     ):
         if mode == "national_academic_disciplines":
             return await self.paper_ingredient_national_academic_disciplines(
@@ -100,9 +162,12 @@ class ComplexityDAO:
                 flow, countries, years
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_ingredient_national_between_countries(
-        self, flow: str, countries: list[str], years: list[int]
+        self,
+        flow: str,
+        countries: Unordered[str],
+        years: Unordered[int],
     ):
         """tree map, 从国家找国家,"""
         table_name = {
@@ -114,23 +179,13 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.countryB, c.count
-            FROM {table_name} as c
-            WHERE c.countryA IN %s AND c.year IN %s;
-            """
-        result_map = collections.defaultdict(int)
-        total = 0
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries, years))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for cat, count in query_results:
-                total += count
-                # result_list.append((cat, count))
-                result_map[cat] += count
+        query = AggregateQuery(
+            table_name,
+            group_by=["countryB"],
+            filters={"countryA": countries},
+            years=years,
+        )
+        result_map = dict(await query.fetch(self.pool))
 
         return [
             {
@@ -140,9 +195,12 @@ class ComplexityDAO:
             for name, value in result_map.items()
         ]
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_ingredient_national_academic_disciplines(
-        self, flow: str, countries: list[str], years: list[int]
+        self,
+        flow: str,
+        countries: Unordered[str],
+        years: Unordered[int],
     ):
         """tree map, 从国家找产品, 将原来的3级分类上升到 1,2 级分类，构建树结构，结果中不再包含3成结构
         关于跨学科的学科统计办法，l1内l2, 是不重复的，l0 内，对l2去重"""
@@ -157,26 +215,19 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.cat, c.count
-            FROM {table_name} as c
-            WHERE c.country IN %s AND c.year IN %s;
-            """
-        result_map = collections.defaultdict(int)
-        total = 0
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries, years))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for cat, count in query_results:
-                total += count
-                # result_list.append((cat, count))
-                result_map[cat] += count
-
-        result_list = [(key, value) for key, value in result_map.items()]
-        result_list.sort(key=lambda x: -x[1])
+        cube = self.paper_cubes.get(flow)
+        if cube is not None:
+            result_map = cube.totals("cat", countries, years)
+        else:
+            # 全部年份的合计可以直接读 rollup
+            rollup = self.rollups.table(flow, "cat_country", years)
+            query = AggregateQuery(
+                rollup or table_name,
+                group_by=["cat"],
+                filters={"country": countries},
+                years=None if rollup else years,
+            )
+            result_map = dict(await query.fetch(self.pool))
 
         # 查询学科的父类，从1级直接到3级
         # sub_cat_dict = collections.defaultdict(list)
@@ -210,59 +261,9 @@ class ComplexityDAO:
         #             )
 
         # 查询学科的父类，3级不保留，留存1级和2级
-        # level 1
-        l1_cat_dict = collections.defaultdict(list)
-        sql = """
-            SELECT c.cat, c.parent_cat
-            FROM cat_ancestor as c
-            WHERE c.cat IN %s AND c.parent_level = 1;
-        """
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, ([row[0] for row in result_list],))
-            query_results = await cur.fetchall()
+        return self.category_index.ingredient_tree(result_map)
 
-            for cat, par_cat in query_results:
-                l1_cat_dict[par_cat].append(cat)
-
-        # level 0
-        l0_cat_dict = collections.defaultdict(list)
-        sql = """
-            SELECT c.cat, c.parent_cat
-            FROM cat_ancestor as c
-            WHERE c.cat IN %s AND c.parent_level = 0;
-        """
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, ([row for row in l1_cat_dict.keys()],))
-            query_results = await cur.fetchall()
-            for cat, par_cat in query_results:
-                l0_cat_dict[par_cat].append(cat)
-
-        result_dict = {}
-        for l0_name, l1_cats in l0_cat_dict.items():
-            l1_value_set = set()
-            result_dict.setdefault(
-                l0_name,
-                {
-                    "name": l0_name,
-                    "value": 0,
-                    "children": [],
-                },
-            )
-            for l1_name in l1_cats:
-                l1_item = {"name": l1_name, "value": 0}
-                for l3_name in l1_cat_dict.get(l1_name, []):
-                    l1_item["value"] += result_map.get(l3_name, 0)
-                    if l3_name not in l1_value_set:
-                        result_dict[l0_name]["value"] += result_map.get(l3_name, 0)
-                        l1_value_set.add(l3_name)
-
-                result_dict[l0_name]["children"].append(l1_item)
-
-        return list(result_dict.values())
-
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def country_eci(self):
         """国家的eci"""
 
@@ -289,7 +290,7 @@ class ComplexityDAO:
             for year, country, eci, rank in query_results:
                 data_collect_eci[country][int(year) - start_year] = round(float(eci), 3)
                 data_collect_rank[country][int(year) - start_year] = int(rank)
-                if year == str(end_year):
+                if int(year) == end_year:
                     data_collect_total_rank[country] = float(eci)
 
             data, eci_matrix, rank_matrix = [], [], []
@@ -326,7 +327,7 @@ class ComplexityDAO:
                 "data": data,
             }
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def subject_pci(self):
         """学科的pci"""
 
@@ -339,14 +340,11 @@ class ComplexityDAO:
         FROM rank_pci as c
         WHERE c.year >= {start_year} AND c.year <= {end_year} AND c.rank < 50;
         """
-        subject_map = set()
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql)
-            # print(cur.description)
-            query_results = await cur.fetchall()
-            for year, subject, pci, rank in query_results:
-                subject_map.add(subject)
+        subject_map: set[str] = set()
+        chunk_size = chunk_size_for("subject_pci")
+        async with stream_rows(self.pool, sql, None, chunk_size) as chunks:
+            async for query_results in chunks:
+                subject_map.update(row[1] for row in query_results)
 
         # 对学科进行补全
 
@@ -361,53 +359,59 @@ class ComplexityDAO:
         data_collect_pci = collections.defaultdict(
             lambda: [0] * (end_year - start_year + 1)
         )
-        data_collect_total_rank = {}
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, [list(subject_map)])
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for year, country, pci, rank in query_results:
-                data_collect_pci[country][int(year) - start_year] = round(float(pci), 5)
-                data_collect_rank[country][int(year) - start_year] = int(rank)
-                if year == str(end_year):
-                    data_collect_total_rank[country] = float(pci)
-
-            data, pci_matrix, rank_matrix = [], [], []
-            for k, v in data_collect_pci.items():
-                pci_matrix.append([k, v])
-                rank_matrix.append([k, data_collect_rank[k]])
-
-            pci_matrix = sorted(
-                pci_matrix,
-                key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
-                reverse=True,
-            )
-            rank_matrix = sorted(
-                rank_matrix,
-                key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
-                reverse=True,
-            )
-
-            legend = []
-            for k, v in pci_matrix:
-                data.append(v)
-                legend.append(k)
-            rank = []
-            for k, v in rank_matrix:
-                rank.append(v)
+        data_collect_total_rank: dict[str, float] = {}
+        args = [list(subject_map)]
+        async with stream_rows(self.pool, sql, args, chunk_size) as subject_chunks:
+            async for subject_rows in subject_chunks:
+                for year, country, pci, rank in subject_rows:
+                    offset = int(year) - start_year
+                    data_collect_pci[country][offset] = round(float(pci), 5)
+                    data_collect_rank[country][offset] = int(rank)
+                data_collect_total_rank.update(
+                    (row[1], float(row[2]))
+                    for row in subject_rows
+                    if int(row[0]) == end_year
+                )
 
-            # 补全缺失的 rank 和 value
+        data, pci_matrix, rank_matrix = [], [], []
+        for k, v in data_collect_pci.items():
+            pci_matrix.append([k, v])
+            rank_matrix.append([k, data_collect_rank[k]])
 
-            return {
-                "legend": legend,
-                "year": [year for year in range(start_year, end_year + 1)],
-                "rank": rank,
-                "data": data,
-            }
+        pci_matrix = sorted(
+            pci_matrix,
+            key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
+            reverse=True,
+        )
+        rank_matrix = sorted(
+            rank_matrix,
+            key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
+            reverse=True,
+        )
 
-    async def country_academic_trend(self, mode: str, flow: str, countries: list[str]):
+        legend = []
+        for k, v in pci_matrix:
+            data.append(v)
+            legend.append(k)
+        rank = []
+        for k, v in rank_matrix:
+            rank.append(v)
+
+        # 补全缺失的 rank 和 value
+
+        return {
+            "legend": legend,
+            "year": [year for year in range(start_year, end_year + 1)],
+            "rank": rank,
+            "data": data,
+        }
+
+    async def country_academic_trend(
+        self,
+        mode: str,
+        flow: str,
+        countries: Unordered[str],
+    ):
         # 1980-2022 年的数据趋势
         if mode == "national_academic_disciplines":
             return await self.paper_ingredient_national_academic_disciplines_trend(
@@ -418,9 +422,11 @@ class ComplexityDAO:
                 flow, countries
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_ingredient_national_academic_disciplines_trend(
-        self, flow: str, countries: list[str]
+        self,
+        flow: str,
+        countries: Unordered[str],
     ):
         # 一级学科的年度趋势
         """tree map, 从国家找产品, 将原来的3级分类上升到 1,2 级分类，构建树结构，结果中不再包含3成结构"""
@@ -435,52 +441,38 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.cat, c.count, c.year
-            FROM {table_name} as c
-            WHERE c.country IN %s AND c.year IN %s;
-            """
-
         start_year = 1980
         end_year = 2022
         year_range = [year for year in range(start_year, end_year + 1)]
-        result_map = collections.defaultdict(
-            lambda: numpy.zeros(len(year_range), dtype=int)
-        )
-
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries, year_range))
-            # print(cur.description)
-            query_results = await cur.fetchall()
 
-            for cat, count, year in query_results:
-                result_map[cat][int(year) - start_year] += count
+        rollup = None
+        cube = self.paper_cubes.get(flow)
+        if cube is not None:
+            result_map = cube.trend("cat", countries, start_year, end_year)
+        else:
+            # rollup 中 lv2 已经映射到 lv0
+            rollup = self.rollups.table(flow, "country_l0_year")
+            query = AggregateQuery(
+                rollup or table_name,
+                group_by=["cat", "year"],
+                filters={"country": countries},
+                years=year_range,
+            )
+            trend = TrendAccumulator(start_year, len(year_range))
+            async with query.chunks(self.pool, chunk_size_for("paper_trend")) as chunks:
+                async for rows in chunks:
+                    trend.add_rows(rows)
+            result_map = trend.to_dict()
 
         # result_list = [(key,value) for key,value in result_map.items()]
         # result_list.sort(key=lambda x:-x[1][-1])
 
         # 把 lv2 映射到 lv0
-        # level 0
-        l0_cat_dict = collections.defaultdict(
-            lambda: numpy.zeros(len(year_range), dtype=int)
+        l0_cat_dict = (
+            result_map if rollup else self.category_index.level0_trend(result_map)
         )
-        sql = """
-            SELECT c.cat, c.parent_cat
-            FROM cat_ancestor as c
-            WHERE c.cat IN %s AND c.parent_level = 0;
-        """
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (list(result_map.keys()),))
-            query_results = await cur.fetchall()
 
-            for cat, par_cat in query_results:
-                if cat in result_map:
-                    l0_cat_dict[par_cat] += result_map[cat]
-
-        result_list = [(key, value) for key, value in l0_cat_dict.items()]
-        result_list.sort(key=lambda x: -x[1][-1])
+        result_list = top_series(l0_cat_dict)
 
         legend = []
         data = [year_range]
@@ -490,9 +482,11 @@ class ComplexityDAO:
 
         return {"legend": legend, "data": data}
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_ingredient_national_between_countries_trend(
-        self, flow: str, countries: list[str]
+        self,
+        flow: str,
+        countries: Unordered[str],
     ):
         """堆叠层次图"""
         table_name = {
@@ -507,27 +501,20 @@ class ComplexityDAO:
         start_year = 1980
         end_year = 2020
         year_range = [year for year in range(start_year, end_year + 1)]
-        sql = f"""
-            SELECT c.countryB, c.count, c.year
-            FROM {table_name} as c
-            WHERE c.countryA IN %s AND c.year IN %s;
-            """
-        result_map = collections.defaultdict(
-            lambda: numpy.zeros(len(year_range), dtype=int)
+        query = AggregateQuery(
+            table_name,
+            group_by=["countryB", "year"],
+            filters={"countryA": countries},
+            years=year_range,
         )
-
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries, year_range))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for cat, count, year in query_results:
-                result_map[cat][int(year) - start_year] += count
-
-        result_list = [(key, value) for key, value in result_map.items()]
-        result_list.sort(key=lambda x: -x[1][-1])
-        result_list = result_list[:20]
+        trend = TrendAccumulator(start_year, len(year_range))
+        async with query.chunks(
+            self.pool,
+            chunk_size_for("between_countries_trend"),
+        ) as chunks:
+            async for rows in chunks:
+                trend.add_rows(rows)
+        result_list = top_series(trend.to_dict(), TOP_SERIES)
 
         legend = []
         data = [year_range]
@@ -537,148 +524,36 @@ class ComplexityDAO:
 
         return {"legend": legend, "data": data}
 
-    # @cache(expire=60*60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def github_country_eci(self, filter_cat: int):
-        """github 国家的 eci"""
-
-        start_year = 2008
-        end_year = 2023
-        quarter_range = [f"{year}Q1" for year in range(start_year, end_year + 1)]
-
-        sql = f"""
-        SELECT c.year, c.country, c.eci, c.rank
-        FROM rank_github_eci as c
-        WHERE c.year IN %s AND filter_cat=%s;
         """
-        data_collect_rank = collections.defaultdict(
-            lambda: [9999] * (end_year - start_year + 1)
-        )
-        data_collect_eci = collections.defaultdict(
-            lambda: [0] * (end_year - start_year + 1)
-        )
-        data_collect_total_rank = {}
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (quarter_range, filter_cat))
-
-            query_results = await cur.fetchall()
-            for year, country, eci, rank in query_results:
-                data_collect_eci[country][int(year[:4]) - start_year] = round(
-                    float(eci), 3
-                )
-                data_collect_rank[country][int(year[:4]) - start_year] = int(rank)
-                if year[:4] == str(end_year):
-                    data_collect_total_rank[country] = float(eci)
-
-            data, eci_matrix, rank_matrix = [], [], []
-            for k, v in data_collect_eci.items():
-                eci_matrix.append([k, v])
-                rank_matrix.append([k, data_collect_rank[k]])
+        国家在 GitHub 上的 eci.
 
-            # eci_matrix = sorted(eci_matrix, key=lambda x:data_collect_total_rank.get(x[0],float('-inf')), reverse=True)
-            # rank_matrix = sorted(rank_matrix, key=lambda x:data_collect_total_rank.get(x[0],float('-inf')), reverse=True)
-
-            legend = []
-            for k, v in eci_matrix:
-                data.append(v)
-                legend.append(k)
-            rank = []
-            for k, v in rank_matrix:
-                rank.append(v)
-
-            return {
-                "legend": legend,
-                "year": [year for year in range(start_year, end_year + 1)],
-                "rank": rank,
-                "data": data,
-            }
+        :param filter_cat: filter category.
+        :return: legend, years, ranks and eci of every country.
+        """
+        ranks = await load_github_rank(self.pool, "rank_github_eci", filter_cat)
+        return ranks.response(numpy.arange(len(ranks.entities)), digits=3)
 
-    # @cache(expire=60*60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def github_tag_pci(self, filter_cat: int):
-        """学科的pci"""
-
-        start_year = 2008
-        end_year = 2023
-        quarter_range = [f"{year}Q1" for year in range(start_year, end_year + 1)]
-
-        # 获得 top 50 的所有学科，因为每年学科变动都比较大，所以这些学科需要重点关注
-        sql = f"""
-        SELECT c.year, c.cat, c.pci, c.rank
-        FROM rank_github_pci as c
-        WHERE c.year IN %s AND c.rank < 50 AND filter_cat=%s;
         """
-        subject_map = set()
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (quarter_range, filter_cat))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-            for year, subject, pci, rank in query_results:
-                subject_map.add(subject)
+        学科的pci.
 
-        # 对学科进行补全
-
-        sql = f"""
-        SELECT c.year, c.cat, c.pci, c.rank
-        FROM rank_github_pci as c
-        WHERE c.year IN %s AND c.cat IN %s AND filter_cat=%s;
+        :param filter_cat: filter category.
+        :return: legend, years, ranks and pci of the top tags.
         """
-        data_collect_rank = collections.defaultdict(
-            lambda: [9999] * (end_year - start_year + 1)
-        )
-        data_collect_pci = collections.defaultdict(
-            lambda: [0] * (end_year - start_year + 1)
-        )
-        data_collect_total_rank = {}
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (quarter_range, list(subject_map), filter_cat))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for year, country, pci, rank in query_results:
-                data_collect_pci[country][int(year[:4]) - start_year] = round(
-                    float(pci), 5
-                )
-                data_collect_rank[country][int(year[:4]) - start_year] = int(rank)
-                if year[:4] == str(end_year):
-                    data_collect_total_rank[country] = float(pci)
-
-            data, pci_matrix, rank_matrix = [], [], []
-            for k, v in data_collect_pci.items():
-                pci_matrix.append([k, v])
-                rank_matrix.append([k, data_collect_rank[k]])
-
-            pci_matrix = sorted(
-                pci_matrix,
-                key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
-                reverse=True,
-            )
-            rank_matrix = sorted(
-                rank_matrix,
-                key=lambda x: data_collect_total_rank.get(x[0], float("-inf")),
-                reverse=True,
-            )
-
-            legend = []
-            for k, v in pci_matrix:
-                data.append(v)
-                legend.append(k)
-            rank = []
-            for k, v in rank_matrix:
-                rank.append(v)
-
-            # 补全缺失的 rank 和 value
-
-            return {
-                "legend": legend,
-                "year": [year for year in range(start_year, end_year + 1)],
-                "rank": rank,
-                "data": data,
-            }
+        ranks = await load_github_rank(self.pool, "rank_github_pci", filter_cat)
+        # 获得 top 50 的所有学科，因为每年学科变动都比较大，所以这些学科需要重点关注
+        top = ranks.by_last_quarter(ranks.top(GITHUB_TOP_RANK))
+        return ranks.response(top, digits=5)
 
     async def patent_ingredient(
-        self, mode: str, flow: str, countries: list[str], year: int
+        self,
+        mode: str,
+        flow: str,
+        countries: Unordered[str],
+        year: int,
     ):
         if mode == "national_ipc":
             return await self.patent_ingredient_national_ipc(flow, countries, year)
@@ -687,9 +562,12 @@ class ComplexityDAO:
                 flow, countries, year
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def patent_ingredient_national_between_countries(
-        self, flow: str, countries: list[str], year: int
+        self,
+        flow: str,
+        countries: Unordered[str],
+        year: int,
     ):
         """tree map, 从国家找国家,"""
 
@@ -718,31 +596,34 @@ class ComplexityDAO:
 
         BAN_SET = set(["WO", "EP"])
 
-        result_map = collections.defaultdict(int)
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries,))
-            query_results = await cur.fetchall()
+        result_map = self._patent_citation_totals(flow, countries, year)
+        if result_map is None:
+            result_map = collections.defaultdict(int)
+            async with self.pool.acquire() as conn:
+                cur = await conn.cursor()
+                await cur.execute(sql, (countries,))
+                query_results = await cur.fetchall()
 
             for cat, data in query_results:
-                if cat in BAN_SET:
-                    continue
-                if cat in countries:
-                    continue
-
                 result_map[cat] += json.loads(data)[data_index]
 
+        # 排除本国和 WO, EP
+        excluded = BAN_SET | set(countries)
         return [
             {
                 "name": name,
                 "value": value,
             }
             for name, value in result_map.items()
+            if name not in excluded
         ]
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def patent_ingredient_national_ipc(
-        self, flow: str, countries: list[str], year: int
+        self,
+        flow: str,
+        countries: Unordered[str],
+        year: int,
     ):
         """tree map, 从国家 ipc 的分类的量
         flow: patent, linsIn, linsOut
@@ -761,11 +642,24 @@ class ComplexityDAO:
                 FROM patents_country_ipc_trend as c
                 WHERE c.country_code IN %s AND c.ipc_level = %s;
                 """
-            result_map = collections.defaultdict(int)
-            async with self.pool.acquire() as conn:
-                cur = await conn.cursor()
-                await cur.execute(sql, (countries, 1))
-                query_results = await cur.fetchall()
+            table = self.patent_store.get("patents_country_ipc_trend")
+            if table is not None:
+                totals = table.year_totals(
+                    "ipc_prefix",
+                    table.mask(country_code=countries, ipc_level=[1]),
+                    year,
+                )
+                result_map = {
+                    ipc_prefix: value
+                    for ipc_prefix, value in totals.items()
+                    if ipc_prefix[0] in IPC_PREFIX_SET
+                }
+            else:
+                result_map = collections.defaultdict(int)
+                async with self.pool.acquire() as conn:
+                    cur = await conn.cursor()
+                    await cur.execute(sql, (countries, 1))
+                    query_results = await cur.fetchall()
 
                 for ipc_prefix, data in query_results:
                     if ipc_prefix[0] not in IPC_PREFIX_SET:
@@ -810,11 +704,30 @@ class ComplexityDAO:
                     WHERE c.country_code_b IN %s AND c.ipc_level = %s AND c.direction = 'i';
                     """
 
-            result_map = collections.defaultdict(int)
-            async with self.pool.acquire() as conn:
-                cur = await conn.cursor()
-                await cur.execute(sql, (countries, 1))
-                query_results = await cur.fetchall()
+            table = self.patent_store.get("patents_country_ipc_citations_trend")
+            if table is not None:
+                filter_by, other, direction = "country_code_a", "country_code_b", "o"
+                if flow == "export":
+                    filter_by, other, direction = other, filter_by, "i"
+                mask = table.mask(
+                    **{filter_by: countries},
+                    ipc_level=[1],
+                    direction=[direction],
+                )
+                # 排除本国
+                mask &= ~table.mask(**{other: countries})
+                totals = table.year_totals("ipc_prefix", mask, year)
+                result_map = {
+                    prefix: value
+                    for prefix, value in totals.items()
+                    if prefix[0] in IPC_PREFIX_SET
+                }
+            else:
+                result_map = collections.defaultdict(int)
+                async with self.pool.acquire() as conn:
+                    cur = await conn.cursor()
+                    await cur.execute(sql, (countries, 1))
+                    query_results = await cur.fetchall()
 
                 for ipc_prefix, data, country_code in query_results:
                     if ipc_prefix[0] not in IPC_PREFIX_SET:
@@ -835,7 +748,7 @@ class ComplexityDAO:
                 )
             return list(result_dict.values())
 
-    async def country_ipc_trend(self, mode: str, flow: str, countries: list[str]):
+    async def country_ipc_trend(self, mode: str, flow: str, countries: Unordered[str]):
         # 1980-2022 年的数据趋势
         if mode == "national_ipc":
             return await self.patent_ingredient_national_ipc_trend(flow, countries)
@@ -844,15 +757,17 @@ class ComplexityDAO:
                 flow, countries
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def patent_ingredient_national_ipc_trend(
-        self, flow: str, countries: list[str]
+        self,
+        flow: str,
+        countries: Unordered[str],
     ):
         # 一级学科的年度趋势
         """tree map, 从国家找产品, 将原来的3级分类上升到 1,2 级分类，构建树结构，结果中不再包含3成结构"""
 
         IPC_PREFIX_SET = set(["A", "B", "C", "D", "E", "F", "G", "H"])
-        year_range = [year for year in range(1990, 2021)]
+        year_range = list(range(PATENT_START_YEAR, PATENT_END_YEAR + 1))
         # 查询 patent
         if flow == "patent":
             sql = f"""
@@ -860,18 +775,23 @@ class ComplexityDAO:
                 FROM patents_country_ipc_trend as c
                 WHERE c.country_code IN %s AND c.ipc_level = %s;
                 """
-            result_map = collections.defaultdict(
-                lambda: numpy.zeros(2022 - 1980 + 1, dtype=int)
-            )
-            async with self.pool.acquire() as conn:
-                cur = await conn.cursor()
-                await cur.execute(sql, (countries, 1))
-                query_results = await cur.fetchall()
-
-                for ipc_prefix, data in query_results:
-                    if ipc_prefix[0] not in IPC_PREFIX_SET:
-                        continue
-                    result_map[ipc_prefix] += numpy.array(json.loads(data), dtype=int)
+            table = self.patent_store.get("patents_country_ipc_trend")
+            if table is not None:
+                totals = table.trend_totals(
+                    "ipc_prefix",
+                    table.mask(country_code=countries, ipc_level=[1]),
+                )
+                result_map = {
+                    ipc_prefix: value
+                    for ipc_prefix, value in totals.items()
+                    if ipc_prefix[0] in IPC_PREFIX_SET
+                }
+            else:
+                result_map = await self._patent_trend(
+                    sql,
+                    args=(countries, 1),
+                    keep=lambda ipc_prefix: ipc_prefix[0] in IPC_PREFIX_SET,
+                )
 
         # 查询附加方向
         else:
@@ -888,21 +808,30 @@ class ComplexityDAO:
                     WHERE c.country_code_b IN %s AND c.ipc_level = %s AND c.direction = 'i';
                     """
 
-            result_map = collections.defaultdict(
-                lambda: numpy.zeros(2020 - 1990 + 1, dtype=int)
-            )
-            async with self.pool.acquire() as conn:
-                cur = await conn.cursor()
-                await cur.execute(sql, (countries, 1))
-                query_results = await cur.fetchall()
-
-                for ipc_prefix, data in query_results:
-                    if ipc_prefix[0] not in IPC_PREFIX_SET:
-                        continue
-                    result_map[ipc_prefix] += numpy.array(json.loads(data), dtype=int)
+            table = self.patent_store.get("patents_country_ipc_citations_trend")
+            if table is not None:
+                filter_by, direction = "country_code_a", "o"
+                if flow == "import":
+                    filter_by, direction = "country_code_b", "i"
+                mask = table.mask(
+                    **{filter_by: countries},
+                    ipc_level=[1],
+                    direction=[direction],
+                )
+                trend = table.trend_totals("ipc_prefix", mask)
+                result_map = {
+                    ipc_prefix: value
+                    for ipc_prefix, value in trend.items()
+                    if ipc_prefix[0] in IPC_PREFIX_SET
+                }
+            else:
+                result_map = await self._patent_trend(
+                    sql,
+                    args=(countries, 1),
+                    keep=lambda ipc_prefix: ipc_prefix[0] in IPC_PREFIX_SET,
+                )
 
-        result_list = [(key, value) for key, value in result_map.items()]
-        result_list.sort(key=lambda x: -x[1][-1])
+        result_list = top_series(result_map)
 
         legend = []
         data = [year_range]
@@ -912,13 +841,15 @@ class ComplexityDAO:
 
         return {"legend": legend, "data": data}
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def patent_ingredient_national_between_countries_trend(
-        self, flow: str, countries: list[str]
+        self,
+        flow: str,
+        countries: Unordered[str],
     ):
         """堆叠层次图"""
 
-        year_range = [year for year in range(1990, 2021)]
+        year_range = list(range(PATENT_START_YEAR, PATENT_END_YEAR + 1))
 
         sql = {
             "export": """
@@ -939,23 +870,23 @@ class ComplexityDAO:
 
         BAN_SET = set(["WO", "EP"])
 
-        result_map = collections.defaultdict(
-            lambda: numpy.zeros(2020 - 1990 + 1, dtype=int)
-        )
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (countries,))
-            query_results = await cur.fetchall()
-
-            for cat, data in query_results:
-                if cat in BAN_SET:
-                    continue
-
-                result_map[cat] += json.loads(data)
+        table = self.patent_store.get("patents_country_citations_trend")
+        if table is not None:
+            group_by, filter_by = "country_code_a", "country_code_b"
+            if flow == "import":
+                group_by, filter_by = filter_by, group_by
+            totals = table.trend_totals(group_by, table.mask(**{filter_by: countries}))
+            result_map = {
+                cat: value for cat, value in totals.items() if cat not in BAN_SET
+            }
+        else:
+            result_map = await self._patent_trend(
+                sql,
+                args=(countries,),
+                keep=lambda cat: cat not in BAN_SET,
+            )
 
-        result_list = [(key, value) for key, value in result_map.items()]
-        result_list.sort(key=lambda x: -x[1][-1])
-        result_list = result_list[:20]
+        result_list = top_series(result_map, TOP_SERIES)
 
         legend = []
         data = [year_range]
@@ -966,7 +897,11 @@ class ComplexityDAO:
         return {"legend": legend, "data": data}
 
     async def subject_ingredient(
-        self, mode: str, flow: str, subjects: list[str], years: list[int]
+        self,
+        mode: str,
+        flow: str,
+        subjects: Unordered[str],
+        years: Unordered[int],
     ):
         """提供 subject， 按照引用数，依赖，被依赖，计算一个分布"""
         if mode == "national_academic_disciplines":
@@ -979,9 +914,12 @@ class ComplexityDAO:
                 flow, subjects, years
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_subject_ingredient_national_academic_disciplines(
-        self, flow: str, subjects: list[str], years: list[int]
+        self,
+        flow: str,
+        subjects: Unordered[str],
+        years: Unordered[int],
     ):
         """tree map, 从国家找产品, 将原来的3级分类上升到 1,2 级分类，构建树结构，结果中不再包含3成结构
         关于跨学科的学科统计办法，l1内l2, 是不重复的，l0 内，对l2去重"""
@@ -996,20 +934,20 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.country, c.count
-            FROM {table_name} as c
-            WHERE c.cat IN %s AND c.year IN %s;
-            """
-        result_map = collections.defaultdict(int)
-
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (subjects, years))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-            for cat, count in query_results:
-                result_map[cat] += count
+        cube = self.paper_cubes.get(flow)
+        if cube is not None:
+            result_map = cube.totals("country", subjects, years)
+        else:
+            # 全部年份的合计可以直接读 rollup
+            rollup = self.rollups.table(flow, "cat_country", years)
+            query = AggregateQuery(
+                rollup or table_name,
+                group_by=["country"],
+                filters={"cat": subjects},
+                years=None if rollup else years,
+                limit=TOP_COUNTRIES,
+            )
+            result_map = dict(await query.fetch(self.pool))
 
         result_list = [(key, value) for key, value in result_map.items()]
         result_list.sort(key=lambda x: -x[1])
@@ -1023,11 +961,14 @@ class ComplexityDAO:
                     "children": [],
                 }
             )
-        return result[:20]
+        return result[:TOP_COUNTRIES]
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def paper_subject_ingredient_national_between_countries(
-        self, flow: str, subjects: list[str], years: list[int]
+        self,
+        flow: str,
+        subjects: Unordered[str],
+        years: Unordered[int],
     ):
         """tree map, 从国家找国家,"""
         # todo
@@ -1040,23 +981,13 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.countryB, c.count
-            FROM {table_name} as c
-            WHERE c.countryA IN %s AND c.year IN %s;
-            """
-        result_map = collections.defaultdict(int)
-        total = 0
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (subjects, years))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for cat, count in query_results:
-                total += count
-                # result_list.append((cat, count))
-                result_map[cat] += count
+        query = AggregateQuery(
+            table_name,
+            group_by=["countryB"],
+            filters={"countryA": subjects},
+            years=years,
+        )
+        result_map = dict(await query.fetch(self.pool))
 
         return [
             {
@@ -1066,7 +997,12 @@ class ComplexityDAO:
             for name, value in result_map.items()
         ]
 
-    async def subject_academic_trend(self, mode: str, flow: str, subjects: list[str]):
+    async def subject_academic_trend(
+        self,
+        mode: str,
+        flow: str,
+        subjects: Unordered[str],
+    ):
         # 1980-2022 年的数据趋势
         if mode == "national_academic_disciplines":
             return await self.subject_ingredient_national_academic_disciplines_trend(
@@ -1078,9 +1014,11 @@ class ComplexityDAO:
                 flow, subjects
             )
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def subject_ingredient_national_academic_disciplines_trend(
-        self, flow: str, subjects: list[str]
+        self,
+        flow: str,
+        subjects: Unordered[str],
     ):
         # 一级学科的年度趋势
         """tree map, 从国家找产品, 将原来的3级分类上升到 1,2 级分类，构建树结构，结果中不再包含3成结构"""
@@ -1095,38 +1033,332 @@ class ComplexityDAO:
             logging.info("unKnow flow %s", flow)
             return ""
 
-        sql = f"""
-            SELECT c.country, c.count, c.year
-            FROM {table_name} as c
-            WHERE c.cat IN %s AND c.year IN %s;
-            """
-
         start_year = 1980
         end_year = 2022
         year_range = [year for year in range(start_year, end_year + 1)]
-        result_map = collections.defaultdict(
-            lambda: numpy.zeros(len(year_range), dtype=int)
-        )
 
-        async with self.pool.acquire() as conn:
-            cur = await conn.cursor()
-            await cur.execute(sql, (subjects, year_range))
-            # print(cur.description)
-            query_results = await cur.fetchall()
-
-            for cat, count, year in query_results:
-                result_map[cat][int(year) - start_year] += count
+        cube = self.paper_cubes.get(flow)
+        if cube is not None:
+            result_map = cube.trend("country", subjects, start_year, end_year)
+        else:
+            query = AggregateQuery(
+                table_name,
+                group_by=["country", "year"],
+                filters={"cat": subjects},
+                years=year_range,
+            )
+            trend = TrendAccumulator(start_year, len(year_range))
+            async with query.chunks(
+                self.pool,
+                chunk_size_for("subject_trend"),
+            ) as chunks:
+                async for rows in chunks:
+                    trend.add_rows(rows)
+            result_map = trend.to_dict()
 
-        result_list = [(key, value) for key, value in result_map.items()]
-        result_list.sort(key=lambda x: -x[1][-1])
+        result_list = top_series(result_map, TOP_SERIES)
 
         # result_list = [(key,value) for key,value in l0_cat_dict.items()]
         # result_list.sort(key=lambda x:-x[1][-1])
 
         legend = []
         data = [year_range]
-        for key, value in result_list[:20]:
+        for key, value in result_list:
             legend.append(key)
             data.append(value.tolist())
 
         return {"legend": legend, "data": data}
+
+    async def country_category_matrix(
+        self,
+        dataset: str,
+        start_year: int,
+        end_year: int,
+        categories: Optional[Unordered[str]] = None,
+    ) -> tuple[NDArray[numpy.str_], NDArray[numpy.str_], NDArray[Any]]:
+        """
+        国家 × 学科 (或 IPC) 在 [start_year, end_year] 内的数量矩阵.
+
+        :param dataset: paper, export, import (论文的三个 flow) 或 patent.
+        :param start_year: 第一年.
+        :param end_year: 最后一年.
+        :param categories: 只统计这些学科 (或 IPC), 默认全部.
+        :raises ValueError: 未知的 dataset.
+        :return: (国家, 学科, 矩阵), 去掉全为 0 的行和列.
+        """
+        years = range(start_year, end_year + 1)
+        if dataset in PAPER_CUBE_TABLES:
+            return await self._paper_matrix(dataset, years, categories)
+        if dataset == "patent":
+            return await self._patent_matrix(years, categories)
+        raise ValueError(f"unknown dataset {dataset}")
+
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
+    async def complexity_index(  # noqa: WPS210, WPS211
+        self,
+        dataset: str,
+        start_year: int,
+        end_year: int,
+        categories: Optional[Unordered[str]] = None,
+        method: str = "eigenvector",
+        iterations: int = 18,
+    ) -> dict[str, Any]:
+        """
+        在任意年份窗口和学科子集上直接计算 ECI / PCI, 结果按参数缓存.
+
+        :param dataset: paper, export, import 或 patent.
+        :param start_year: 第一年.
+        :param end_year: 最后一年.
+        :param categories: 只用这些学科 (或 IPC), 默认全部.
+        :param method: eigenvector 或 reflections.
+        :param iterations: reflections 的迭代次数.
+        :return: 按指数从大到小排列的国家 ECI 和学科 PCI.
+        """
+        countries, cats, counts = await self.country_category_matrix(
+            dataset,
+            start_year,
+            end_year,
+            categories,
+        )
+        eci, pci, rows, columns = complexity(counts, method, iterations)
+        return {
+            "countries": _ranked(countries[rows], eci),
+            "categories": _ranked(cats[columns], pci),
+        }
+
+    async def related(
+        self,
+        dataset: str,
+        kind: str,
+        node: str,
+        limit: int,
+    ) -> Optional[list[Any]]:
+        """
+        产品空间: 与学科最接近的学科, 或国家尚未具备优势但最相关的学科.
+
+        :param dataset: paper 或 patent.
+        :param kind: category 或 country.
+        :param node: 学科或国家.
+        :param limit: 返回的学科数.
+        :return: 学科及其 proximity 或 density, 未知的 dataset 或 node 为 None.
+        """
+        matrix = self.proximity.get(dataset)
+        if matrix is None:
+            return None
+        if kind == "category":
+            pairs = matrix.related_categories(node, limit)
+        else:
+            pairs = matrix.related_to_country(node, limit)
+        if pairs is None:
+            return None
+        return [{"name": name, "value": value} for name, value in pairs]
+
+    async def country_similarity_index(
+        self,
+        flow: str,
+        start_year: int,
+        end_year: int,
+    ) -> CountrySimilarity:
+        """
+        国家相似度索引: flow 和年份窗口内归一化的国家 × 学科矩阵.
+
+        每个 worker 按参数缓存.
+
+        :param flow: paper, export 或 import.
+        :param start_year: 起始年.
+        :param end_year: 结束年.
+        :return: 相似度索引.
+        """
+        build = functools.partial(
+            self._similarity_index,
+            flow,
+            start_year,
+            end_year,
+        )
+        return await similarity_indexes.get((flow, start_year, end_year), build)
+
+    async def similar_countries(  # noqa: WPS211
+        self,
+        country: str,
+        flow: str,
+        start_year: int,
+        end_year: int,
+        metric: str,
+        limit: int,
+    ) -> Optional[list[Any]]:
+        """
+        学科结构最相似的国家.
+
+        :param country: 国家.
+        :param flow: paper, export 或 import.
+        :param start_year: 起始年.
+        :param end_year: 结束年.
+        :param metric: cosine 或 jensen_shannon.
+        :param limit: 返回的国家数.
+        :return: 国家及其相似度, 最相似的在前, 未知的国家为 None.
+        """
+        index = await self.country_similarity_index(flow, start_year, end_year)
+        pairs = index.most_similar(country, limit, metric)
+        if pairs is None:
+            return None
+        return [{"name": name, "value": value} for name, value in pairs]
+
+    async def _patent_trend(  # noqa: WPS210
+        self,
+        sql: str,
+        args: Any,
+        keep: Callable[[Any], bool],
+    ) -> dict[Any, NDArray[numpy.int64]]:
+        """
+        按 key 汇总 (key, data) 行中 1990-2020 的 JSON 年度数组.
+
+        :param sql: query of the ``(key, data)`` rows.
+        :param args: query arguments.
+        :param keep: only the keys it is true for are summed.
+        :return: series keyed by key.
+        """
+        year_count = PATENT_END_YEAR - PATENT_START_YEAR + 1
+        trend = TrendAccumulator(PATENT_START_YEAR, year_count)
+        chunk_size = chunk_size_for("patent_trend")
+        async with stream_rows(self.pool, sql, args, chunk_size) as chunks:
+            async for chunk in chunks:
+                rows = [(key, data) for key, data in chunk if keep(key)]
+                trend.add_series(
+                    [key for key, _ in rows],
+                    [json.loads(data) for _, data in rows],
+                )
+        return trend.to_dict()
+
+    def _patent_citation_totals(
+        self,
+        flow: str,
+        countries: Unordered[str],
+        year: int,
+    ) -> Optional[dict[str, int]]:
+        """
+        One year of the citations between the given and the other countries.
+
+        :param flow: ``export`` sums the countries citing the given ones,
+            ``import`` the countries they cite.
+        :param countries: given countries.
+        :param year: year to read.
+        :return: totals keyed by other country, or None without a patent store.
+        """
+        table = self.patent_store.get("patents_country_citations_trend")
+        if table is None:
+            return None
+        group_by, filter_by = "country_code_a", "country_code_b"
+        if flow == "import":
+            group_by, filter_by = filter_by, group_by
+        mask = table.mask(**{filter_by: countries})
+        return table.year_totals(group_by, mask, year)
+
+    async def _paper_matrix(  # noqa: WPS210
+        self,
+        dataset: str,
+        years: range,
+        categories: Optional[Unordered[str]],
+    ) -> tuple[NDArray[numpy.str_], NDArray[numpy.str_], NDArray[Any]]:
+        """
+        Country × category paper counts, see ``country_category_matrix``.
+
+        :param dataset: paper flow.
+        :param years: years to sum.
+        :param categories: categories to keep, all of them by default.
+        :return: countries, categories and counts.
+        """
+        cube = self.paper_cubes.get(dataset)
+        if cube is not None:
+            return cube.matrix(years, categories)
+        rollup = self.rollups.table(dataset, "cat_country", years)
+        query = AggregateQuery(
+            rollup or PAPER_CUBE_TABLES[dataset],
+            group_by=["country", "cat"],
+            filters=None if categories is None else {"cat": categories},
+            years=None if rollup else years,
+        )
+        rows: list[Any] = []
+        async with query.chunks(self.pool, chunk_size_for("matrix")) as chunks:
+            async for chunk in chunks:
+                rows.extend(chunk)
+        return count_matrix(rows)
+
+    async def _similarity_index(
+        self,
+        flow: str,
+        start_year: int,
+        end_year: int,
+    ) -> CountrySimilarity:
+        countries, cats, counts = await self.country_category_matrix(
+            flow,
+            start_year,
+            end_year,
+        )
+        return CountrySimilarity(countries, cats, counts)
+
+    async def _patent_matrix(  # noqa: WPS210
+        self,
+        years: range,
+        categories: Optional[Unordered[str]],
+    ) -> tuple[NDArray[numpy.str_], NDArray[numpy.str_], NDArray[Any]]:
+        """
+        Country × IPC section counts, see ``country_category_matrix``.
+
+        :param years: years to sum.
+        :param categories: IPC prefixes to keep, all of them by default.
+        :return: countries, IPC prefixes and counts.
+        """
+        table = self.patent_store.get("patents_country_ipc_trend")
+        if table is not None:
+            return _patent_store_matrix(table, years, categories)
+        window = slice(
+            max(years[0] - PATENT_START_YEAR, 0),
+            years[-1] - PATENT_START_YEAR + 1,
+        )
+        rows: list[Any] = []
+        chunk_size = chunk_size_for("matrix")
+        stream = stream_rows(self.pool, _PATENT_MATRIX_SQL, (1,), chunk_size)
+        async with stream as chunks:
+            async for chunk in chunks:
+                rows.extend(
+                    (country, ipc_prefix, sum(json.loads(data)[window]))
+                    for country, ipc_prefix, data in chunk
+                    if _is_country_section(country, ipc_prefix)
+                    and (categories is None or ipc_prefix in categories)
+                )
+        return count_matrix(rows)
+
+
+def _ranked(labels: NDArray[Any], values: NDArray[numpy.float64]) -> list[Any]:
+    order = numpy.argsort(-values, kind="stable")
+    return [
+        {"name": str(name), "value": round(float(value), 5)}
+        for name, value in zip(labels[order], values[order])
+    ]
+
+
+def _is_country_section(country: str, ipc_prefix: str) -> bool:
+    return country not in PATENT_OFFICES and ipc_prefix[0] in IPC_SECTIONS
+
+
+def _patent_store_matrix(  # noqa: WPS210
+    table: Any,
+    years: range,
+    categories: Optional[Unordered[str]],
+) -> tuple[NDArray[numpy.str_], NDArray[numpy.str_], NDArray[Any]]:
+    filters: dict[str, list[Any]] = {"ipc_level": [1]}
+    if categories is not None:
+        filters["ipc_prefix"] = categories
+    mask = table.mask(**filters)
+    countries, ipc_prefixes, counts = table.window_matrix(
+        "country_code",
+        "ipc_prefix",
+        mask,
+        years[0],
+        years[-1],
+    )
+    country_mask = ~numpy.isin(countries, list(PATENT_OFFICES))
+    sections = [prefix[0] for prefix in ipc_prefixes]
+    section_mask = numpy.isin(sections, list(IPC_SECTIONS))
+    cells = numpy.ix_(country_mask, section_mask)
+    return countries[country_mask], ipc_prefixes[section_mask], counts[cells]
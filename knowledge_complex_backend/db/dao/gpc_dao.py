@@ -1,14 +1,65 @@
+import asyncio
 import logging
 import re
 import time
+from typing import Any, Callable, Optional
 
+import numpy
 from fastapi import Depends
-from fastapi_cache.decorator import cache
+from numpy.typing import NDArray
 
 from knowledge_complex_backend.db.dependencies import (  # get_gpc_db_pool,
+    get_gpc_graph,
     get_neo4j_driver,
     get_wikipedia_es_client,
 )
+from knowledge_complex_backend.db.gpc_graph import analogies
+from knowledge_complex_backend.services.cache import NotKeyed, Unordered, cache
+
+_NEIGHBOURS_MATCH = """
+MATCH (start:P {{Id: $startID}})<-[r:D]->(end:P)
+WHERE r.weight >= $distanceStart AND r.weight <= $distanceEnd
+{returns}
+"""
+_NEIGHBOUR_COUNT_CYPHER = _NEIGHBOURS_MATCH.format(returns="RETURN count(r) AS count")
+_NEIGHBOURS_CYPHER = _NEIGHBOURS_MATCH.format(
+    returns="RETURN r,end ORDER BY r.weight ASC SKIP $offset",
+)
+_NEIGHBOURS_PAGE_CYPHER = _NEIGHBOURS_MATCH.format(
+    returns="RETURN r,end ORDER BY r.weight ASC SKIP $offset LIMIT $limit",
+)
+_WINDOW_CYPHER = """
+MATCH (start:P {Id: $startID})<-[r:D]->(end:P)
+WHERE r.weight >= $low AND r.weight <= $high
+RETURN end.Id AS id, end.Title AS title, r.weight AS weight
+ORDER BY r.weight ASC
+"""
+# one query for the weights of all the page pairs
+_DISTANCE_CYPHER = """
+UNWIND $pairs AS pair
+MATCH (a:P {Id: pair[0]})<-[r:D]->(b:P {Id: pair[1]})
+RETURN pair[0] AS a, pair[1] AS b, min(r.weight) AS weight
+"""
+# title and smallest weight to $startID of every page of $ids
+_NEAREST_CYPHER = """
+UNWIND $ids AS id
+OPTIONAL MATCH (end:P {Id: id})
+OPTIONAL MATCH (start:P {Id: $startID})<-[r:D]->(end)
+RETURN id, end IS NULL AS missing,
+  CASE WHEN $zh THEN coalesce(end.zh_Title, end.Title) ELSE end.Title END AS title,
+  min(r.weight) AS weight
+"""
+# largest weight of an analogy window, related pages are below 1
+WEIGHT_CEILING = 0.9999
+# page ids, weights and page id -> title of the neighbors of a page
+AnalogyWindow = tuple[
+    NDArray[numpy.int64],
+    NDArray[Any],
+    Callable[[int], Optional[str]],
+]
+# page id, title and weight of a candidate, title and weight are None when
+# the page does not exist
+Nearest = tuple[int, Optional[str], Optional[float]]
 
 
 def contains_chinese(s):
@@ -19,7 +70,19 @@ def contains_chinese(s):
 
 
 @cache(expire=24 * 60 * 60)
-async def get_neo4j_relationships_weight(node_a, node_b, driver):
+async def get_neo4j_relationships_weight(
+    node_a: Any,
+    node_b: Any,
+    driver: NotKeyed[Any],
+) -> float:
+    """
+    Neo4j 中两个 page 的距离, 没有关系时为 1.
+
+    :param node_a: page id.
+    :param node_b: page id.
+    :param driver: neo4j async driver, not part of the cache key.
+    :return: 距离.
+    """
     async with driver.session(database="neo4j") as session:
         result = await session.run(
             "MATCH (start:P {Id: $source})<-[r:D]->(end:P {Id: $target})" "RETURN r",
@@ -32,6 +95,80 @@ async def get_neo4j_relationships_weight(node_a, node_b, driver):
     return 1
 
 
+def _end_title(end: Any, zh_flag: bool) -> Any:
+    if zh_flag and end.get("zh_Title"):
+        return end.get("zh_Title")
+    return end.get("Title")
+
+
+def _around(weight: float, spread: float) -> tuple[float, float]:
+    return max(weight - spread, 0), min(weight + spread, WEIGHT_CEILING)
+
+
+def _analogy_rows(
+    candidates: tuple[NDArray[Any], ...],
+    titles: Callable[[int], Optional[str]],
+) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": page,
+            "title": titles(page),
+            "weight_1": round(float(weight_b), 3),
+            "weight_2": round(float(weight_x), 3),
+            "score": round(float(score), 3),
+        }
+        for page, weight_b, weight_x, score in zip(
+            candidates[0].tolist(),
+            *candidates[1:],
+        )
+    ]
+
+
+def _pairs(page_ids: list[int]) -> list[list[int]]:
+    return [
+        [page_a_id, page_b_id]
+        for position, page_a_id in enumerate(page_ids)
+        for page_b_id in page_ids[position + 1 :]
+    ]
+
+
+def _symmetric_matrix(
+    page_ids: list[int],
+    records: list[Any],
+) -> NDArray[numpy.float32]:
+    positions = dict(zip(page_ids, range(len(page_ids))))
+    matrix = 1 - numpy.eye(len(page_ids), dtype=numpy.float32)
+    for record in records:
+        cell = (positions[record["a"]], positions[record["b"]])
+        matrix[cell] = record["weight"]
+        matrix[cell[::-1]] = record["weight"]
+    return matrix
+
+
+def _nearest_record(record: Any) -> Nearest:
+    if record["missing"]:
+        return record["id"], None, None
+    weight = record["weight"]
+    return record["id"], record["title"], 1 if weight is None else weight
+
+
+def _nearest_order(candidate: Nearest) -> tuple[bool, float, int]:
+    # by distance, missing pages last
+    weight = candidate[2]
+    return weight is None, weight or 0, candidate[0]
+
+
+def _nearest_rows(candidates: list[Nearest]) -> list[dict[str, Any]]:
+    return [
+        {
+            "id": candidate,
+            "title": title,
+            "weight": None if weight is None else round(weight, 3),
+        }
+        for candidate, title, weight in sorted(candidates, key=_nearest_order)
+    ]
+
+
 class GpcDAO:
     """
     GPC 测试代码，开发要求：
@@ -55,10 +192,32 @@ class GpcDAO:
         # pool=Depends(get_gpc_db_pool),
         es=Depends(get_wikipedia_es_client),
         neo4j_driver=Depends(get_neo4j_driver),
+        graph=Depends(get_gpc_graph),
     ):
         # self.pool = pool
         self.ES = es
         self.neo4j_driver = neo4j_driver
+        # CSRGraph snapshot, None when disabled; Neo4j answers for the pages
+        # it does not have
+        self.graph = graph
+
+    async def get_relationships_weight(self, page_a_id: Any, page_b_id: Any) -> float:
+        """
+        两个 page 的距离, 没有关系时为 1.
+
+        :param page_a_id: page id.
+        :param page_b_id: page id.
+        :return: 距离.
+        """
+        nodes = self._nodes(page_a_id, page_b_id)
+        if nodes is None:
+            return await get_neo4j_relationships_weight(
+                page_a_id,
+                page_b_id,
+                self.neo4j_driver,
+            )
+        weight = self.graph.weight(*nodes)
+        return 1 if weight is None else weight
 
     # async def test(self):
     #     result = []
@@ -98,7 +257,7 @@ class GpcDAO:
     #     result.append(ret)
     #     return result
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def query_suggestion_zh(self, query):
         """对于查询中包含中文字符的内容，使用中文查询"""
         logging.info("query: %s", query)
@@ -153,7 +312,7 @@ class GpcDAO:
 
         return ret_list
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def query_suggestion(self, query):
         logging.info("query: %s", query)
 
@@ -290,18 +449,34 @@ class GpcDAO:
     #             result.append(doc)
     #     return result
 
-    @cache(expire=60 * 60)
-    async def get_last_token_by_page_id(
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
+    async def get_last_token_by_page_id(  # noqa: WPS210, WPS211
         self,
         title,
         page_id,
         distanceStart,
         distanceEnd,
+        limit=None,
+        offset=0,
+        count_only=False,
     ):
+        """
+        距离在 [distanceStart, distanceEnd] 内的邻居, 按距离从小到大排序.
+
+        :param title: page 的标题, 中文标题时返回邻居的中文标题.
+        :param page_id: page id.
+        :param distanceStart: 最小距离.
+        :param distanceEnd: 最大距离.
+        :param limit: 最多返回的邻居数, None 时不限.
+        :param offset: 跳过的邻居数.
+        :param count_only: 只返回邻居数.
+        :return: [page_id, title, 邻居 id, 邻居标题, 距离] 列表,
+            count_only 时为 {"count": 邻居数}.
+        """
         # await self.test(page_a_id, page_b_id, page_x_id, floatRange)
 
         logging.info(
-            "get_last_token_by_page_id: %s,%s,%s,%s",
+            "get_last_token_by_page_id: %s,%s,%s,%s",  # noqa: WPS323
             title,
             page_id,
             distanceStart,
@@ -312,36 +487,47 @@ class GpcDAO:
         if contains_chinese(title):
             zh_flag = True
 
-        # 查询交集
-        # 找到集合1
-        query = """
-MATCH (start:P {Id: $startID})<-[r:D]->(end:P)
-WHERE r.weight >= $distanceStart AND r.weight <= $distanceEnd
-RETURN r,end
-ORDER BY r.weight ASC;
-"""
-        result_last_token_list = []
-        async with self.neo4j_driver.session(database="neo4j") as session:
-            result = await session.run(
-                query,
-                startID=int(page_id),
-                distanceStart=distanceStart,
-                distanceEnd=distanceEnd,
+        nodes = self._nodes(page_id)
+        if nodes is not None:
+            indices, weights = self.graph.neighbors_between(
+                nodes[0],
+                distanceStart,
+                distanceEnd,
             )
-            async for record in result:
-                node_id = record.get("end", {}).get("Id")
-                if zh_flag:
-                    node_title = record.get("end", {}).get("zh_Title")
-                    if not node_title:
-                        node_title = record.get("end", {}).get("Title")
-                else:
-                    node_title = record.get("end", {}).get("Title")
+            if count_only:
+                return {"count": len(indices)}
+            page = slice(offset, None if limit is None else offset + limit)
+            return [
+                [
+                    page_id,
+                    title,
+                    int(self.graph.ids[node]),
+                    self.graph.title(node, zh_flag),
+                    round(float(weight), 3),
+                ]
+                for node, weight in zip(indices[page], weights[page])
+            ]
 
-                weight = round(record.get("r", {}).get("weight"), 3)
-                doc = [page_id, title, node_id, node_title, weight]
-                result_last_token_list.append(doc)
+        window = {
+            "startID": int(page_id),
+            "distanceStart": distanceStart,
+            "distanceEnd": distanceEnd,
+        }
+        if count_only:
+            return {"count": await self._neo4j_neighbour_count(window)}
 
-        logging.info("result count :%s", len(result_last_token_list))
+        # 查询交集
+        # 找到集合1
+        result_last_token_list = [
+            [page_id, title, node_id, node_title, weight]
+            for node_id, node_title, weight in await self._neo4j_neighbours(
+                window,
+                zh_flag,
+                limit,
+                offset,
+            )
+        ]
+        logging.info("result count :%s", len(result_last_token_list))  # noqa: WPS323
         return result_last_token_list
 
     #         logging.info("page id: %s - %s - %s", page_id, distanceStart, distanceEnd)
@@ -398,11 +584,26 @@ ORDER BY r.weight ASC;
     #         return []
     #         # 反向查
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def get_two_token_by_page_id(self, page_a_id, page_b_id):
 
         logging.info("get_two_token_by_page_id: %s,%s", page_a_id, page_b_id)
 
+        nodes = self._nodes(page_a_id, page_b_id)
+        if nodes is not None:
+            start, end = nodes
+            indices, weights = self.graph.neighbors(start)
+            return [
+                [
+                    int(self.graph.ids[start]),
+                    self.graph.title(start),
+                    int(self.graph.ids[end]),
+                    self.graph.title(end),
+                    round(float(weight), 3),
+                ]
+                for weight in weights[indices == end]
+            ]
+
         # 查询交集
         # 找到集合1
         query = """
@@ -482,7 +683,7 @@ RETURN r,end,start
     #         # no answer
     #         return []
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def get_abxy_token_by_page_id_v0(
         self,
         page_a_id,
@@ -552,7 +753,7 @@ RETURN b3,r3,r4,a2 LIMIT 1000
             "data": ret,
         }
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def get_abxy_token_by_page_id_v1(
         self,
         page_a_id,
@@ -665,7 +866,105 @@ RETURN b3Set,r1Set,r2Set,a1,a2"""
         #     "data": ret
         # }
 
-    @cache(expire=60 * 60)
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
+    async def get_abxy_token_by_page_id_v3(  # noqa: WPS211
+        self,
+        page_a_id: Any,
+        page_b_id: Any,
+        page_x_id: Any,
+        float_range: float,
+        limit: Optional[int] = None,
+    ) -> dict[str, Any]:
+        """
+        A:B::X:Y, 按偏差从小到大返回 Y.
+
+        :param page_a_id: A 的 page id.
+        :param page_b_id: B 的 page id.
+        :param page_x_id: X 的 page id.
+        :param float_range: Y 到 B, X 的距离与 d2, d1 的最大偏差.
+        :param limit: 最多返回的 Y 数, None 时不限.
+        :return: d1 = w(a, b), d2 = w(a, x) 和最好的 limit 个 Y.
+        """
+        logging.info(
+            "page id: %s,%s,%s",  # noqa: WPS323
+            page_a_id,
+            page_b_id,
+            page_x_id,
+        )
+        d1, d2 = await asyncio.gather(
+            self.get_relationships_weight(page_a_id, page_b_id),
+            self.get_relationships_weight(page_a_id, page_x_id),
+        )
+        data = []
+        if d1 < 1 and d2 < 1:
+            data = await self._analogies(
+                page_a_id,
+                page_b_id,
+                page_x_id,
+                d1,
+                d2,
+                float_range,
+                limit,
+            )
+        return {
+            "d1": round(d1, 3),
+            "d2": round(d2, 3),
+            "data": data,
+        }
+
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
+    async def get_distance_matrix(
+        self,
+        page_ids: Unordered[int],
+    ) -> dict[str, Any]:
+        """
+        Page 两两之间的距离, 没有关系时为 1.
+
+        Page 按 id 排序去重, 与缓存 key 一致.
+
+        :param page_ids: page ids.
+        :return: 排序去重的 page ids 和距离矩阵.
+        """
+        page_ids = sorted({int(page_id) for page_id in page_ids})
+        nodes = self._nodes(*page_ids)
+        if nodes is None:
+            matrix = await self._neo4j_distance_matrix(page_ids)
+        else:
+            matrix = self.graph.distance_matrix(nodes)
+        return {
+            "ids": page_ids,
+            "matrix": matrix.astype(numpy.float64).round(3).tolist(),
+        }
+
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
+    async def get_nearest_in_set(
+        self,
+        page_id: Any,
+        candidate_ids: Unordered[int],
+        zh: bool = False,
+    ) -> list[dict[str, Any]]:
+        """
+        一组 page 中与 page_id 最近的, 按距离从小到大排序, 没有关系时距离为 1.
+
+        不存在的 page 排在最后, 标题和距离为 None.
+
+        :param page_id: page id.
+        :param candidate_ids: 候选 page ids.
+        :param zh: 优先返回中文标题.
+        :return: 候选 page 的 id, 标题和距离.
+        """
+        candidate_ids = sorted({int(candidate) for candidate in candidate_ids})
+        candidate_ids = [
+            candidate for candidate in candidate_ids if candidate != int(page_id)
+        ]
+        start = self._nodes(page_id)
+        if start is None:
+            candidates = await self._neo4j_nearest(page_id, candidate_ids, zh)
+        else:
+            candidates = self._graph_nearest(start[0], candidate_ids, zh)
+        return _nearest_rows(candidates)
+
+    @cache(expire=24 * 60 * 60, soft_expire=60 * 60)
     async def get_abxy_token_by_page_id_v2(
         self,
         page_a_id,
@@ -675,17 +974,8 @@ RETURN b3Set,r1Set,r2Set,a1,a2"""
     ):
         start_time = time.time()
         logging.info("page id: %s,%s,%s", page_a_id, page_b_id, page_x_id)
-        except_id_set = set([int(page_a_id), int(page_b_id), int(page_x_id)])
-        d1 = await get_neo4j_relationships_weight(
-            page_a_id,
-            page_b_id,
-            self.neo4j_driver,
-        )
-        d2 = await get_neo4j_relationships_weight(
-            page_a_id,
-            page_x_id,
-            self.neo4j_driver,
-        )
+        d1 = await self.get_relationships_weight(page_a_id, page_b_id)
+        d2 = await self.get_relationships_weight(page_a_id, page_x_id)
 
         if d1 >= 1 or d2 >= 1:
             return {
@@ -694,73 +984,186 @@ RETURN b3Set,r1Set,r2Set,a1,a2"""
                 "data": [],
             }
 
-        query = """MATCH (a1:P)<-[r1:D]->(b1:P)
-WHERE a1.Id = $a1_ID AND r1.weight >= $r1_weight_min AND r1.weight <= $r1_weight_max
-WITH collect(b1) AS b1Set,collect(r1) AS r1Set, a1
+        candidates = await self._analogies(
+            page_a_id,
+            page_b_id,
+            page_x_id,
+            d1,
+            d2,
+            floatRange,
+        )
+        logging.info(f"Execution time: {time.time()-start_time} seconds")
+        return {
+            "d1": round(d1, 3),
+            "d2": round(d2, 3),
+            "data": [
+                {
+                    "weight_1": candidate["weight_1"],
+                    "weight_2": candidate["weight_2"],
+                    "title": candidate["title"],
+                }
+                for candidate in candidates
+            ],
+        }
 
-MATCH (a2:P)<-[r2:D]->(b2:P)
-WHERE a2.Id = $a2_ID AND r2.weight >=  $r2_weight_min AND r2.weight <= $r2_weight_max
-WITH b1Set, collect(b2) AS b2Set,collect(r2) AS r2Set, a1,a2, r1Set
-WITH [n IN b1Set WHERE n IN b2Set] AS b3Set, r1Set, r2Set, a1, a2
+    def _nodes(self, *page_ids: Any) -> Optional[list[int]]:
+        """
+        Snapshot 中 page 的节点.
 
-UNWIND r1Set as r
-WITH r2Set,b3Set,
-CASE
-  WHEN endNode(r) IN b3Set THEN {weight: r.weight, Title: endNode(r).Title, Id: endNode(r).Id}
-  WHEN startNode(r) IN b3Set THEN {weight: r.weight,Title: startNode(r).Title, Id: endNode(r).Id}
-END AS result1
-WHERE result1 IS NOT null
-WITH collect(result1) as distance_1,r2Set,b3Set
-
-UNWIND r2Set as r
-WITH distance_1,
-CASE
-  WHEN endNode(r) IN b3Set THEN {weight: r.weight,Title: endNode(r).Title, Id: endNode(r).Id}
-  WHEN startNode(r) IN b3Set THEN {weight: r.weight,Title: startNode(r).Title, Id: endNode(r).Id}
-END AS result2
-WHERE result2 IS NOT null
-WITH collect(result2) as distance_2,distance_1
-RETURN distance_2,distance_1
-"""
+        :param page_ids: page ids.
+        :return: 节点, 有一个 page 不在 snapshot 中时为 None.
+        """
+        if self.graph is None:
+            return None
+        nodes = [self.graph.node(page_id) for page_id in page_ids]
+        if None in nodes:
+            return None
+        return nodes
+
+    async def _neo4j_neighbour_count(self, window: dict[str, Any]) -> int:
         async with self.neo4j_driver.session(database="neo4j") as session:
-            result = await session.run(
-                query,
-                a1_ID=int(page_b_id),
-                r1_weight_min=max(d2 - floatRange, 0),
-                r1_weight_max=min(d2 + floatRange, 0.9999),
-                a2_ID=int(page_x_id),
-                r2_weight_min=max(d1 - floatRange, 0),
-                r2_weight_max=min(d1 + floatRange, 0.9999),
-            )
+            result = await session.run(_NEIGHBOUR_COUNT_CYPHER, **window)
+            record = await result.single()
+        return record["count"]
 
-            result_dict = {}
-            async for record in result:
-                distance_2 = record.get("distance_2")
-                distance_1 = record.get("distance_1")
+    async def _neo4j_neighbours(
+        self,
+        window: dict[str, Any],
+        zh_flag: bool,
+        limit: Optional[int],
+        offset: int,
+    ) -> list[tuple[Any, Any, float]]:
+        query = _NEIGHBOURS_CYPHER
+        if limit is not None:
+            query = _NEIGHBOURS_PAGE_CYPHER
+        async with self.neo4j_driver.session(database="neo4j") as session:
+            result = await session.run(query, offset=offset, limit=limit, **window)
+            return [
+                (
+                    record.get("end", {}).get("Id"),
+                    _end_title(record.get("end", {}), zh_flag),
+                    round(record.get("r", {}).get("weight"), 3),
+                )
+                async for record in result
+            ]
 
-                for item in distance_1:
-                    if item.get("Id") in except_id_set:
-                        continue
+    async def _analogy_window(
+        self,
+        page_id: Any,
+        low: float,
+        high: float,
+    ) -> AnalogyWindow:
+        """
+        Page 距离在 [low, high] 内的邻居.
 
-                    key = item.get("Title")
-                    result_dict[key] = {
-                        "weight_1": round(item.get("weight"), 3),
-                        "weight_2": 0,
-                        "title": key,
-                    }
+        :param page_id: page id.
+        :param low: 最小距离.
+        :param high: 最大距离.
+        :return: page ids, 距离, page id -> 标题.
+        """
+        nodes = self._nodes(page_id)
+        if nodes is None:
+            return await self._neo4j_window(page_id, low, high)
+        indices, weights = self.graph.neighbors_between(nodes[0], low, high)
+        return self.graph.ids[indices], weights, self._graph_title
 
-                for item in distance_2:
+    async def _neo4j_window(
+        self,
+        page_id: Any,
+        low: float,
+        high: float,
+    ) -> AnalogyWindow:
+        async with self.neo4j_driver.session(database="neo4j") as session:
+            result = await session.run(
+                _WINDOW_CYPHER,
+                startID=int(page_id),
+                low=low,
+                high=high,
+            )
+            records = [record async for record in result]
+        return (
+            numpy.array([record["id"] for record in records], dtype=numpy.int64),
+            numpy.array([record["weight"] for record in records]),
+            {record["id"]: record["title"] for record in records}.get,
+        )
 
-                    if item.get("Id") in except_id_set:
-                        continue
+    def _graph_title(self, page_id: int) -> Optional[str]:
+        return self.graph.title(self.graph.node(page_id))
 
-                    key = item.get("Title")
-                    if key in result_dict:
-                        result_dict[key]["weight_2"] = round(item.get("weight"), 3)
+    async def _analogies(  # noqa: WPS211
+        self,
+        page_a_id: Any,
+        page_b_id: Any,
+        page_x_id: Any,
+        d1: float,
+        d2: float,
+        float_range: float,
+        limit: Optional[int] = None,
+    ) -> list[dict[str, Any]]:
+        """
+        A:B::X:Y 的候选 Y, 按与 d2, d1 的偏差排序, 见 analogies.
+
+        候选 Y 是 b 在 d2 附近的邻居与 x 在 d1 附近的邻居的交集.
+
+        :param page_a_id: A 的 page id.
+        :param page_b_id: B 的 page id.
+        :param page_x_id: X 的 page id.
+        :param d1: w(a, b).
+        :param d2: w(a, x).
+        :param float_range: Y 到 B, X 的距离与 d2, d1 的最大偏差.
+        :param limit: 最多返回的 Y 数, None 时不限.
+        :return: Y 的 id, 标题, 到 B, X 的距离和偏差.
+        """
+        b_window, x_window = await asyncio.gather(
+            self._analogy_window(page_b_id, *_around(d2, float_range)),
+            self._analogy_window(page_x_id, *_around(d1, float_range)),
+        )
+        candidates = analogies(
+            b_window[:2],
+            x_window[:2],
+            d1,
+            d2,
+            exclude=(int(page_a_id), int(page_b_id), int(page_x_id)),
+            limit=limit,
+        )
+        return _analogy_rows(candidates, titles=b_window[2])
 
-            logging.info(f"Execution time: {time.time()-start_time} seconds")
-            return {
-                "d1": round(d1, 3),
-                "d2": round(d2, 3),
-                "data": list(result_dict.values()),
-            }
+    async def _neo4j_distance_matrix(
+        self,
+        page_ids: list[int],
+    ) -> NDArray[numpy.float32]:
+        async with self.neo4j_driver.session(database="neo4j") as session:
+            result = await session.run(_DISTANCE_CYPHER, pairs=_pairs(page_ids))
+            records = [record async for record in result]
+        return _symmetric_matrix(page_ids, records)
+
+    def _graph_nearest(
+        self,
+        start: int,
+        candidate_ids: list[int],
+        zh: bool,
+    ) -> list[Nearest]:
+        nodes = [self.graph.node(candidate) for candidate in candidate_ids]
+        found = [node for node in nodes if node is not None]
+        weights = iter(self.graph.distances(start, found).tolist())
+        return [
+            (candidate, None, None)
+            if node is None
+            else (candidate, self.graph.title(node, zh=zh), next(weights))
+            for candidate, node in zip(candidate_ids, nodes)
+        ]
+
+    async def _neo4j_nearest(
+        self,
+        page_id: Any,
+        candidate_ids: list[int],
+        zh: bool,
+    ) -> list[Nearest]:
+        async with self.neo4j_driver.session(database="neo4j") as session:
+            result = await session.run(
+                _NEAREST_CYPHER,
+                startID=int(page_id),
+                ids=candidate_ids,
+                zh=zh,
+            )
+            return [_nearest_record(record) async for record in result]
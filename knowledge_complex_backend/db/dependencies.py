@@ -1,5 +1,15 @@
+from typing import Any, Awaitable, Callable, Optional
+
 from starlette.requests import Request
 
+from knowledge_complex_backend.db.category_index import CategoryIndex
+from knowledge_complex_backend.db.cube import PaperCube
+from knowledge_complex_backend.db.gpc_graph import CSRGraph
+from knowledge_complex_backend.db.patent_store import PatentSeriesTable
+from knowledge_complex_backend.db.pool import current_pool_group
+from knowledge_complex_backend.rollup import RollupCatalog
+from knowledge_complex_backend.services.complexity.proximity import ProximityMatrix
+
 
 async def get_db_pool(
     request: Request,
@@ -19,6 +29,92 @@ async def get_db_pool(
     #     await session.close()
 
 
+def pool_group(name: str) -> Callable[[], Awaitable[None]]:
+    """
+    Route dependency charging the connections of a request to a group.
+
+    :param name: group name, see ``db_pool_budgets``.
+    :return: dependency setting the group of the current request.
+    """
+
+    async def _set_pool_group() -> None:  # noqa: WPS430
+        current_pool_group.set(name)
+
+    return _set_pool_group
+
+
+async def get_read_db_pool(
+    request: Request,
+) -> Any:
+    """
+    Get the pool of the read-only queries.
+
+    :param request: current request.
+    :return: pool routing over the replicas, the main pool without replicas.
+    """
+    return request.app.state.mysql_read_pool
+
+
+async def get_paper_cubes(
+    request: Request,
+) -> dict[str, PaperCube]:
+    """
+    Get the in-memory paper cubes.
+
+    :param request: current request.
+    :return: cubes keyed by flow, empty when the cube is disabled.
+    """
+    return request.app.state.paper_cubes
+
+
+async def get_category_index(
+    request: Request,
+) -> CategoryIndex:
+    """
+    Get the in-memory category hierarchy.
+
+    :param request: current request.
+    :return: latest loaded CategoryIndex.
+    """
+    return request.app.state.category_index
+
+
+async def get_patent_store(
+    request: Request,
+) -> dict[str, PatentSeriesTable]:
+    """
+    Get the decoded patent time series.
+
+    :param request: current request.
+    :return: tables keyed by name, empty when the store is disabled.
+    """
+    return request.app.state.patent_store
+
+
+async def get_rollups(
+    request: Request,
+) -> RollupCatalog:
+    """
+    Get the up to date rollup tables.
+
+    :param request: current request.
+    :return: RollupCatalog, empty when the rollups are disabled.
+    """
+    return request.app.state.rollups
+
+
+async def get_proximity(
+    request: Request,
+) -> dict[str, ProximityMatrix]:
+    """
+    Get the precomputed category proximities.
+
+    :param request: current request.
+    :return: ProximityMatrix keyed by dataset, empty when disabled.
+    """
+    return request.app.state.proximity
+
+
 # async def get_gpc_db_pool(
 #     request: Request,
 # ) -> any:
@@ -55,5 +151,17 @@ async def get_neo4j_driver(
     return request.app.state.neo4j_driver
 
 
+async def get_gpc_graph(
+    request: Request,
+) -> Optional[CSRGraph]:
+    """
+    Get the in-process GPC graph.
+
+    :param request: current request.
+    :return: CSRGraph, None when no snapshot is configured.
+    """
+    return request.app.state.gpc_graph
+
+
 async def get_mongodb_database(request: Request) -> any:
     return request.app.state.mongo_database
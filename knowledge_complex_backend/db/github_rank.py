@@ -0,0 +1,183 @@
+import logging
+from typing import Any, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+GITHUB_START_YEAR = 2008
+GITHUB_END_YEAR = 2023
+# one snapshot per year, taken in the first quarter
+GITHUB_QUARTERS = [
+    f"{year}Q1" for year in range(GITHUB_START_YEAR, GITHUB_END_YEAR + 1)
+]
+
+_QUARTER_CODES = {quarter: code for code, quarter in enumerate(GITHUB_QUARTERS)}
+
+# rank given to the quarters an entity has no row for
+MISSING_RANK = 9999
+# tags ranked below it in at least one quarter are the ones served
+GITHUB_TOP_RANK = 50
+
+# entity and value columns of the rank tables
+_RANK_COLUMNS = {
+    "rank_github_eci": {"entity": "country", "value": "eci"},
+    "rank_github_pci": {"entity": "cat", "value": "pci"},
+}
+_RANK_SQL = """
+SELECT c.year, c.{entity}, c.{value}, c.rank
+FROM {table} as c
+WHERE c.year IN %s AND c.filter_cat = %s;
+"""  # noqa: WPS323
+_FILTER_CATS_SQL = """
+SELECT DISTINCT c.filter_cat FROM rank_github_eci as c
+UNION
+SELECT DISTINCT c.filter_cat FROM rank_github_pci as c;
+"""
+
+
+def _cell_index(
+    rows: Sequence[Sequence[Any]],
+    entities: Sequence[Any],
+) -> tuple[NDArray[numpy.int64], NDArray[numpy.int64]]:
+    """
+    Matrix cells of ``(quarter, entity, ...)`` rows.
+
+    :param rows: rows of ``GITHUB_QUARTERS``.
+    :param entities: entities of the matrix rows.
+    :return: entity codes and quarter codes of the rows.
+    """
+    entity_codes = {entity: code for code, entity in enumerate(entities)}
+    row_entities = (entity_codes[row[1]] for row in rows)
+    row_quarters = (_QUARTER_CODES[row[0]] for row in rows)
+    return (
+        numpy.fromiter(row_entities, dtype=numpy.int64),
+        numpy.fromiter(row_quarters, dtype=numpy.int64),
+    )
+
+
+class GithubRank:
+    """
+    One ``rank_github_*`` table for one ``filter_cat``, entity × quarter.
+
+    Entities (countries or tags) keep the order of their first row, the
+    quarters are ``GITHUB_QUARTERS``.
+    """
+
+    def __init__(
+        self,
+        entities: NDArray[numpy.object_],
+        values: NDArray[numpy.float64],
+        ranks: NDArray[numpy.int64],
+        present: NDArray[numpy.bool_],
+    ) -> None:
+        self.entities = entities
+        self.values = values
+        self.ranks = ranks
+        self.present = present
+
+    @classmethod
+    def from_rows(  # noqa: WPS210
+        cls,
+        rows: Sequence[Sequence[Any]],
+    ) -> "GithubRank":
+        """
+        Build the matrices from ``(quarter, entity, value, rank)`` rows.
+
+        :param rows: table rows, quarters outside ``GITHUB_QUARTERS`` are
+            ignored.
+        :return: matrices of the rows.
+        """
+        rows = [row for row in rows if row[0] in _QUARTER_CODES]
+        entities = list(dict.fromkeys(row[1] for row in rows))
+        shape = (len(entities), len(GITHUB_QUARTERS))
+        values = numpy.zeros(shape, dtype=numpy.float64)
+        ranks = numpy.full(shape, MISSING_RANK, dtype=numpy.int64)
+        present = numpy.zeros(shape, dtype=bool)
+        if rows:
+            index = _cell_index(rows, entities)
+            values[index] = [row[2] for row in rows]
+            ranks[index] = [row[3] for row in rows]
+            present[index] = True
+        return cls(numpy.array(entities, dtype=object), values, ranks, present)
+
+    def top(self, limit: int) -> NDArray[numpy.intp]:
+        """
+        Entities ranked below ``limit`` in at least one quarter.
+
+        :param limit: rank limit, exclusive.
+        :return: entity codes in table order.
+        """
+        return numpy.flatnonzero((self.ranks < limit).any(axis=1))
+
+    def by_last_quarter(self, codes: NDArray[numpy.intp]) -> NDArray[numpy.intp]:
+        """
+        Order entities by their value in the last quarter, highest first.
+
+        Entities without a row in the last quarter come last, ties keep
+        their order.
+
+        :param codes: entity codes.
+        :return: reordered entity codes.
+        """
+        last = numpy.where(
+            self.present[codes, -1],
+            self.values[codes, -1],
+            -numpy.inf,
+        )
+        return codes[numpy.argsort(-last, kind="stable")]
+
+    def response(self, codes: NDArray[numpy.intp], digits: int) -> dict[str, Any]:
+        """
+        Series of the given entities as served by the GitHub endpoints.
+
+        :param codes: entity codes, in response order.
+        :param digits: decimals of the values.
+        :return: legend, years, ranks and values.
+        """
+        return {
+            "legend": self.entities[codes].tolist(),
+            "year": list(range(GITHUB_START_YEAR, GITHUB_END_YEAR + 1)),
+            "rank": self.ranks[codes].tolist(),
+            "data": self.values[codes].round(digits).tolist(),
+        }
+
+
+async def load_github_rank(pool: Any, table_name: str, filter_cat: int) -> GithubRank:
+    """
+    Read one ``filter_cat`` of a GitHub rank table.
+
+    Not memoized: the endpoints are cached, and their refreshes must read
+    the table as it is now.
+
+    :param pool: aiomysql pool.
+    :param table_name: rank_github_eci or rank_github_pci.
+    :param filter_cat: filter category.
+    :return: entity × quarter matrices.
+    """
+    sql = _RANK_SQL.format(table=table_name, **_RANK_COLUMNS[table_name])
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await cur.execute(sql, (GITHUB_QUARTERS, filter_cat))
+        rows = await cur.fetchall()
+    rank = GithubRank.from_rows(rows)
+    logging.info(
+        "%s filter_cat=%s: %s entities",  # noqa: WPS323
+        table_name,
+        filter_cat,
+        len(rank.entities),
+    )
+    return rank
+
+
+async def load_github_filter_cats(pool: Any) -> list[int]:
+    """
+    Filter categories of the GitHub rank tables.
+
+    :param pool: aiomysql pool.
+    :return: sorted filter categories.
+    """
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await cur.execute(_FILTER_CATS_SQL)
+        rows = await cur.fetchall()
+    return sorted(int(row[0]) for row in rows)
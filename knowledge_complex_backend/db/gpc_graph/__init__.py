@@ -0,0 +1,10 @@
+"""In-process copy of the GPC semantic distance graph."""
+from knowledge_complex_backend.db.gpc_graph.analogy import analogies
+from knowledge_complex_backend.db.gpc_graph.csr import CSRGraph
+from knowledge_complex_backend.db.gpc_graph.export import export_snapshot
+
+__all__ = [
+    "CSRGraph",
+    "analogies",
+    "export_snapshot",
+]
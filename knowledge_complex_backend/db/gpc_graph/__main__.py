@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+import neo4j
+
+from knowledge_complex_backend.db.gpc_graph.export import export_snapshot
+from knowledge_complex_backend.settings import settings
+
+
+async def run(path: Path) -> None:
+    """
+    Export the configured Neo4j graph to ``path``.
+
+    :param path: path prefix of the snapshot files.
+    """
+    driver = neo4j.AsyncGraphDatabase.driver(
+        settings.neo4j_url,
+        auth=(settings.neo4j_user, settings.neo4j_password),
+    )
+    try:  # noqa: WPS501
+        graph = await export_snapshot(driver, path)
+    finally:
+        await driver.close()
+    logging.info("gpc graph snapshot: %s bytes", graph.nbytes)  # noqa: WPS323
+
+
+def main() -> None:
+    """Entrypoint of the snapshot exporter."""
+    parser = argparse.ArgumentParser(
+        prog="python -m knowledge_complex_backend.db.gpc_graph",
+        description="Export the GPC graph of Neo4j to a memory-mapped snapshot.",
+    )
+    parser.add_argument(
+        "path",
+        type=Path,
+        nargs="?",
+        default=settings.gpc_graph_snapshot,
+        help="path prefix of the snapshot files, gpc_graph_snapshot by default",
+    )
+    args = parser.parse_args()
+    if args.path is None:
+        parser.error("no snapshot path")
+    logging.basicConfig(level=settings.log_level.value)
+    asyncio.run(run(args.path))
+
+
+if __name__ == "__main__":
+    main()
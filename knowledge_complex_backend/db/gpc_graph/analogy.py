@@ -0,0 +1,101 @@
+from typing import Any, Iterable, Optional
+
+import numpy
+from numpy.typing import NDArray
+
+# page ids and weights of the neighbors of a page
+Window = tuple[NDArray[Any], NDArray[Any]]
+# page ids in both windows, their weights to B and to X
+Matches = tuple[
+    NDArray[numpy.int64],
+    NDArray[numpy.float64],
+    NDArray[numpy.float64],
+]
+# page ids, weights to B, weights to X and scores of analogy candidates
+Candidates = tuple[
+    NDArray[numpy.int64],
+    NDArray[numpy.float64],
+    NDArray[numpy.float64],
+    NDArray[numpy.float64],
+]
+
+
+def unique_window(
+    ids: NDArray[Any],
+    weights: NDArray[Any],
+) -> tuple[NDArray[numpy.int64], NDArray[numpy.float64]]:
+    """
+    Sort a neighbor window by page id, one entry per page.
+
+    :param ids: page ids of the window.
+    :param weights: their weights.
+    :return: unique sorted page ids and the smallest weight of each.
+    """
+    page_ids = numpy.asarray(ids, dtype=numpy.int64)
+    page_weights = numpy.asarray(weights, dtype=numpy.float64)
+    # by page id, then weight: the first entry of a page has its smallest weight
+    order = numpy.lexsort((page_weights, page_ids))
+    unique_ids, first = numpy.unique(page_ids[order], return_index=True)
+    return unique_ids, page_weights[order][first]
+
+
+def analogies(  # noqa: WPS211
+    b_window: Window,
+    x_window: Window,
+    d1: float,
+    d2: float,
+    exclude: Iterable[int] = (),
+    limit: Optional[int] = None,
+) -> Candidates:
+    """
+    Candidates Y of ``A:B::X:Y``.
+
+    Y is a neighbor of B at about ``d2 = w(A, X)`` and of X at about
+    ``d1 = w(A, B)``: the two windows are intersected on their sorted page
+    ids. Candidates are scored by ``|w(B, Y) - d2| + |w(X, Y) - d1|``,
+    0 for a perfect parallelogram.
+
+    :param b_window: page ids and weights of the neighbors of B.
+    :param x_window: page ids and weights of the neighbors of X.
+    :param d1: weight of A-B.
+    :param d2: weight of A-X.
+    :param exclude: page ids that can not be a candidate (A, B, X).
+    :param limit: number of candidates, all of them by default.
+    :return: page ids, weights to B, weights to X and scores of the
+        candidates, best first.
+    """
+    ids, to_b, to_x = _intersect(b_window, x_window, exclude)
+    scores = numpy.abs(to_b - d2)
+    scores += numpy.abs(to_x - d1)
+    order = _best(ids, scores, limit)
+    return ids[order], to_b[order], to_x[order], scores[order]
+
+
+def _intersect(  # noqa: WPS210
+    b_window: Window,
+    x_window: Window,
+    exclude: Iterable[int],
+) -> Matches:
+    b_ids, b_weights = unique_window(*b_window)
+    x_ids, x_weights = unique_window(*x_window)
+    ids, b_positions, x_positions = numpy.intersect1d(
+        b_ids,
+        x_ids,
+        assume_unique=True,
+        return_indices=True,
+    )
+    keep = ~numpy.isin(ids, numpy.fromiter(exclude, dtype=numpy.int64))
+    to_b = b_weights[b_positions[keep]]
+    to_x = x_weights[x_positions[keep]]
+    return ids[keep], to_b, to_x
+
+
+def _best(
+    ids: NDArray[numpy.int64],
+    scores: NDArray[numpy.float64],
+    limit: Optional[int],
+) -> NDArray[numpy.int64]:
+    order = numpy.arange(len(ids))
+    if limit is not None and limit < len(ids):
+        order = numpy.argpartition(scores, limit - 1)[:limit]
+    return order[numpy.lexsort((ids[order], scores[order]))]
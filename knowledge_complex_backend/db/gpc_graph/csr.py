@@ -0,0 +1,346 @@
+import json
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+# array name -> dtype of the snapshot sidecars
+_ARRAYS = {
+    "ids": numpy.int64,
+    "indptr": numpy.int64,
+    "indices": numpy.int32,
+    "weights": numpy.float32,
+    "title_offsets": numpy.int64,
+    "titles": numpy.uint8,
+    "zh_title_offsets": numpy.int64,
+    "zh_titles": numpy.uint8,
+}
+
+# start node, end node and weight of the entries of both ends of every
+# relationship
+Entries = tuple[
+    NDArray[numpy.int64],
+    NDArray[numpy.int32],
+    NDArray[numpy.float32],
+]
+
+# sorted positions of searched values, and whether they were found
+Search = tuple[NDArray[numpy.intp], NDArray[numpy.bool_]]
+
+
+def _encode_titles(
+    titles: Sequence[Optional[str]],
+) -> tuple[NDArray[numpy.int64], NDArray[numpy.uint8]]:
+    encoded = [(title or "").encode() for title in titles]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    sizes = [len(title) for title in encoded]
+    numpy.cumsum(sizes, out=offsets[1:])
+    return offsets, numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8)
+
+
+class CSRGraph:
+    """
+    The ``(:P)-[:D {weight}]-(:P)`` graph of the GPC semantic distances.
+
+    Pages are numbered by increasing page id, ``ids[node]`` is the page id
+    of a node. The neighbors of ``node`` are
+    ``indices[indptr[node]:indptr[node + 1]]`` (int32 nodes) with their
+    float32 ``weights``, sorted by increasing weight. Every relationship is
+    stored in the lists of both of its ends, like Neo4j matches
+    ``(a)<-[r:D]->(b)`` from either side.
+
+    Titles are UTF-8 bytes cut by offsets, decoded on demand.
+    """
+
+    def __init__(self, arrays: dict[str, NDArray[Any]]) -> None:
+        self.arrays = arrays
+        self.ids: NDArray[numpy.int64] = arrays["ids"]
+        self.indptr: NDArray[numpy.int64] = arrays["indptr"]
+        self.indices: NDArray[numpy.int32] = arrays["indices"]
+        self.weights: NDArray[numpy.float32] = arrays["weights"]
+
+    @classmethod
+    def build(  # noqa: WPS211
+        cls,
+        ids: Sequence[int],
+        titles: Sequence[Optional[str]],
+        zh_titles: Sequence[Optional[str]],
+        sources: Sequence[int],
+        targets: Sequence[int],
+        weights: Sequence[float],
+    ) -> "CSRGraph":
+        """
+        Build the graph from its pages and relationships.
+
+        Relationships with an unknown end are dropped.
+
+        :param ids: page ids.
+        :param titles: ``Title`` of every page.
+        :param zh_titles: ``zh_Title`` of every page, None when missing.
+        :param sources: page id of the start of every relationship.
+        :param targets: page id of the end of every relationship.
+        :param weights: weight of every relationship.
+        :return: graph.
+        """
+        page_ids = numpy.asarray(ids, dtype=numpy.int64)
+        pages = numpy.argsort(page_ids, kind="stable")
+        page_ids = page_ids[pages]
+        entries = _entries(page_ids, sources, targets, weights)
+        return cls(
+            {
+                "ids": page_ids,
+                **_adjacency(entries, len(page_ids)),
+                **_title_arrays("title", titles, pages),
+                **_title_arrays("zh_title", zh_titles, pages),
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        """
+        Write the graph as ``.npy`` sidecars next to a JSON header.
+
+        :param path: path prefix of the snapshot files.
+        """
+        for name in _ARRAYS:
+            numpy.save(_sidecar(path, name), self.arrays[name])
+        edges = int(self.indptr[-1])
+        header = {"nodes": len(self), "edges": edges}
+        path.with_suffix(".json").write_text(json.dumps(header))
+
+    @classmethod
+    def open(cls, path: Path) -> "CSRGraph":
+        """
+        Memory-map a snapshot written by ``save``.
+
+        :param path: path prefix of the snapshot files.
+        :return: graph, paged in by the OS as it is read.
+        """
+        return cls(
+            {name: numpy.load(_sidecar(path, name), mmap_mode="r") for name in _ARRAYS},
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the snapshot.
+
+        :return: bytes of every array.
+        """
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def node(self, page_id: Any) -> Optional[int]:
+        """
+        Node of a page.
+
+        :param page_id: page id.
+        :return: node, None for a page missing from the snapshot.
+        """
+        page_id = int(page_id)
+        node = int(numpy.searchsorted(self.ids, page_id))
+        if node < len(self.ids) and self.ids[node] == page_id:
+            return node
+        return None
+
+    def neighbors(
+        self,
+        node: int,
+    ) -> tuple[NDArray[numpy.int32], NDArray[numpy.float32]]:
+        """
+        Neighbors of a node.
+
+        :param node: node.
+        :return: neighbor nodes and weights, by increasing weight.
+        """
+        row = slice(self.indptr[node], self.indptr[node + 1])
+        return self.indices[row], self.weights[row]
+
+    def neighbors_between(
+        self,
+        node: int,
+        low: float,
+        high: float,
+    ) -> tuple[NDArray[numpy.int32], NDArray[numpy.float32]]:
+        """
+        Neighbors of a node with a weight within ``[low, high]``.
+
+        Two binary searches on the sorted weights of the node, the result is
+        a view of the snapshot.
+
+        :param node: node.
+        :param low: smallest weight.
+        :param high: largest weight.
+        :return: neighbor nodes and weights, by increasing weight.
+        """
+        indices, weights = self.neighbors(node)
+        first = numpy.searchsorted(weights, numpy.float32(low), side="left")
+        last = numpy.searchsorted(weights, numpy.float32(high), side="right")
+        return indices[first:last], weights[first:last]
+
+    def weight(self, node_a: int, node_b: int) -> Optional[float]:
+        """
+        Weight of the relationship between two nodes.
+
+        :param node_a: node.
+        :param node_b: node.
+        :return: smallest weight between them, None when not related.
+        """
+        indices, weights = self.neighbors(node_a)
+        hits = numpy.flatnonzero(indices == node_b)
+        if not len(hits):
+            return None
+        return float(weights[hits[0]])
+
+    def distances(
+        self,
+        node: int,
+        others: Sequence[int],
+    ) -> NDArray[numpy.float32]:
+        """
+        Weights from one node to a set of nodes.
+
+        :param node: node.
+        :param others: nodes.
+        :return: float32 weights in the order of ``others``, the smallest
+            one of every related node and 1 for the unrelated ones.
+        """
+        neighbors, weights = self._closest(node)
+        positions, hit = _search(neighbors, numpy.asarray(others, dtype=numpy.int64))
+        result = numpy.ones(len(hit), dtype=numpy.float32)
+        result[hit] = weights[positions[hit]]
+        return result
+
+    def distance_matrix(self, nodes: Sequence[int]) -> NDArray[numpy.float32]:
+        """
+        Weights among a set of nodes.
+
+        The neighbor lists of the nodes are gathered at once and their
+        entries matched against the set with a binary search.
+
+        :param nodes: nodes.
+        :return: float32 matrix in the order of ``nodes``, the smallest
+            weight of every related pair, 1 for unrelated ones and 0 on the
+            diagonal.
+        """
+        set_nodes = numpy.asarray(nodes, dtype=numpy.int64)
+        rows, entries = self._gather(set_nodes)
+        columns, hit = _find(set_nodes, self.indices[entries])
+        return _min_matrix(
+            len(set_nodes),
+            cells=(rows[hit], columns),
+            weights=self.weights[entries[hit]],
+        )
+
+    def title(self, node: int, zh: bool = False) -> str:
+        """
+        Title of a node.
+
+        :param node: node.
+        :param zh: prefer ``zh_Title``, falling back to ``Title``.
+        :return: title.
+        """
+        if zh:
+            start, end = self.arrays["zh_title_offsets"][node : node + 2]
+            if end > start:
+                return bytes(self.arrays["zh_titles"][start:end]).decode()
+        start, end = self.arrays["title_offsets"][node : node + 2]
+        return bytes(self.arrays["titles"][start:end]).decode()
+
+    def _closest(
+        self,
+        node: int,
+    ) -> tuple[NDArray[numpy.int32], NDArray[numpy.float32]]:
+        indices, weights = self.neighbors(node)
+        # the first entry of a neighbor has its smallest weight
+        neighbors, first = numpy.unique(indices, return_index=True)
+        return neighbors, weights[first]
+
+    def _gather(
+        self,
+        set_nodes: NDArray[numpy.int64],
+    ) -> tuple[NDArray[numpy.int64], NDArray[numpy.int64]]:
+        starts = self.indptr[set_nodes]
+        lengths = self.indptr[set_nodes + 1] - starts
+        rows = numpy.repeat(numpy.arange(len(set_nodes)), lengths)
+        # positions of the entries of every list, one after the other
+        entries = numpy.arange(lengths.sum()) + numpy.repeat(
+            starts - (numpy.cumsum(lengths) - lengths),
+            lengths,
+        )
+        return rows, entries
+
+
+def _entries(
+    page_ids: NDArray[numpy.int64],
+    sources: Sequence[int],
+    targets: Sequence[int],
+    weights: Sequence[float],
+) -> Entries:
+    ends = numpy.array([sources, targets], dtype=numpy.int64)
+    known = _search(page_ids, ends)[1].all(axis=0)
+    nodes = numpy.searchsorted(page_ids, ends[:, known])
+    known_weights = numpy.asarray(weights, dtype=numpy.float32)[known]
+    return (
+        numpy.concatenate(nodes),
+        numpy.concatenate(nodes[::-1]).astype(numpy.int32),
+        numpy.tile(known_weights, 2),
+    )
+
+
+def _adjacency(entries: Entries, size: int) -> dict[str, NDArray[Any]]:
+    rows, columns, weights = entries
+    order = numpy.lexsort((weights, rows))
+    degrees = numpy.bincount(rows, minlength=size)
+    return {
+        "indptr": numpy.concatenate(([0], numpy.cumsum(degrees))),
+        "indices": columns[order],
+        "weights": weights[order],
+    }
+
+
+def _title_arrays(
+    name: str,
+    titles: Sequence[Optional[str]],
+    pages: NDArray[numpy.intp],
+) -> dict[str, NDArray[Any]]:
+    offsets, title_bytes = _encode_titles([titles[position] for position in pages])
+    return {f"{name}_offsets": offsets, f"{name}s": title_bytes}
+
+
+def _sidecar(path: Path, name: str) -> Path:
+    return path.with_suffix(f".{name}.npy")
+
+
+def _search(
+    sorted_values: NDArray[Any],
+    values: NDArray[Any],
+) -> Search:
+    positions = numpy.searchsorted(sorted_values, values)
+    inside = positions < len(sorted_values)
+    found = numpy.zeros(values.shape, dtype=bool)
+    found[inside] = sorted_values[positions[inside]] == values[inside]
+    return positions, found
+
+
+def _find(
+    nodes: NDArray[numpy.int64],
+    values: NDArray[Any],
+) -> Search:
+    # positions in ``nodes`` of the values found, and which ones were
+    order = numpy.argsort(nodes, kind="stable")
+    positions, found = _search(nodes[order], values)
+    return order[positions[found]], found
+
+
+def _min_matrix(
+    size: int,
+    cells: tuple[NDArray[numpy.intp], NDArray[numpy.intp]],
+    weights: NDArray[numpy.float32],
+) -> NDArray[numpy.float32]:
+    matrix = numpy.ones((size, size), dtype=numpy.float32)
+    numpy.minimum.at(matrix, cells, weights)
+    numpy.fill_diagonal(matrix, 0)
+    return matrix
@@ -0,0 +1,61 @@
+import array
+import logging
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from knowledge_complex_backend.db.gpc_graph.csr import CSRGraph
+
+_PAGES = "MATCH (p:P) RETURN p.Id AS id, p.Title AS title, p.zh_Title AS zh_title"
+# every relationship once, whatever its direction
+_RELATIONSHIPS = "MATCH (a:P)-[r:D]->(b:P) RETURN a.Id AS a, b.Id AS b, r.weight AS w"
+
+Titles = list[Optional[str]]
+# ids, titles and zh titles of the pages
+Pages = tuple[Sequence[int], Titles, Titles]
+# start ids, end ids and weights of the relationships
+Relationships = tuple[Sequence[int], Sequence[int], Sequence[float]]
+
+
+async def export_snapshot(driver: Any, path: Path) -> CSRGraph:
+    """
+    Read the GPC graph from Neo4j and write it as a snapshot.
+
+    The relationships are buffered in typed arrays, 20 bytes each, before
+    the CSR arrays are built.
+
+    :param driver: neo4j async driver.
+    :param path: path prefix of the snapshot files.
+    :return: exported graph.
+    """
+    async with driver.session(database="neo4j") as session:
+        pages = await _read_pages(session)
+        relationships = await _read_relationships(session)
+    graph = CSRGraph.build(*pages, *relationships)
+    graph.save(path)
+    return graph
+
+
+async def _read_pages(session: Any) -> Pages:
+    ids = array.array("q")
+    titles: Titles = []
+    zh_titles: Titles = []
+    result = await session.run(_PAGES)
+    async for record in result:
+        ids.append(int(record["id"]))
+        titles.append(record["title"])
+        zh_titles.append(record["zh_title"])
+    logging.info("gpc graph: %s pages", len(ids))  # noqa: WPS323
+    return ids, titles, zh_titles
+
+
+async def _read_relationships(session: Any) -> Relationships:
+    sources = array.array("q")
+    targets = array.array("q")
+    weights = array.array("f")
+    result = await session.run(_RELATIONSHIPS)
+    async for relationship in result:
+        sources.append(int(relationship["a"]))
+        targets.append(int(relationship["b"]))
+        weights.append(relationship["w"])
+    logging.info("gpc graph: %s relationships", len(weights))  # noqa: WPS323
+    return sources, targets, weights
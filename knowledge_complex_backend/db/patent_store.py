@@ -0,0 +1,340 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy
+import orjson
+from numpy.typing import NDArray
+
+# table -> dimension columns, every row also has a JSON ``data`` array
+PATENT_TABLES = {
+    "patents_country_ipc_trend": ("country_code", "ipc_prefix", "ipc_level"),
+    "patents_country_ipc_citations_trend": (
+        "country_code_a",
+        "country_code_b",
+        "ipc_prefix",
+        "ipc_level",
+        "direction",
+    ),
+    "patents_country_citations_trend": ("country_code_a", "country_code_b"),
+}
+
+# the first element of every ``data`` array is this year
+PATENT_START_YEAR = 1990
+# last year of the patent responses
+PATENT_END_YEAR = 2020
+
+# row count and update time of a table, its rows are decoded again when
+# either changed
+_FINGERPRINT_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM {table}),
+    (
+        SELECT t.UPDATE_TIME
+        FROM information_schema.tables as t
+        WHERE t.TABLE_SCHEMA = DATABASE() AND t.TABLE_NAME = %s
+    );
+"""  # noqa: WPS323
+_ROWS_SQL = "SELECT {columns}, data FROM {table};"
+
+Labels = NDArray[numpy.str_]
+LabelledMatrix = tuple[Labels, Labels, NDArray[numpy.int64]]
+
+
+class PatentSeriesTable:
+    """
+    Decoded ``data`` arrays of one patents_*_trend table.
+
+    Every row of the table becomes one row of an int64 matrix with one
+    column per year, starting at ``PATENT_START_YEAR``. The dimension
+    columns are integer coded, so filters are vectorized ``isin`` masks,
+    one year is a column slice and a trend is a sum of rows.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str],
+        labels: dict[str, NDArray[numpy.str_]],
+        codes: NDArray[numpy.int32],
+        matrix: NDArray[numpy.int64],
+    ) -> None:
+        self.columns = tuple(columns)
+        self.labels = labels
+        self.codes = codes
+        self.matrix = matrix
+        self._lookup = {
+            column: {label: code for code, label in enumerate(labels[column])}
+            for column in self.columns
+        }
+
+    @classmethod
+    def from_rows(  # noqa: WPS210
+        cls,
+        columns: Sequence[str],
+        rows: Sequence[Sequence[Any]],
+    ) -> "PatentSeriesTable":
+        """
+        Decode rows of ``(*columns, data)``.
+
+        Shorter ``data`` arrays are padded with zeros on the right.
+
+        :param columns: dimension columns.
+        :param rows: table rows.
+        :return: decoded table.
+        """
+        series = [orjson.loads(row[-1]) for row in rows]
+        width = max(map(len, series), default=0)
+        matrix = numpy.zeros((len(rows), width), dtype=numpy.int64)
+        for position, values in enumerate(series):
+            matrix[position, : len(values)] = values
+
+        labels = {}
+        codes_shape = (len(rows), len(columns))
+        codes = numpy.zeros(codes_shape, dtype=numpy.int32)
+        for axis, column in enumerate(columns):
+            column_values = [str(row[axis]) for row in rows]
+            column_labels, inverse = numpy.unique(
+                numpy.array(column_values, dtype=str),
+                return_inverse=True,
+            )
+            labels[column] = column_labels
+            codes[:, axis] = inverse
+        return cls(columns, labels, codes, matrix)
+
+    def mask(self, **filters: Iterable[Any]) -> NDArray[numpy.bool_]:
+        """
+        Rows whose columns take one of the given values.
+
+        >>> table.mask(country_code=["US", "CN"], ipc_level=[1])
+
+        :param filters: accepted values keyed by column.
+        :return: boolean row mask.
+        """
+        selected = numpy.ones(self.matrix.shape[0], dtype=bool)
+        for column, values in filters.items():
+            lookup = self._lookup[column]
+            accepted = [lookup[name] for name in map(str, values) if name in lookup]
+            selected &= numpy.isin(self._column(column), accepted)
+        return selected
+
+    def year_totals(
+        self,
+        group_by: str,
+        mask: NDArray[numpy.bool_],
+        year: int,
+    ) -> dict[str, int]:
+        """
+        Sum one year of the masked rows per ``group_by`` value.
+
+        :param group_by: dimension column.
+        :param mask: boolean row mask.
+        :param year: year to read.
+        :return: totals keyed by ``group_by`` value.
+        """
+        values = self._window(mask, year, year)[:, 0]
+        sums = self._group(group_by, mask, values)
+        return {label: int(value) for label, value in sums.items()}
+
+    def trend_totals(
+        self,
+        group_by: str,
+        mask: NDArray[numpy.bool_],
+        start_year: int = PATENT_START_YEAR,
+        end_year: int = PATENT_END_YEAR,
+    ) -> dict[str, NDArray[numpy.int64]]:
+        """
+        Sum the yearly series of the masked rows per ``group_by`` value.
+
+        :param group_by: dimension column.
+        :param mask: boolean row mask.
+        :param start_year: first year of the series.
+        :param end_year: last year of the series, inclusive.
+        :return: series of ``end_year - start_year + 1`` years keyed by
+            ``group_by`` value.
+        """
+        values = self._window(mask, start_year, end_year)
+        return self._group(group_by, mask, values)
+
+    def window_matrix(  # noqa: WPS210, WPS211
+        self,
+        row_column: str,
+        column_column: str,
+        mask: NDArray[numpy.bool_],
+        start_year: int,
+        end_year: int,
+    ) -> LabelledMatrix:
+        """
+        Sum the masked rows over a year window into a two dimension matrix.
+
+        :param row_column: dimension column of the matrix rows.
+        :param column_column: dimension column of the matrix columns.
+        :param mask: boolean row mask.
+        :param start_year: first year of the window.
+        :param end_year: last year of the window, inclusive.
+        :return: row labels, column labels and the sums, without empty
+            rows or columns.
+        """
+        values = self._window(mask, start_year, end_year)
+        row_codes = self._column(row_column)[mask]
+        column_codes = self._column(column_column)[mask]
+        row_labels = self.labels[row_column]
+        column_labels = self.labels[column_column]
+        sums_shape = (len(row_labels), len(column_labels))
+        sums = numpy.zeros(sums_shape, dtype=numpy.int64)
+        numpy.add.at(sums, (row_codes, column_codes), values.sum(axis=1))
+        rows = numpy.flatnonzero(sums.any(axis=1))
+        columns = numpy.flatnonzero(sums.any(axis=0))
+        matrix = sums[numpy.ix_(rows, columns)]
+        return row_labels[rows], column_labels[columns], matrix
+
+    def save(self, path: Path, fingerprint: str) -> None:
+        """
+        Write the table as ``.npy`` sidecars next to a JSON header.
+
+        :param path: path prefix of the sidecar files.
+        :param fingerprint: state of the source table the data was read at.
+        """
+        numpy.save(path.with_suffix(".matrix.npy"), self.matrix)
+        numpy.save(path.with_suffix(".codes.npy"), self.codes)
+        header = {
+            "fingerprint": fingerprint,
+            "columns": self.columns,
+            "labels": {column: self.labels[column].tolist() for column in self.columns},
+        }
+        path.with_suffix(".json").write_text(json.dumps(header))
+
+    @classmethod
+    def open(cls, path: Path, fingerprint: str) -> Optional["PatentSeriesTable"]:
+        """
+        Memory-map sidecars written by ``save``.
+
+        :param path: path prefix of the sidecar files.
+        :param fingerprint: current state of the source table.
+        :return: table, or None when the sidecars are missing or stale.
+        """
+        header_path = path.with_suffix(".json")
+        if not header_path.exists():
+            return None
+        header = json.loads(header_path.read_text())
+        if header["fingerprint"] != fingerprint:
+            return None
+        return cls(
+            header["columns"],
+            {
+                column: numpy.array(labels, dtype=str)
+                for column, labels in header["labels"].items()
+            },
+            numpy.load(path.with_suffix(".codes.npy"), mmap_mode="r"),
+            numpy.load(path.with_suffix(".matrix.npy"), mmap_mode="r"),
+        )
+
+    def _window(  # noqa: WPS210
+        self,
+        mask: NDArray[numpy.bool_],
+        start_year: int,
+        end_year: int,
+    ) -> NDArray[numpy.int64]:
+        """
+        Masked rows over a year window.
+
+        :param mask: boolean row mask.
+        :param start_year: first year of the window.
+        :param end_year: last year of the window, inclusive.
+        :return: one column per year, zero for the years that are not stored.
+        """
+        # stored columns of the window
+        first = max(start_year - PATENT_START_YEAR, 0)
+        last = min(end_year + 1 - PATENT_START_YEAR, self.matrix.shape[1])
+        window_shape = (int(numpy.count_nonzero(mask)), end_year - start_year + 1)
+        window = numpy.zeros(window_shape, dtype=numpy.int64)
+        if first < last:
+            stored = self.matrix[mask, first:last]
+            offset = first + PATENT_START_YEAR - start_year
+            window[:, offset : offset + stored.shape[1]] = stored
+        return window
+
+    def _group(
+        self,
+        group_by: str,
+        mask: NDArray[numpy.bool_],
+        values: NDArray[numpy.int64],
+    ) -> dict[str, Any]:
+        """
+        Sum the values of the masked rows per ``group_by`` value.
+
+        :param group_by: dimension column.
+        :param mask: boolean row mask.
+        :param values: one entry (or row) per masked row.
+        :return: sums keyed by ``group_by`` value.
+        """
+        group_codes = self._column(group_by)[mask]
+        group_labels = self.labels[group_by]
+        sums_shape = (len(group_labels), *values.shape[1:])
+        sums = numpy.zeros(sums_shape, dtype=numpy.int64)
+        numpy.add.at(sums, group_codes, values)
+        return {
+            str(group_labels[code]): sums[code] for code in numpy.unique(group_codes)
+        }
+
+    def _column(self, column: str) -> NDArray[numpy.int32]:
+        """
+        Codes of one dimension column.
+
+        :param column: dimension column.
+        :return: one code per row.
+        """
+        return self.codes[:, self.columns.index(column)]
+
+
+async def _fetch(
+    pool: Any,
+    sql: str,
+    args: Optional[Sequence[Any]] = None,
+) -> Sequence[Sequence[Any]]:
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await cur.execute(sql, args)
+        return await cur.fetchall()
+
+
+async def load_patent_store(  # noqa: WPS210
+    pool: Any,
+    directory: Optional[Path] = None,
+) -> dict[str, PatentSeriesTable]:
+    """
+    Decode every patents_*_trend table.
+
+    With a ``directory`` the decoded tables are memory-mapped from sidecar
+    files, which are rewritten when the row count or the update time of the
+    source table changed.
+
+    :param pool: aiomysql pool.
+    :param directory: optional sidecar directory.
+    :return: tables keyed by name.
+    """
+    store = {}
+    for table_name, columns in PATENT_TABLES.items():
+        fingerprint_sql = _FINGERPRINT_SQL.format(table=table_name)
+        state = await _fetch(pool, fingerprint_sql, (table_name,))
+        row_count, update_time = state[0]
+        fingerprint = f"{row_count}:{update_time}"
+
+        table = None
+        if directory is not None:
+            table = PatentSeriesTable.open(directory / table_name, fingerprint)
+        if table is None:
+            rows_sql = _ROWS_SQL.format(columns=", ".join(columns), table=table_name)
+            rows = await _fetch(pool, rows_sql)
+            table = PatentSeriesTable.from_rows(columns, rows)
+            if directory is not None:
+                directory.mkdir(parents=True, exist_ok=True)
+                table.save(directory / table_name, fingerprint)
+
+        store[table_name] = table
+        logging.info(
+            "patent store %s: %s rows",  # noqa: WPS323
+            table_name,
+            table.matrix.shape,
+        )
+    return store
@@ -0,0 +1,218 @@
+import asyncio
+import bisect
+import collections
+import contextlib
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Mapping, Optional, Sequence
+
+# group of the request using the pool, set per route by ``pool_group``
+current_pool_group: ContextVar[str] = ContextVar("pool_group", default="default")
+
+# upper bounds in seconds, the last bucket counts everything above
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds, each bucket counted on its own."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = list(buckets)
+        self.counts = [0 for _ in range(len(self.buckets) + 1)]
+        self.count = 0
+        self.sum: float = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Record one duration.
+
+        :param value: seconds.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Current state.
+
+        :return: count, sum and the count of every bucket keyed by its bound.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(bounds, self.counts)),
+        }
+
+
+class _TimedCursor:
+    """Cursor proxy recording the duration of ``execute``."""
+
+    def __init__(self, cursor: Any, histogram: Histogram) -> None:
+        self._cursor = cursor
+        self._histogram = histogram
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:  # noqa: WPS501
+            return await self._cursor.execute(*args, **kwargs)
+        finally:
+            self._histogram.observe(time.perf_counter() - started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _TimedConnection:
+    """Connection proxy whose cursors are timed."""
+
+    def __init__(self, conn: Any, histogram: Histogram) -> None:
+        self._conn = conn
+        self._histogram = histogram
+
+    async def cursor(self, *args: Any, **kwargs: Any) -> _TimedCursor:
+        return _TimedCursor(await self._conn.cursor(*args, **kwargs), self._histogram)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class ManagedPool:
+    """
+    aiomysql pool with per group connection budgets and metrics.
+
+    A group, taken from ``current_pool_group``, holding a budget can not
+    use more than that many connections at once, so one heavy group can
+    not take every connection of the pool. Groups without a budget are
+    only limited by the size of the pool, the budgets together have to
+    leave at least one connection to them.
+
+    Per group it records how long ``acquire`` waited and how long queries
+    took.
+    """
+
+    def __init__(self, pool: Any, budgets: Optional[Mapping[str, int]] = None) -> None:
+        self.pool = pool
+        self.budgets = dict(budgets or {})
+        if self.budgets and sum(self.budgets.values()) >= pool.maxsize:
+            raise ValueError(
+                f"pool budgets {self.budgets} leave none of the {pool.maxsize} "
+                "connections to the other groups",
+            )
+        self._semaphores = {
+            group: asyncio.Semaphore(budget) for group, budget in self.budgets.items()
+        }
+        self.acquire_wait: dict[str, Histogram] = collections.defaultdict(Histogram)
+        self.query_time: dict[str, Histogram] = collections.defaultdict(Histogram)
+        self.waiting: collections.Counter[str] = collections.Counter()
+        self.in_use: collections.Counter[str] = collections.Counter()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """
+        Take a connection within the budget of the current group.
+
+        :yield: connection whose cursor executions are timed.
+        """
+        group = current_pool_group.get()
+        semaphore = self._semaphores.get(group)
+        async with contextlib.AsyncExitStack() as stack:
+            started = time.perf_counter()
+            self.waiting[group] += 1
+            try:
+                if semaphore is not None:
+                    await semaphore.acquire()
+                    stack.callback(semaphore.release)
+                conn = await stack.enter_async_context(self.pool.acquire())
+            finally:
+                self.waiting[group] -= 1
+            self.acquire_wait[group].observe(time.perf_counter() - started)
+
+            self.in_use[group] += 1
+            try:
+                yield _TimedConnection(conn, self.query_time[group])
+            finally:
+                self.in_use[group] -= 1
+
+    def sharing_budgets(self, pool: Any) -> "ManagedPool":
+        """
+        Wrap another pool under the budgets of this one.
+
+        A group holds at most its budget over both pools together, e.g.
+        when the other pool routes some connections to the pool of this
+        one. Metrics are kept per wrapper.
+
+        :param pool: aiomysql like pool.
+        :return: managed pool sharing the budget semaphores of this one.
+        """
+        shared = ManagedPool(pool)
+        shared.budgets = self.budgets
+        shared._semaphores = self._semaphores  # noqa: WPS437
+        return shared
+
+    async def prewarm(self) -> None:
+        """Open ``minsize`` connections and check each of them with ``SELECT 1``."""
+
+        async def check() -> None:  # noqa: WPS430
+            async with self.pool.acquire() as conn:
+                cur = await conn.cursor()
+                await cur.execute("SELECT 1")
+                await cur.fetchall()
+                # hold it until all of them are open
+                await barrier.wait()
+
+        count = self.pool.minsize
+        if count < 1:
+            return
+        barrier = asyncio.Barrier(count)
+        await asyncio.gather(*(check() for _ in range(count)))
+        logging.info("mysql pool warmed with %s connections", count)  # noqa: WPS323
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Gauges of the pool and metrics of every group.
+
+        :return: pool sizes, then waiters, connections in use, budget,
+            acquire wait and query time per group.
+        """
+        groups = {*self.budgets, *self.acquire_wait, *self.waiting}
+        return {
+            "minsize": self.pool.minsize,
+            "maxsize": self.pool.maxsize,
+            "size": self.pool.size,
+            "free": self.pool.freesize,
+            "in_use": self.pool.size - self.pool.freesize,
+            "groups": {
+                group: {
+                    "budget": self.budgets.get(group),
+                    "waiting": self.waiting[group],
+                    "in_use": self.in_use[group],
+                    "acquire_wait": self.acquire_wait[group].snapshot(),
+                    "query_time": self.query_time[group].snapshot(),
+                }
+                for group in sorted(groups)
+            },
+        }
+
+    def close(self) -> None:
+        """Close the underlying pool."""
+        self.pool.close()
+
+    async def wait_closed(self) -> None:
+        """Wait for the underlying pool to close its connections."""
+        await self.pool.wait_closed()
@@ -0,0 +1,144 @@
+import contextlib
+import itertools
+from typing import Any, AsyncIterator, Iterable, Mapping, Optional, Sequence
+
+from knowledge_complex_backend.db.streaming import Chunks, stream_rows
+
+Filters = Mapping[str, Iterable[Any]]
+# SQL condition and its arguments
+Condition = tuple[str, list[Any]]
+
+_SELECT_SQL = "SELECT {columns}, SUM(c.{value}) AS total FROM {table} as c"
+_IN_SQL = "c.{column} IN %s"  # noqa: WPS323
+_BETWEEN_SQL = "c.{column} BETWEEN %s AND %s"  # noqa: WPS323
+# condition of an empty filter, MySQL rejects ``IN ()``
+_NO_ROW = "1 = 0"
+
+
+class AggregateQuery:
+    """
+    ``SUM`` of one column of an aggregate table, grouped in MySQL.
+
+    ``AggregateQuery(table, ["cat"], {"country": countries}, years)`` renders
+    ``SELECT c.cat, SUM(c.count) AS total FROM table as c WHERE c.country IN
+    %s AND c.year BETWEEN %s AND %s GROUP BY c.cat``.
+
+    Contiguous years become a ``BETWEEN`` range, other year sets an ``IN``
+    list. Rows are sorted by the ``order_by`` columns in MySQL. With
+    ``limit`` only the groups with the largest totals are kept.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        table: str,
+        group_by: Sequence[str],
+        filters: Optional[Filters] = None,
+        years: Optional[Iterable[int]] = None,
+        value: str = "count",
+        year_column: str = "year",
+        limit: Optional[int] = None,
+        order_by: Sequence[str] = (),
+    ) -> None:
+        self._table = table
+        self._group_by = list(group_by)
+        self._filters = {
+            column: list(values) for column, values in (filters or {}).items()
+        }
+        self._years = None
+        if years is not None:
+            self._years = sorted({int(year) for year in years})
+        self._value = value
+        self._year_column = year_column
+        self._limit = limit
+        self._order_by = list(order_by)
+
+    def sql(self) -> tuple[str, list[Any]]:
+        """
+        Render the query.
+
+        :return: SQL and its arguments.
+        """
+        conditions, args = self._conditions()
+        columns = ", ".join(f"c.{column}" for column in self._group_by)
+        clauses = [
+            _SELECT_SQL.format(columns=columns, value=self._value, table=self._table),
+        ]
+        if conditions:
+            clauses.append("WHERE {0}".format(" AND ".join(conditions)))
+        clauses.append(f"GROUP BY {columns}")
+        order = self._order()
+        if order:
+            clauses.append("ORDER BY {0}".format(", ".join(order)))
+        if self._limit is not None:
+            clauses.append("LIMIT {0}".format(int(self._limit)))
+        return " ".join(clauses), args
+
+    async def fetch(self, pool: Any) -> list[tuple[Any, ...]]:
+        """
+        Run the query.
+
+        :param pool: aiomysql pool.
+        :return: rows of the group columns followed by the integer total.
+        """
+        sql, args = self.sql()
+        async with pool.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute(sql, args)
+            rows = await cur.fetchall()
+        return _with_int_total(rows)
+
+    @contextlib.asynccontextmanager
+    async def chunks(
+        self,
+        pool: Any,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[Chunks]:
+        """
+        Run the query on a streaming cursor, see ``stream_rows``.
+
+        :param pool: aiomysql pool.
+        :param chunk_size: rows per chunk.
+        :yield: iterator of chunks of the rows returned by ``fetch``.
+        """
+        sql, args = self.sql()
+        async with stream_rows(pool, sql, args, chunk_size) as chunks:
+            yield (_with_int_total(rows) async for rows in chunks)
+
+    def _conditions(self) -> tuple[list[str], list[Any]]:
+        parts = list(itertools.starmap(_in_condition, self._filters.items()))
+        if self._years is not None:
+            parts.append(self._year_condition(self._years))
+        conditions = [part[0] for part in parts]
+        args = [arg for part in parts for arg in part[1]]
+        return conditions, args
+
+    def _year_condition(self, years: list[int]) -> Condition:
+        if not years:
+            return _NO_ROW, []
+        first, last = years[0], years[-1]
+        if last - first + 1 == len(years):
+            condition = _BETWEEN_SQL.format(column=self._year_column)
+            return condition, [first, last]
+        return _in_condition(self._year_column, years)
+
+    def _order(self) -> list[str]:
+        order = [f"c.{column}" for column in self._order_by]
+        if self._limit is not None:
+            order.insert(0, "total DESC")
+        return order
+
+
+def _in_condition(column: str, values: list[Any]) -> Condition:
+    if not values:
+        return _NO_ROW, []
+    return _IN_SQL.format(column=column), [values]
+
+
+def _with_int_total(rows: Iterable[Sequence[Any]]) -> list[tuple[Any, ...]]:
+    # MySQL returns SUM over integers as DECIMAL
+    return [_int_total(row) for row in rows]
+
+
+def _int_total(row: Sequence[Any]) -> tuple[Any, ...]:
+    *group, total = row
+    return (*group, int(total))
@@ -0,0 +1,217 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Optional, Sequence
+
+import aiomysql
+
+# errors of a replica that can not be reached
+CONNECTION_ERRORS = (aiomysql.OperationalError, OSError, asyncio.TimeoutError)
+# client error codes of a refused or lost connection: CR_CONN_HOST_ERROR,
+# CR_SERVER_GONE_ERROR and CR_SERVER_LOST. Other OperationalErrors, such as
+# lock wait timeouts, deadlocks or max_execution_time, come from the query.
+LOST_CONNECTION_ERRNOS = frozenset((2003, 2006, 2013))
+
+
+def _lost_connection(error: BaseException) -> bool:
+    return (
+        isinstance(error, aiomysql.OperationalError)
+        and bool(error.args)
+        and error.args[0] in LOST_CONNECTION_ERRNOS
+    )
+
+
+class Replica:
+    """One pool of a RoutingPool with its routing state."""
+
+    def __init__(self, name: str, pool: Any) -> None:
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+        self.outstanding = 0
+        self.acquired = 0
+        self.failures = 0
+
+
+class RoutingPool:
+    """
+    Spread read connections over several MySQL pools.
+
+    Every ``acquire`` goes to the healthy replica with the fewest
+    connections currently out (ties are taken in turn). A replica whose
+    connection fails is ejected until ``check`` reaches it again. When
+    every replica is ejected they are all tried again rather than
+    failing every request.
+
+    It exposes the aiomysql pool interface, so ``ManagedPool`` can wrap it.
+    """
+
+    def __init__(self, pools: Sequence[tuple[str, Any]]) -> None:
+        self.replicas = [Replica(name, pool) for name, pool in pools]
+        self._turn = 0
+        self._health_task: Optional[asyncio.Task[None]] = None
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """
+        Take a connection from the least loaded healthy replica.
+
+        The replica is ejected when no connection can be taken from it, or
+        when the connection is lost while it is used. Errors of the queries
+        themselves are raised without ejecting it.
+
+        :yield: connection of the chosen replica.
+        """
+        replica = self._pick()
+        replica.outstanding += 1
+        replica.acquired += 1
+        try:  # noqa: WPS501
+            async with self._connect(replica) as conn:
+                async with self._watch(replica):
+                    yield conn
+        finally:
+            replica.outstanding -= 1
+
+    async def check(self, timeout: float = 5) -> None:
+        """
+        Run ``SELECT 1`` on every replica, eject or readmit them.
+
+        :param timeout: seconds a replica has to answer.
+        """
+
+        async def ping(replica: Replica) -> None:  # noqa: WPS430
+            async with replica.pool.acquire() as conn:
+                cur = await conn.cursor()
+                await cur.execute("SELECT 1")
+                await cur.fetchall()
+
+        for replica in self.replicas:
+            try:
+                await asyncio.wait_for(ping(replica), timeout)
+            except CONNECTION_ERRORS as error:
+                self._eject(replica, error)
+                continue
+            if not replica.healthy:
+                logging.info(
+                    "mysql replica %s readmitted",  # noqa: WPS323
+                    replica.name,
+                )
+            replica.healthy = True
+
+    def start(self, interval: float) -> None:
+        """
+        Check the replicas every ``interval`` seconds in the background.
+
+        :param interval: seconds between two checks.
+        """
+        self._health_task = asyncio.create_task(self._check_forever(interval))
+
+    def stats(self) -> list[dict[str, Any]]:
+        """
+        Routing state of every replica.
+
+        :return: name, health, connections out, acquisitions and failures.
+        """
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "outstanding": replica.outstanding,
+                "acquired": replica.acquired,
+                "failures": replica.failures,
+            }
+            for replica in self.replicas
+        ]
+
+    @property
+    def minsize(self) -> int:
+        """
+        Minimum connections of the replica pools.
+
+        :return: sum over the replicas.
+        """
+        return sum(replica.pool.minsize for replica in self.replicas)
+
+    @property
+    def maxsize(self) -> int:
+        """
+        Maximum connections of the replica pools.
+
+        :return: sum over the replicas.
+        """
+        return sum(replica.pool.maxsize for replica in self.replicas)
+
+    @property
+    def size(self) -> int:
+        """
+        Opened connections of the replica pools.
+
+        :return: sum over the replicas.
+        """
+        return sum(replica.pool.size for replica in self.replicas)
+
+    @property
+    def freesize(self) -> int:
+        """
+        Idle connections of the replica pools.
+
+        :return: sum over the replicas.
+        """
+        return sum(replica.pool.freesize for replica in self.replicas)
+
+    def close(self) -> None:
+        """Stop the health checks and close every replica pool."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    async def wait_closed(self) -> None:
+        """Wait for every replica pool to close its connections."""
+        for replica in self.replicas:
+            await replica.pool.wait_closed()
+
+    def _pick(self) -> Replica:
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if not candidates:
+            candidates = self.replicas
+        self._turn = (self._turn + 1) % len(candidates)
+        rotated = candidates[self._turn :] + candidates[: self._turn]
+        return min(rotated, key=lambda replica: replica.outstanding)
+
+    def _eject(self, replica: Replica, error: BaseException) -> None:
+        replica.failures += 1
+        if replica.healthy:
+            logging.warning(
+                "mysql replica %s ejected: %r",  # noqa: WPS323
+                replica.name,
+                error,
+            )
+        replica.healthy = False
+
+    @contextlib.asynccontextmanager
+    async def _connect(self, replica: Replica) -> AsyncIterator[Any]:
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                conn = await stack.enter_async_context(replica.pool.acquire())
+            except CONNECTION_ERRORS as error:
+                self._eject(replica, error)
+                raise
+            yield conn
+
+    @contextlib.asynccontextmanager
+    async def _watch(self, replica: Replica) -> AsyncIterator[None]:
+        try:
+            yield
+        except aiomysql.OperationalError as error:
+            if _lost_connection(error):
+                self._eject(replica, error)
+            raise
+
+    async def _check_forever(self, interval: float) -> None:
+        while True:  # noqa: WPS457
+            await asyncio.sleep(interval)
+            try:
+                await self.check(timeout=interval)
+            except Exception:
+                logging.exception("mysql replica health check failed")
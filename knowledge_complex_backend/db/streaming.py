@@ -0,0 +1,62 @@
+import contextlib
+from typing import Any, AsyncIterator, Optional
+
+import aiomysql
+
+from knowledge_complex_backend.settings import settings
+
+# fetched rows, read a chunk at a time
+Chunks = AsyncIterator[list[tuple[Any, ...]]]
+
+
+def chunk_size_for(name: str) -> int:
+    """
+    Rows fetched at a time by the query ``name``.
+
+    :param name: query name, a key of ``db_stream_chunk_sizes``.
+    :return: the configured size, ``db_stream_chunk_size`` by default.
+    """
+    return settings.db_stream_chunk_sizes.get(name, settings.db_stream_chunk_size)
+
+
+@contextlib.asynccontextmanager
+async def stream_rows(
+    pool: Any,
+    sql: str,
+    args: Any = None,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[Chunks]:
+    """
+    Run a query on an unbuffered cursor and read its rows in chunks.
+
+    The result stays on the server and is read ``chunk_size`` rows at a
+    time, so at most one chunk of the result is held in memory. The
+    connection is held until the ``async with`` block exits, whether the
+    rows were all read, the loop was left early or an error was raised;
+    the remaining rows are then discarded.
+
+    >>> async with stream_rows(pool, sql) as chunks:
+    ...     async for rows in chunks:
+    ...         ...
+
+    :param pool: aiomysql pool.
+    :param sql: query.
+    :param args: query arguments.
+    :param chunk_size: rows per chunk, ``db_stream_chunk_size`` by default.
+    :yield: iterator of non empty lists of rows.
+    """
+    size = chunk_size or settings.db_stream_chunk_size
+    async with pool.acquire() as conn:
+        cur = await conn.cursor(aiomysql.SSCursor)
+        try:
+            await cur.execute(sql, args)
+            yield _fetch_chunks(cur, size)
+        finally:
+            await cur.close()
+
+
+async def _fetch_chunks(cur: Any, size: int) -> Chunks:
+    rows = await cur.fetchmany(size)
+    while rows:
+        yield list(rows)
+        rows = await cur.fetchmany(size)
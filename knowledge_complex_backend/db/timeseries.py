@@ -0,0 +1,244 @@
+from typing import Any, Optional, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.db.github_rank import MISSING_RANK
+
+AGGREGATIONS = ("yearly", "5-year", "cumulative")
+
+# rows of a response, one value per year
+Rows = Sequence[Sequence[Any]]
+# output labels and the bin of every selected year
+Bins = tuple[list[Any], NDArray[numpy.intp]]
+
+
+class TimeWindow:
+    """
+    Sub-window and aggregation of a cached full-range yearly response.
+
+    The DAO methods keep computing (and caching) the full year range of
+    their dataset; a window only slices and aggregates that cached result,
+    so narrowing it never runs a new query.
+
+    ``5-year`` sums (or averages, for indices) consecutive 5 year bins
+    starting at the first year of the window, labelled ``"2010-2014"``.
+    ``cumulative`` is a running total and only applies to counts.
+    """
+
+    def __init__(
+        self,
+        start_year: Optional[int] = None,
+        end_year: Optional[int] = None,
+        aggregation: str = "yearly",
+    ) -> None:
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"unknown aggregation {aggregation}")
+        self.start_year = start_year
+        self.end_year = end_year
+        self.aggregation = aggregation
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Whether the window leaves responses untouched.
+
+        :return: True without bounds nor aggregation.
+        """
+        return (
+            self.start_year is None
+            and self.end_year is None
+            and self.aggregation == "yearly"
+        )
+
+    def positions(self, years: Sequence[Any]) -> list[int]:
+        """
+        Positions of the years inside the window.
+
+        :param years: year axis of a response.
+        :return: positions, in order.
+        """
+        start = float("-inf") if self.start_year is None else self.start_year
+        end = float("inf") if self.end_year is None else self.end_year
+        return [
+            position for position, year in enumerate(years) if start <= int(year) <= end
+        ]
+
+    def bins(self, years: Sequence[Any]) -> Bins:
+        """
+        Output labels of the window and the bin of every selected year.
+
+        :param years: selected years, in order.
+        :return: labels and one bin number per year.
+        """
+        numbers = [int(year) for year in years]
+        if self.aggregation != "5-year":
+            return numbers, numpy.arange(len(numbers))
+        first = numbers[0] if numbers else 0
+        codes = numpy.array(
+            [(year - first) // 5 for year in numbers],
+            dtype=numpy.int64,
+        )
+        labels = _bin_labels(numbers, codes)
+        return labels, numpy.unique(codes, return_inverse=True)[1]
+
+    def aggregate(  # noqa: WPS211
+        self,
+        values: NDArray[numpy.float64],
+        present: NDArray[numpy.bool_],
+        codes: NDArray[numpy.intp],
+        bin_count: int,
+        index: bool,
+    ) -> tuple[NDArray[numpy.float64], NDArray[numpy.bool_]]:
+        """
+        Aggregate the columns of a rows × years matrix.
+
+        :param values: values of the selected years.
+        :param present: cells holding a value.
+        :param codes: bin of every column.
+        :param bin_count: number of bins.
+        :param index: average the present cells instead of summing.
+        :raises ValueError: for a cumulative index.
+        :return: aggregated values and the cells holding a value.
+        """
+        if self.aggregation == "cumulative":
+            if index:
+                raise ValueError("indices can not be accumulated")
+            totals = numpy.cumsum(values * present, axis=1)
+            return totals, present.cumsum(axis=1) > 0
+        sums = numpy.zeros((values.shape[0], bin_count))
+        counts = numpy.zeros((values.shape[0], bin_count))
+        numpy.add.at(sums.T, codes, (values * present).T)
+        numpy.add.at(counts.T, codes, present.T)
+        if index:
+            sums = sums / numpy.where(counts > 0, counts, 1)
+        return sums, counts > 0
+
+    def apply_ranked(self, result: Any, index: bool) -> Any:
+        """
+        Window a ``{"legend", "year", "rank", "data"}`` response.
+
+        Yearly windows keep the stored ranks, aggregated ones are ranked
+        again on the aggregated values, highest first.
+
+        :param result: full-range response.
+        :param index: whether the values are an index (ECI/PCI) or counts.
+        :return: windowed response.
+        """
+        if self.is_full or not isinstance(result, dict):
+            return result
+        positions = self.positions(result["year"])
+        years = [result["year"][position] for position in positions]
+        if self.aggregation == "yearly":
+            return {
+                **result,
+                "year": years,
+                "rank": _columns(result["rank"], positions),
+                "data": _columns(result["data"], positions),
+            }
+        return self._aggregate_ranked(result, positions, years, index)
+
+    def apply_trend(self, result: Any) -> Any:
+        """
+        Window a ``{"legend", "data": [years, *series]}`` count response.
+
+        :param result: full-range response.
+        :return: windowed response.
+        """
+        if self.is_full or not isinstance(result, dict):
+            return result
+        years, *series = result["data"]
+        positions = self.positions(years)
+        selected = [years[position] for position in positions]
+        if self.aggregation == "yearly":
+            return {**result, "data": [selected, *_columns(series, positions)]}
+
+        return self._aggregate_trend(result, series, positions, selected)
+
+    def _aggregate_trend(
+        self,
+        result: dict[str, Any],
+        series: Rows,
+        positions: list[int],
+        selected: list[Any],
+    ) -> dict[str, Any]:
+        labels, codes = self.bins(selected)
+        values = _matrix(series, positions, numpy.float64)
+        values, _ = self.aggregate(
+            values,
+            numpy.ones(values.shape, dtype=bool),
+            codes,
+            len(labels),
+            index=False,
+        )
+        return {**result, "data": [labels, *_rounded(values, index=False)]}
+
+    def _aggregate_ranked(
+        self,
+        result: dict[str, Any],
+        positions: list[int],
+        years: list[Any],
+        index: bool,
+    ) -> dict[str, Any]:
+        labels, codes = self.bins(years)
+        ranks = _matrix(result["rank"], positions, numpy.int64)
+        values, present = self.aggregate(
+            _matrix(result["data"], positions, numpy.float64),
+            ranks != MISSING_RANK,
+            codes,
+            len(labels),
+            index,
+        )
+        return {
+            **result,
+            "year": labels,
+            "rank": rerank(values, present).tolist(),
+            "data": _rounded(values, index),
+        }
+
+
+def rerank(
+    values: NDArray[numpy.float64],
+    present: NDArray[numpy.bool_],
+) -> NDArray[numpy.int64]:
+    """
+    Rank every column, 1 for the highest present value.
+
+    :param values: rows × columns values.
+    :param present: cells holding a value, the others get ``MISSING_RANK``.
+    :return: ranks.
+    """
+    ordered = numpy.where(present, values, -numpy.inf)
+    order = numpy.argsort(-ordered, axis=0, kind="stable")
+    ranks = numpy.empty_like(order)
+    row_count = len(values)
+    places = numpy.arange(1, row_count + 1)[:, None]
+    numpy.put_along_axis(ranks, order, places, axis=0)
+    return numpy.where(present, ranks, MISSING_RANK)
+
+
+def _columns(rows: Rows, positions: list[int]) -> list[list[Any]]:
+    return [[row[position] for position in positions] for row in rows]
+
+
+def _matrix(rows: Rows, positions: list[int], dtype: Any) -> NDArray[Any]:
+    matrix = numpy.array(_columns(rows, positions), dtype=dtype)
+    return matrix.reshape(len(rows), len(positions))
+
+
+def _bin_labels(numbers: list[int], codes: NDArray[numpy.int64]) -> list[Any]:
+    members: dict[int, list[int]] = {}
+    for year, code in zip(numbers, codes.tolist()):
+        members.setdefault(code, []).append(year)
+    return [_span(years) for years in members.values()]
+
+
+def _span(years: list[int]) -> str:
+    first, last = years[0], years[-1]
+    return f"{first}-{last}"
+
+
+def _rounded(values: NDArray[numpy.float64], index: bool) -> list[list[Any]]:
+    if index:
+        return values.round(5).tolist()
+    return values.round().astype(numpy.int64).tolist()
@@ -0,0 +1,11 @@
+"""Precomputed rollups of the paper aggregate tables."""
+from knowledge_complex_backend.rollup.build import build_rollups
+from knowledge_complex_backend.rollup.catalog import RollupCatalog
+from knowledge_complex_backend.rollup.tables import ROLLUP_VERSION, rollup_tables
+
+__all__ = [
+    "ROLLUP_VERSION",
+    "RollupCatalog",
+    "build_rollups",
+    "rollup_tables",
+]
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import aiomysql
+
+from knowledge_complex_backend.db.cube import PAPER_CUBE_TABLES
+from knowledge_complex_backend.rollup.build import build_rollups
+from knowledge_complex_backend.settings import settings
+
+# port of database URLs without one
+MYSQL_PORT = 3306
+
+
+async def run(flows: list[str]) -> None:
+    """
+    Build the rollups of ``flows`` on the configured database.
+
+    :param flows: paper, export and/or import.
+    """
+    url = urlsplit(str(settings.db_url))
+    pool = await aiomysql.create_pool(
+        host=url.hostname,
+        port=url.port or MYSQL_PORT,
+        user=url.username,
+        password=url.password,
+        db=url.path.strip("/"),
+        minsize=1,
+        maxsize=1,
+        autocommit=True,
+    )
+    try:  # noqa: WPS501
+        await build_rollups(pool, flows)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+def main() -> None:
+    """Entrypoint of the rollup builder."""
+    parser = argparse.ArgumentParser(
+        prog="python -m knowledge_complex_backend.rollup",
+        description="Build the rollup tables of the paper aggregate tables.",
+    )
+    parser.add_argument(
+        "--flow",
+        dest="flows",
+        action="append",
+        choices=sorted(PAPER_CUBE_TABLES),
+        help="flow to build, can be repeated, all flows by default",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=settings.log_level.value)
+    asyncio.run(run(args.flows or sorted(PAPER_CUBE_TABLES)))
+
+
+if __name__ == "__main__":
+    main()
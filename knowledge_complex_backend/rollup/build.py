@@ -0,0 +1,88 @@
+import logging
+from typing import Any, Iterable
+
+from knowledge_complex_backend.rollup.tables import (
+    ROLLUP_VERSION,
+    VERSION_TABLE,
+    VERSION_TABLE_SQL,
+    RollupTable,
+    rollup_tables,
+    source_stamp,
+)
+
+_DROP_SQL = "DROP TABLE IF EXISTS {new}, {old}"
+_DROP_OLD_SQL = "DROP TABLE {old}"
+_LIKE_SQL = "CREATE TABLE IF NOT EXISTS {live} LIKE {new}"
+_RENAME_SQL = "RENAME TABLE {live} TO {old}, {new} TO {live}"
+_COUNT_SQL = "SELECT COUNT(*) FROM {table}"
+
+_RECORD_SQL = f"""
+    REPLACE INTO {VERSION_TABLE} (
+        name, source, version, stamp, first_year, last_year, row_count, built_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+"""  # noqa: WPS323
+
+
+async def build_rollup(
+    pool: Any,
+    table: RollupTable,
+    stamp: tuple[str, Any, Any],
+) -> int:
+    """
+    Rebuild one rollup and record its version.
+
+    The rollup is filled in a ``__new`` table that replaces the live one
+    with an atomic ``RENAME TABLE``, readers never see a partial table.
+
+    :param pool: aiomysql pool, in autocommit mode.
+    :param table: rollup.
+    :param stamp: stamp of the source taken before the build.
+    :return: rows of the rollup.
+    """
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await _swap(cur, table)
+        return await _record(cur, table, stamp)
+
+
+async def build_rollups(pool: Any, flows: Iterable[str]) -> None:
+    """
+    Rebuild every rollup of the given flows.
+
+    The source is stamped before the build: when it changes meanwhile the
+    rollups look stale and are ignored until the next build.
+
+    :param pool: aiomysql pool, in autocommit mode.
+    :param flows: paper, export and/or import.
+    """
+    for flow in flows:
+        tables = rollup_tables(flow)
+        stamp = await source_stamp(pool, next(iter(tables.values())).source)
+        for table in tables.values():
+            row_count = await build_rollup(pool, table, stamp)
+            logging.info("%s: %s rows", table.name, row_count)  # noqa: WPS323
+
+
+async def _swap(cur: Any, table: RollupTable) -> None:
+    names = {
+        "live": table.name,
+        "new": f"{table.name}__new",
+        "old": f"{table.name}__old",
+    }
+    await cur.execute(_DROP_SQL.format(**names))
+    await cur.execute(table.create_sql(names["new"]))
+    await cur.execute(_LIKE_SQL.format(**names))
+    await cur.execute(_RENAME_SQL.format(**names))
+    await cur.execute(_DROP_OLD_SQL.format(**names))
+
+
+async def _record(cur: Any, table: RollupTable, stamp: tuple[str, Any, Any]) -> int:
+    await cur.execute(_COUNT_SQL.format(table=table.name))
+    row = await cur.fetchone()
+    await cur.execute(VERSION_TABLE_SQL)
+    await cur.execute(
+        _RECORD_SQL,
+        (table.name, table.source, ROLLUP_VERSION, *stamp, row[0]),
+    )
+    return int(row[0])
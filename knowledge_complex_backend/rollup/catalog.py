@@ -0,0 +1,115 @@
+import logging
+from typing import Any, Iterable, Optional, Sequence
+
+import aiomysql
+
+from knowledge_complex_backend.rollup.tables import (
+    ROLLUP_VERSION,
+    VERSION_TABLE,
+    source_stamp,
+)
+
+# MySQL error of a missing table
+_NO_SUCH_TABLE = 1146
+
+_VERSIONS_SQL = """
+    SELECT v.name, v.source, v.version, v.stamp, v.first_year, v.last_year
+    FROM {table} as v;
+"""
+
+
+class RollupCatalog:
+    """
+    The rollups that are present and up to date.
+
+    A rollup is up to date when it was built by the current
+    ``ROLLUP_VERSION`` from a source with the same stamp as now.
+    """
+
+    def __init__(
+        self,
+        versions: Sequence[Sequence[Any]] = (),
+        stamps: Optional[dict[str, str]] = None,
+    ) -> None:
+        """
+        Keep the up to date rollups of the version table.
+
+        :param versions: ``(name, source, version, stamp, first_year,
+            last_year)`` rows of the version table.
+        :param stamps: current stamp of every source.
+        """
+        # name -> (first_year, last_year) of the source
+        self.fresh = _fresh(versions, stamps or {})
+
+    @classmethod
+    async def load(cls, pool: Any) -> "RollupCatalog":
+        """
+        Read the version table and stamp the sources again.
+
+        :param pool: aiomysql pool.
+        :return: catalog, empty when no rollup was ever built.
+        """
+        versions = await _versions(pool)
+        stamps = {}
+        for source in sorted({row[1] for row in versions}):
+            source_stamps = await source_stamp(pool, source)
+            stamps[source] = source_stamps[0]
+        catalog = cls(versions, stamps)
+        logging.info("up to date rollups: %s", sorted(catalog.fresh))  # noqa: WPS323
+        return catalog
+
+    def table(
+        self,
+        flow: str,
+        kind: str,
+        years: Optional[Iterable[int]] = None,
+    ) -> Optional[str]:
+        """
+        Name of a rollup to read instead of the source table.
+
+        :param flow: paper, export or import.
+        :param kind: rollup kind, see ``rollup_tables``.
+        :param years: for the all-years rollups, the years of the query;
+            the rollup is only used when they cover every year of the source.
+        :return: table name, None when the rollup can not be used.
+        """
+        name = f"rollup_{flow}_{kind}"
+        if name not in self.fresh:
+            return None
+        if years is not None and not self._covers(name, years):
+            return None
+        return name
+
+    def _covers(self, name: str, years: Iterable[int]) -> bool:
+        first_year, last_year = self.fresh[name]
+        if first_year is None:
+            return True
+        return set(range(first_year, last_year + 1)).issubset(years)
+
+
+def _fresh(
+    versions: Sequence[Sequence[Any]],
+    stamps: dict[str, str],
+) -> dict[str, tuple[Any, Any]]:
+    fresh = {}
+    for row in versions:
+        if _is_fresh(row, stamps):
+            fresh[row[0]] = (row[4], row[5])
+    return fresh
+
+
+def _is_fresh(row: Sequence[Any], stamps: dict[str, str]) -> bool:
+    source, version, stamp = row[1:4]
+    return version == ROLLUP_VERSION and stamps.get(source) == stamp
+
+
+async def _versions(pool: Any) -> Sequence[Sequence[Any]]:
+    try:
+        async with pool.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute(_VERSIONS_SQL.format(table=VERSION_TABLE))
+            return await cur.fetchall()
+    except aiomysql.ProgrammingError as error:
+        if error.args[0] != _NO_SUCH_TABLE:
+            raise
+        return ()
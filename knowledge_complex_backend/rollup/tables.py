@@ -0,0 +1,163 @@
+from typing import Any, Sequence
+
+from knowledge_complex_backend.db.cube import PAPER_CUBE_TABLES
+
+# Bump when the definition of a rollup changes, older builds are then
+# ignored until the tables are rebuilt.
+ROLLUP_VERSION = 2
+
+VERSION_TABLE = "rollup_version"
+
+VERSION_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+        name VARCHAR(128) NOT NULL PRIMARY KEY,
+        source VARCHAR(128) NOT NULL,
+        version INT NOT NULL,
+        stamp VARCHAR(255) NOT NULL,
+        first_year INT NULL,
+        last_year INT NULL,
+        row_count BIGINT NOT NULL,
+        built_at DATETIME NOT NULL
+    );
+"""
+
+# The leaves of the categories at a level. Duplicate pairs are kept, a leaf
+# listed twice under an ancestor is counted twice like on the live path.
+_ANCESTORS = """
+    (SELECT a.cat, a.parent_cat
+     FROM cat_ancestor as a
+     WHERE a.parent_level = {level})
+"""
+
+# the rollup selects read their source table as ``{source}``
+_CATEGORY_SELECT = """
+    SELECT s.country, a.parent_cat AS cat, s.year, SUM(s.count) AS count
+    FROM {{source}} as s
+    JOIN {ancestors} as a ON a.cat = s.cat
+    GROUP BY s.country, a.parent_cat, s.year
+"""
+
+_COUNTRY_YEAR_SELECT = """
+    SELECT s.country, s.year, SUM(s.count) AS count
+    FROM {source} as s
+    GROUP BY s.country, s.year
+"""
+
+_CAT_COUNTRY_SELECT = """
+    SELECT s.cat, s.country, SUM(s.count) AS count
+    FROM {source} as s
+    GROUP BY s.cat, s.country
+"""
+
+_CREATE_SQL = "CREATE TABLE {name} ({keys}) AS {select}"
+
+_STAMP_SQL = "SELECT COUNT(*), SUM(s.count), MIN(s.year), MAX(s.year) FROM {table} as s"
+_ANCESTOR_COUNT_SQL = "SELECT COUNT(*) FROM cat_ancestor"
+
+
+class RollupTable:
+    """
+    One rollup of a paper aggregate table.
+
+    ``select`` reads the source table as ``s`` and returns the rollup
+    columns, ``key`` becomes the primary key and ``indexes`` the secondary
+    ones.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        flow: str,
+        kind: str,
+        select: str,
+        key: tuple[str, ...],
+        indexes: tuple[tuple[str, ...], ...] = (),
+    ) -> None:
+        self.kind = kind
+        self.source = PAPER_CUBE_TABLES[flow]
+        self.name = f"rollup_{flow}_{kind}"
+        self.select = select.format(source=self.source)
+        self.key = key
+        self.indexes = indexes
+
+    def create_sql(self, name: str) -> str:
+        """
+        ``CREATE TABLE ... AS SELECT`` filling the rollup.
+
+        :param name: name of the created table.
+        :return: SQL.
+        """
+        index_keys = [_key("KEY", columns) for columns in self.indexes]
+        keys = ", ".join([_key("PRIMARY KEY", self.key), *index_keys])
+        return _CREATE_SQL.format(name=name, keys=keys, select=self.select)
+
+
+def _category_rollup(flow: str, level: int) -> RollupTable:
+    ancestors = _ANCESTORS.format(level=level)
+    return RollupTable(
+        flow,
+        f"country_l{level}_year",
+        _CATEGORY_SELECT.format(ancestors=ancestors),
+        key=("country", "cat", "year"),
+        indexes=(("cat", "year"),),
+    )
+
+
+def rollup_tables(flow: str) -> dict[str, RollupTable]:
+    """
+    Rollups of the paper aggregate table of a flow, keyed by kind.
+
+    - ``country_l0_year``, ``country_l1_year``: the leaves summed into
+      their level 0 (or level 1) ancestors, per country and year;
+    - ``country_year``: the total of every country per year;
+    - ``cat_country``: the total of every (leaf, country) over all years.
+
+    :param flow: paper, export or import.
+    :return: rollups.
+    """
+    tables = [
+        _category_rollup(flow, 0),
+        _category_rollup(flow, 1),
+        RollupTable(
+            flow,
+            "country_year",
+            _COUNTRY_YEAR_SELECT,
+            key=("country", "year"),
+        ),
+        RollupTable(
+            flow,
+            "cat_country",
+            _CAT_COUNTRY_SELECT,
+            key=("cat", "country"),
+            indexes=(("country",),),
+        ),
+    ]
+    return {table.kind: table for table in tables}
+
+
+async def source_stamp(pool: Any, source: str) -> tuple[str, Any, Any]:
+    """
+    Cheap fingerprint of a source table and of ``cat_ancestor``.
+
+    Row count and sum of the counts of the source, row count of the
+    hierarchy; a rollup is up to date while they do not change.
+
+    :param pool: aiomysql pool.
+    :param source: source table.
+    :return: stamp, first and last year of the source.
+    """
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await cur.execute(_STAMP_SQL.format(table=source))
+        source_row = await cur.fetchone()
+        await cur.execute(_ANCESTOR_COUNT_SQL)
+        ancestor_row = await cur.fetchone()
+    return _stamp(source_row, ancestor_row[0]), source_row[2], source_row[3]
+
+
+def _key(kind: str, columns: tuple[str, ...]) -> str:
+    return "{0} ({1})".format(kind, ", ".join(columns))
+
+
+def _stamp(source_row: Sequence[Any], ancestors: Any) -> str:
+    counts = (source_row[0], source_row[1] or 0, ancestors)
+    return ":".join(str(int(count)) for count in counts)
@@ -0,0 +1,19 @@
+"""Cache service."""
+from knowledge_complex_backend.services.cache.backend import TwoTierBackend
+from knowledge_complex_backend.services.cache.decorator import cache, cache_stats
+from knowledge_complex_backend.services.cache.key_builder import (
+    NotKeyed,
+    Unordered,
+    canonical_arguments,
+    dao_key_builder,
+)
+
+__all__ = [
+    "NotKeyed",
+    "TwoTierBackend",
+    "Unordered",
+    "cache",
+    "cache_stats",
+    "canonical_arguments",
+    "dao_key_builder",
+]
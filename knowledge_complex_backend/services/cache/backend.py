@@ -0,0 +1,209 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+import uuid
+from typing import Any, Optional
+
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Payload of one key in the local tier."""
+
+    __slots__ = ("payload", "expires_at")
+
+    def __init__(self, payload: bytes, expires_at: Optional[float]) -> None:
+        self.payload = payload
+        self.expires_at = expires_at
+
+
+class TwoTierBackend(Backend):
+    """
+    In-process LRU in front of a Redis backend.
+
+    Values read from or written to Redis are kept locally until their Redis
+    TTL runs out, or until the payloads exceed ``max_bytes`` in which case
+    the least recently used keys are dropped. Only payloads are kept, every
+    hit is decoded into a fresh value that the caller may modify.
+
+    Writes and clears are published on ``channel``; the other workers drop
+    the keys from their local tier when they receive the message.
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        max_bytes: int,
+        channel: str,
+    ) -> None:
+        self.remote = RedisBackend(redis)
+        self.redis = redis
+        self.max_bytes = max_bytes
+        self._channel = channel
+        self._worker_id = uuid.uuid4().hex
+        self.size = 0
+        self.stats: collections.Counter[str] = collections.Counter()
+        self._entries: collections.OrderedDict[str, _Entry] = collections.OrderedDict()
+        self._listener: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_with_ttl(self, key: str) -> tuple[int, Optional[bytes]]:
+        """
+        Read a payload and its remaining TTL, locally first.
+
+        :param key: cache key.
+        :return: TTL in seconds and payload, or None when missing.
+        """
+        entry = await self._get_entry(key)
+        if entry is None:
+            return 0, None
+        return self._ttl(entry), entry.payload
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a payload, locally first.
+
+        :param key: cache key.
+        :return: payload, or None when missing.
+        """
+        _, payload = await self.get_with_ttl(key)
+        return payload
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        """
+        Write a payload to Redis and to the local tier.
+
+        :param key: cache key.
+        :param value: payload.
+        :param expire: TTL in seconds.
+        """
+        await self.remote.set(key, value, expire)
+        self._store(key, value, expire)
+        await self._publish({"keys": [key]})
+
+    async def clear(
+        self,
+        namespace: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> int:
+        """
+        Delete a key or a namespace from both tiers of every worker.
+
+        :param namespace: namespace to delete.
+        :param key: key to delete.
+        :return: number of keys deleted from Redis.
+        """
+        deleted = await self.remote.clear(namespace, key)
+        message: dict[str, Any] = (
+            {"namespace": namespace} if namespace else {"keys": [key]}
+        )
+        self._invalidate(message)
+        await self._publish(message)
+        return deleted
+
+    def start(self) -> None:
+        """Start listening to the invalidations of the other workers."""
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening to invalidations."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass  # noqa: WPS420
+
+    async def _get_entry(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at is None or entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["l1_hit"] += 1
+                return entry
+            self._drop(key)
+
+        self.stats["l1_miss"] += 1
+        ttl, payload = await self.remote.get_with_ttl(key)
+        if payload is None:
+            return None
+        # TTL -1 means the key has no expiry in Redis
+        return self._store(key, payload, ttl if ttl > 0 else None)
+
+    def _store(
+        self,
+        key: str,
+        payload: bytes,
+        expire: Optional[int],
+    ) -> Optional[_Entry]:
+        self._drop(key)
+        entry = _Entry(payload, time.monotonic() + expire if expire else None)
+        if len(payload) > self.max_bytes:
+            return entry
+
+        self._entries[key] = entry
+        self.size += len(payload)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+        return entry
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry.payload)
+        return True
+
+    def _ttl(self, entry: _Entry) -> int:
+        if entry.expires_at is None:
+            return -1
+        return max(int(entry.expires_at - time.monotonic()), 0)
+
+    def _invalidate(self, message: dict[str, Any]) -> None:
+        namespace = message.get("namespace")
+        if namespace:
+            keys = [key for key in self._entries if key.startswith(f"{namespace}:")]
+        else:
+            keys = message.get("keys", [])
+        self.stats["invalidated"] += sum(map(self._drop, keys))
+
+    async def _publish(self, message: dict[str, Any]) -> None:
+        try:
+            await self.redis.publish(
+                self._channel,
+                json.dumps({"worker": self._worker_id, **message}),
+            )
+        except Exception:
+            logger.warning("Error publishing cache invalidation:", exc_info=True)
+
+    async def _listen(self) -> None:
+        while True:  # noqa: WPS457
+            try:
+                await self._subscribe()
+            except Exception:
+                logger.warning("Cache invalidation listener failed:", exc_info=True)
+                # a missed invalidation may leave stale keys, start over empty
+                self._entries.clear()
+                self.size = 0
+                await asyncio.sleep(1)
+
+    async def _subscribe(self) -> None:
+        async with self.redis.pubsub() as pubsub:
+            await pubsub.subscribe(self._channel)
+            async for message in pubsub.listen():
+                self._receive(message)
+
+    def _receive(self, message: dict[str, Any]) -> None:
+        if message["type"] != "message":
+            return
+        body = json.loads(message["data"])
+        if body.get("worker") != self._worker_id:
+            self._invalidate(body)
@@ -0,0 +1,493 @@
+import asyncio
+import collections
+import logging
+import uuid
+from functools import partial, wraps
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Optional, Type
+
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi_cache import FastAPICache
+from fastapi_cache.coder import Coder
+from fastapi_cache.types import Backend, KeyBuilder
+
+from knowledge_complex_backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+AsyncFunction = Callable[..., Awaitable[Any]]
+# result of a computation and its encoded payload
+Computed = tuple[Any, Optional[bytes]]
+
+# Counters of this worker: hit, stale, miss, executed, coalesced, remote_hit,
+# lock_timeout
+cache_stats: collections.Counter[str] = collections.Counter()
+
+# Marks a result that was computed by another worker
+_PEER = object()
+
+# Marks a key that is not cached
+MISSING = object()
+
+# Strong references to the running background refreshes
+_refreshes: set[asyncio.Future[Any]] = set()
+
+
+class SingleFlight:
+    """
+    One in-flight computation per key inside this worker.
+
+    Callers that arrive while the key is being computed await the same task
+    instead of starting their own. The task is shielded, so a cancelled
+    caller (e.g. a closed connection) does not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, asyncio.Future[Any]] = {}
+
+    async def run(
+        self,
+        key: str,
+        compute: AsyncFunction,
+    ) -> tuple[Any, bool]:
+        """
+        Await the computation of ``key``, starting it if needed.
+
+        :param key: cache key.
+        :param compute: coroutine function computing the value.
+        :return: value and whether it was started by another caller.
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = asyncio.ensure_future(compute())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            cache_stats["coalesced"] += 1
+        return await asyncio.shield(flight), shared
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+
+single_flight = SingleFlight()
+
+
+async def _lookup(
+    backend: Backend,
+    key: str,
+    coder: Type[Coder],
+    return_type: Any,
+) -> tuple[int, Any]:
+    """
+    Read and decode a cached value.
+
+    Every hit is decoded, so callers never share a value, as on a miss.
+    Backend errors are logged and read as a miss.
+
+    :param backend: cache backend.
+    :param key: cache key.
+    :param coder: coder of the value.
+    :param return_type: type the value is decoded as.
+    :return: remaining TTL and value, or ``MISSING``.
+    """
+    try:
+        ttl, cached = await backend.get_with_ttl(key)
+    except Exception:
+        logger.warning(
+            f"Error retrieving cache key '{key}' from backend:",
+            exc_info=True,
+        )
+        return 0, MISSING
+    if cached is None:
+        return ttl, MISSING
+    return ttl, coder.decode_as_type(cached, type_=return_type)
+
+
+def _refresh_done(key: str, task: asyncio.Future[Any]) -> None:
+    """
+    Forget a finished background refresh, logging its error.
+
+    :param key: cache key.
+    :param task: refresh task.
+    """
+    _refreshes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(
+            f"Error refreshing cache key '{key}':",
+            exc_info=task.exception(),
+        )
+
+
+def _revalidate(key: str, compute: AsyncFunction) -> None:
+    """
+    Recompute a stale key in the background, once per worker.
+
+    :param key: cache key.
+    :param compute: coroutine function recomputing and storing the value.
+    """
+    refresh_key = f"{key}:refresh"
+    if refresh_key in single_flight:
+        return
+    task = asyncio.ensure_future(single_flight.run(refresh_key, compute))
+    _refreshes.add(task)
+    task.add_done_callback(partial(_refresh_done, key))
+
+
+async def _wait_for_peer(redis: Any, key: str, lock_key: str) -> Optional[bytes]:
+    """
+    Poll for the value another worker is computing.
+
+    :param redis: redis client of the backend.
+    :param key: cache key.
+    :param lock_key: lock held by the other worker.
+    :return: cached payload, or None when the wait timed out or the lock
+        was released without a value.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.cache_lock_wait
+    while loop.time() < deadline:
+        await asyncio.sleep(settings.cache_lock_poll)
+        payload = await redis.get(key)
+        if payload is not None:
+            return payload
+        if not await redis.exists(lock_key):
+            return None
+    return None
+
+
+async def _peer_result(
+    redis: Any,
+    key: str,
+    wait: bool,
+) -> Optional[Computed]:
+    """
+    Result of the worker holding the lock of a key.
+
+    :param redis: redis client of the backend.
+    :param key: cache key.
+    :param wait: whether to wait for the other worker.
+    :return: ``_PEER`` and the payload it stored, or None when the wait
+        timed out and the value should be computed anyway.
+    """
+    if not wait:
+        return _PEER, None
+    payload = await _wait_for_peer(redis, key, f"{key}:lock")
+    if payload is None:
+        cache_stats["lock_timeout"] += 1
+        return None
+    cache_stats["remote_hit"] += 1
+    return _PEER, payload
+
+
+async def _lock(redis: Any, key: str, token: str) -> Optional[bool]:
+    """
+    Take the ``<key>:lock`` lock for ``cache_lock_timeout`` seconds.
+
+    :param redis: redis client of the backend.
+    :param key: cache key.
+    :param token: value identifying the holder.
+    :return: whether the lock was taken, None when Redis failed.
+    """
+    lock_key = f"{key}:lock"
+    timeout = int(settings.cache_lock_timeout * 1000)
+    try:
+        locked = await redis.set(lock_key, token, nx=True, px=timeout)
+    except Exception:
+        logger.warning(f"Error locking cache key '{key}':", exc_info=True)
+        return None
+    return bool(locked)
+
+
+async def _unlock(redis: Any, key: str, token: str) -> None:
+    """
+    Delete the lock if it still holds our token, it may have expired.
+
+    :param redis: redis client of the backend.
+    :param key: cache key.
+    :param token: value identifying the holder.
+    """
+    lock_key = f"{key}:lock"
+    try:
+        async with redis.pipeline() as pipe:
+            await pipe.watch(lock_key)
+            if await pipe.get(lock_key) == token.encode():
+                pipe.multi()
+                pipe.delete(lock_key)
+                await pipe.execute()
+            else:
+                await pipe.unwatch()
+    except Exception:
+        logger.warning(f"Error unlocking cache key '{key}':", exc_info=True)
+
+
+async def _store(
+    backend: Backend,
+    key: str,
+    payload: bytes,
+    expire: Optional[int],
+) -> None:
+    """
+    Write a value, backend errors are only logged.
+
+    :param backend: cache backend.
+    :param key: cache key.
+    :param payload: encoded value.
+    :param expire: seconds to keep the value.
+    """
+    try:
+        await backend.set(key, payload, expire)
+    except Exception:
+        logger.warning(f"Error setting cache key '{key}':", exc_info=True)
+
+
+async def _compute(  # noqa: WPS210, WPS211
+    call: Callable[[], Awaitable[Any]],
+    backend: Backend,
+    key: str,
+    coder: Type[Coder],
+    expire: Optional[int],
+    wait: bool = True,
+) -> Computed:
+    """
+    Compute a missing value once across workers and store it.
+
+    With a Redis backend the worker that takes the ``<key>:lock`` lock runs
+    the function, the others poll for its result for at most
+    ``cache_lock_wait`` seconds before running it themselves. Without
+    ``wait`` they give up at once, which is what background refreshes do.
+
+    :param call: coroutine function computing the value.
+    :param backend: cache backend.
+    :param key: cache key.
+    :param coder: coder of the value.
+    :param expire: seconds to keep the value.
+    :param wait: whether to wait for another worker holding the lock.
+    :return: result (or ``_PEER``) and the encoded payload.
+    """
+    redis = getattr(backend, "redis", None)
+    token = uuid.uuid4().hex
+    locked = None if redis is None else await _lock(redis, key, token)
+    if locked is False:
+        peer = await _peer_result(redis, key, wait)
+        if peer is not None:
+            return peer
+
+    try:  # noqa: WPS501
+        cache_stats["executed"] += 1
+        result = await call()
+        payload = coder.encode(result)
+        await _store(backend, key, payload, expire)
+        return result, payload
+    finally:
+        if locked:
+            await _unlock(redis, key, token)
+
+
+class _CachedFunction:
+    """
+    Cache of one decorated function.
+
+    The FastAPICache defaults are read on every call, the cache may be
+    initialized after the decoration.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        func: AsyncFunction,
+        expire: Optional[int],
+        coder: Optional[Type[Coder]],
+        key_builder: Optional[KeyBuilder],
+        namespace: str,
+        soft_expire: Optional[int],
+    ) -> None:
+        self.func = func
+        self.return_type = get_typed_return_annotation(func)
+        self._expire = expire
+        self._coder = coder
+        self._key_builder = key_builder
+        self._namespace = namespace
+        self._soft_expire = soft_expire
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Cached value of the arguments, computed once on a miss.
+
+        :param args: positional arguments of the function.
+        :param kwargs: keyword arguments of the function.
+        :return: value.
+        """
+        if not FastAPICache.get_enable():
+            return await self.func(*args, **kwargs)
+
+        coder = self._coder or FastAPICache.get_coder()
+        key = await self.cache_key(*args, **kwargs)
+        ttl, cached = await _lookup(
+            FastAPICache.get_backend(),
+            key,
+            coder,
+            self.return_type,
+        )
+        if cached is not MISSING:
+            cache_stats["hit"] += 1
+            if self._is_stale(ttl):
+                cache_stats["stale"] += 1
+                _revalidate(key, self._compute(key, args, kwargs, wait=False))
+            return cached
+
+        return await self._miss(key, args, kwargs)
+
+    async def refresh(self, *args: Any, **kwargs: Any) -> bool:
+        """
+        Recompute and store the value, whatever is cached.
+
+        :param args: positional arguments of the function.
+        :param kwargs: keyword arguments of the function.
+        :return: False when another worker was already recomputing it.
+        """
+        key = await self.cache_key(*args, **kwargs)
+        compute = self._compute(key, args, kwargs, wait=False)
+        result, _ = await single_flight.run(f"{key}:refresh", compute)
+        return result is not _PEER
+
+    async def cache_key(self, *args: Any, **kwargs: Any) -> str:
+        """
+        Key the value of these arguments is stored at.
+
+        :param args: positional arguments of the function.
+        :param kwargs: keyword arguments of the function.
+        :return: cache key.
+        """
+        key_builder = self._key_builder or FastAPICache.get_key_builder()
+        key = key_builder(
+            self.func,
+            f"{FastAPICache.get_prefix()}:{self._namespace}",
+            args=args,
+            kwargs=kwargs,
+        )
+        if isawaitable(key):
+            key = await key
+        return key
+
+    async def _miss(
+        self,
+        key: str,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> Any:
+        """
+        Compute a missing value, once for the concurrent callers.
+
+        :param key: cache key.
+        :param args: positional arguments of the function.
+        :param kwargs: keyword arguments of the function.
+        :return: value.
+        """
+        cache_stats["miss"] += 1
+        compute = self._compute(key, args, kwargs)
+        (result, payload), shared = await single_flight.run(key, compute)
+        if shared or result is _PEER:
+            # every caller gets its own copy, as on a cache hit
+            coder = self._coder or FastAPICache.get_coder()
+            return coder.decode_as_type(payload, type_=self.return_type)
+        return result
+
+    def _compute(
+        self,
+        key: str,
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        wait: bool = True,
+    ) -> AsyncFunction:
+        """
+        Bind ``_compute`` to a call of the function.
+
+        :param key: cache key.
+        :param args: positional arguments of the function.
+        :param kwargs: keyword arguments of the function.
+        :param wait: whether to wait for another worker holding the lock.
+        :return: coroutine function computing and storing the value.
+        """
+        return partial(
+            _compute,
+            partial(self.func, *args, **kwargs),
+            FastAPICache.get_backend(),
+            key,
+            self._coder or FastAPICache.get_coder(),
+            self._expire or FastAPICache.get_expire(),
+            wait,
+        )
+
+    def _is_stale(self, ttl: int) -> bool:
+        """
+        Whether a value is older than ``soft_expire``.
+
+        :param ttl: remaining TTL of the value.
+        :return: True when it should be recomputed.
+        """
+        expire = self._expire or FastAPICache.get_expire()
+        if not self._soft_expire or not expire or ttl < 0:
+            return False
+        # the age of a value is its lifetime minus its remaining TTL
+        return expire - ttl >= self._soft_expire
+
+
+def cache(
+    expire: Optional[int] = None,
+    coder: Optional[Type[Coder]] = None,
+    key_builder: Optional[KeyBuilder] = None,
+    namespace: str = "",
+    soft_expire: Optional[int] = None,
+) -> Callable[[AsyncFunction], AsyncFunction]:
+    """
+    Cache DAO methods in the FastAPICache backend.
+
+    Same arguments and storage as ``fastapi_cache.decorator.cache``, but
+    concurrent misses of the same key are coalesced: within a worker they
+    share one computation, and across workers a Redis lock lets one of them
+    compute while the others wait for its result.
+
+    With ``soft_expire`` values older than ``soft_expire`` seconds are still
+    served, but trigger a background recomputation that rewrites the entry.
+    ``expire`` stays the hard limit after which callers wait for the query.
+
+    The decorated function gets two more coroutine functions taking the
+    same arguments: ``refresh`` recomputes and stores the value and
+    ``cache_key`` returns the key it is stored at.
+
+    Unlike the fastapi_cache decorator this one does not inject the request
+    or response, it is meant for DAO methods rather than endpoints.
+
+    :param expire: seconds to keep the value.
+    :param coder: coder of the values.
+    :param key_builder: builder of the cache key.
+    :param namespace: namespace of the cache key.
+    :param soft_expire: seconds after which a value is refreshed.
+    :return: decorator.
+    """
+
+    def wrapper(func: AsyncFunction) -> AsyncFunction:
+        cached = _CachedFunction(
+            func,
+            expire,
+            coder,
+            key_builder,
+            namespace,
+            soft_expire,
+        )
+
+        # a function rather than ``cached`` itself, so that it binds to the
+        # DAO instance like the method it decorates
+        @wraps(func)
+        async def inner(*args: Any, **kwargs: Any) -> Any:  # noqa: WPS430
+            return await cached(*args, **kwargs)
+
+        inner.refresh = cached.refresh  # type: ignore[attr-defined]
+        inner.cache_key = cached.cache_key  # type: ignore[attr-defined]
+        return inner
+
+    return wrapper
@@ -0,0 +1,155 @@
+import enum
+import hashlib
+import inspect
+import json
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Optional,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from knowledge_complex_backend.settings import settings
+
+ValueT = TypeVar("ValueT")
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+
+class KeyPart(enum.Enum):
+    """How an annotated argument enters the cache key."""
+
+    unordered = "unordered"
+    skipped = "skipped"
+
+
+# a list argument whose order and duplicates do not change the result
+Unordered = Annotated[list[ValueT], KeyPart.unordered]
+# an argument left out of the key, such as a driver or a pool
+NotKeyed = Annotated[ValueT, KeyPart.skipped]
+
+
+def _key_part(annotation: Any) -> Optional[KeyPart]:
+    for marker in getattr(annotation, "__metadata__", ()):
+        if isinstance(marker, KeyPart):
+            return marker
+    if get_origin(annotation) is Union:  # Optional[Unordered[...]]
+        for argument in get_args(annotation):
+            key_part = _key_part(argument)
+            if key_part is not None:
+                return key_part
+    return None
+
+
+def _canonical_items(items: Any, unordered: bool) -> list[Any]:
+    canonical = [_canonicalize(item) for item in items]
+    if not unordered:
+        return canonical
+    unique = {json.dumps(item, sort_keys=True): item for item in canonical}
+    return [unique[key] for key in sorted(unique)]
+
+
+def _canonicalize(value: Any, unordered: bool = False) -> Any:  # noqa: C901, WPS212
+    """
+    Turn an argument into plain data.
+
+    Sets, and lists annotated as ``Unordered``, are sorted and
+    deduplicated, other lists keep their order. Pydantic models are
+    replaced by their fields.
+
+    :param value: argument value.
+    :param unordered: whether the value is compared as a set.
+    :return: canonical value.
+    :raises TypeError: if the value can not be part of a cache key.
+    """
+    if isinstance(value, enum.Enum):
+        value = value.value
+    if isinstance(value, _PLAIN_TYPES):
+        return value
+    if isinstance(value, BaseModel):
+        return _canonicalize(value.dict())
+    if isinstance(value, (list, tuple)):
+        return _canonical_items(value, unordered)
+    if isinstance(value, (set, frozenset)):
+        return _canonical_items(value, unordered=True)
+    if isinstance(value, dict):
+        return {str(key): _canonicalize(item) for key, item in value.items()}
+    type_name = type(value).__name__
+    raise TypeError(
+        f"{type_name} argument can not be part of a cache key, "
+        "annotate it as NotKeyed",
+    )
+
+
+def canonical_arguments(
+    func: Callable[..., Any],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Bind the call arguments to parameter names and canonicalize them.
+
+    Positional and keyword calls give the same result, defaults are filled
+    in and the bound ``self`` of DAO methods is dropped, like the arguments
+    annotated as ``NotKeyed``.
+
+    :param func: called function.
+    :param args: positional arguments.
+    :param kwargs: keyword arguments.
+    :return: canonical arguments keyed by parameter name.
+    """
+    bound = inspect.signature(func).bind_partial(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {}
+    for name, value in bound.arguments.items():
+        key_part = _key_part(bound.signature.parameters[name].annotation)
+        if name in {"self", "cls"} or key_part is KeyPart.skipped:
+            continue
+        arguments[name] = _canonicalize(value, key_part is KeyPart.unordered)
+    return arguments
+
+
+def dao_key_builder(  # noqa: WPS211
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+) -> str:
+    """
+    Build a cache key that is the same for every DAO instance.
+
+    The key looks like ``<namespace>:v<version>:<module>.<qualname>:<digest>``
+    where the digest covers the canonical arguments only.
+
+    :param func: cached function.
+    :param namespace: cache prefix and namespace.
+    :param request: current request, unused.
+    :param response: current response, unused.
+    :param args: positional arguments.
+    :param kwargs: keyword arguments.
+    :return: cache key.
+    """
+    arguments = json.dumps(
+        canonical_arguments(func, args, kwargs),
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    digest = hashlib.md5(arguments.encode()).hexdigest()  # noqa: S324
+    return ":".join(
+        (
+            namespace.rstrip(":"),
+            f"v{settings.cache_version}",
+            f"{func.__module__}.{func.__qualname__}",
+            digest,
+        ),
+    )
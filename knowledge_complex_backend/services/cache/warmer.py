@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Callable, NamedTuple, Optional, Sequence
+
+from knowledge_complex_backend.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WarmEntry(NamedTuple):
+    """A cached DAO method and the arguments it is kept warm for."""
+
+    method: str
+    kwargs: dict[str, Any] = {}
+
+    @property
+    def name(self) -> str:
+        """
+        Readable name of the call.
+
+        :return: e.g. ``country_eci(flow=paper)``.
+        """
+        pairs = sorted(self.kwargs.items())
+        arguments = [f"{name}={value}" for name, value in pairs]
+        joined = ",".join(arguments)
+        return f"{self.method}({joined})"
+
+
+class CacheWarmer:
+    """
+    Recomputes hot cached DAO calls before they expire.
+
+    A round refreshes every entry, ``cache_warmer_concurrency`` at a time so
+    the database is not flooded. One round runs at startup and then every
+    ``cache_warmer_interval`` seconds; a Redis lock lets only one worker run
+    each round. The outcome of every entry is kept in a Redis hash, so any
+    worker can report it.
+    """
+
+    def __init__(
+        self,
+        dao_factory: Callable[[], Any],
+        entries: Sequence[WarmEntry],
+        redis: Any,
+        prefix: str,
+    ) -> None:
+        self.dao_factory = dao_factory
+        self.entries = list(entries)
+        self.redis = redis
+        self.round_key = f"{prefix}:warmer:round"
+        self.status_key = f"{prefix}:warmer:status"
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def warm(self) -> None:
+        """Refresh every entry once."""
+        dao = self.dao_factory()
+        semaphore = asyncio.Semaphore(settings.cache_warmer_concurrency)
+        await asyncio.gather(
+            *(self._warm_entry(dao, entry, semaphore) for entry in self.entries),
+        )
+
+    async def report(self) -> list[dict[str, Any]]:
+        """
+        Last refresh of every entry and whether it is cached right now.
+
+        :return: one status per entry.
+        """
+        dao = self.dao_factory()
+        statuses = await self.redis.hgetall(self.status_key)
+        return [await self._status(dao, entry, statuses) for entry in self.entries]
+
+    def start(self) -> None:
+        """Schedule the rounds."""
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Cancel the rounds."""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _warm_entry(
+        self,
+        dao: Any,
+        entry: WarmEntry,
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        async with semaphore:
+            method = getattr(type(dao), entry.method)
+            started = time.monotonic()
+            status: dict[str, Any] = {"warmed_at": int(time.time())}
+            try:
+                status["computed"] = await method.refresh(dao, **entry.kwargs)
+            except Exception as exc:
+                logger.exception(f"Error warming {entry.name}")
+                status["error"] = repr(exc)
+            status["seconds"] = round(time.monotonic() - started, 3)
+        await self.redis.hset(self.status_key, entry.name, json.dumps(status))
+
+    async def _status(
+        self,
+        dao: Any,
+        entry: WarmEntry,
+        statuses: dict[bytes, bytes],
+    ) -> dict[str, Any]:
+        method = getattr(type(dao), entry.method)
+        key = await method.cache_key(dao, **entry.kwargs)
+        ttl = await self.redis.ttl(key)
+        status = statuses.get(entry.name.encode())
+        last_refresh = json.loads(status) if status else {}
+        return {
+            "name": entry.name,
+            "warm": ttl > 0,
+            "ttl": max(ttl, 0),
+            **last_refresh,
+        }
+
+    async def _run(self) -> None:
+        while True:  # noqa: WPS457
+            try:
+                taken = await self.redis.set(
+                    self.round_key,
+                    "1",
+                    nx=True,
+                    ex=settings.cache_warmer_interval,
+                )
+                if taken:
+                    await self.warm()
+            except Exception:
+                logger.exception("cache warmer round failed")
+            await asyncio.sleep(settings.cache_warmer_interval)
@@ -0,0 +1,20 @@
+"""Economic complexity computations."""
+from knowledge_complex_backend.services.complexity.eci import (
+    complexity,
+    count_matrix,
+    rca,
+)
+from knowledge_complex_backend.services.complexity.proximity import ProximityMatrix
+from knowledge_complex_backend.services.complexity.similarity import (
+    CountrySimilarity,
+    IndexCache,
+)
+
+__all__ = [
+    "CountrySimilarity",
+    "IndexCache",
+    "ProximityMatrix",
+    "complexity",
+    "count_matrix",
+    "rca",
+]
@@ -0,0 +1,162 @@
+from typing import Any, Sequence
+
+import numpy
+from numpy.typing import NDArray
+
+METHODS = ("eigenvector", "reflections")
+
+Vector = NDArray[numpy.float64]
+
+# country labels, category labels and their counts
+CountMatrix = tuple[
+    NDArray[numpy.str_],
+    NDArray[numpy.str_],
+    NDArray[numpy.float64],
+]
+
+# ECI, PCI and the rows and columns of the counts they belong to
+Complexity = tuple[
+    Vector,
+    Vector,
+    NDArray[numpy.intp],
+    NDArray[numpy.intp],
+]
+
+
+def count_matrix(rows: Sequence[Sequence[Any]]) -> CountMatrix:  # noqa: WPS210
+    """
+    Pivot ``(country, category, count)`` rows into a matrix.
+
+    Repeated pairs are summed.
+
+    :param rows: rows.
+    :return: country labels, category labels and the country × category
+        counts, labels sorted.
+    """
+    if not len(rows):
+        empty = numpy.array([], dtype=str)
+        return empty, empty, numpy.zeros((0, 0))
+    countries, categories, counts = zip(*rows)
+    country_labels, country_codes = numpy.unique(
+        numpy.array(countries, dtype=str),
+        return_inverse=True,
+    )
+    category_labels, category_codes = numpy.unique(
+        numpy.array(categories, dtype=str),
+        return_inverse=True,
+    )
+    matrix = numpy.zeros((len(country_labels), len(category_labels)))
+    cells = (country_codes, category_codes)
+    numpy.add.at(matrix, cells, numpy.asarray(counts, dtype=numpy.float64))
+    return country_labels, category_labels, matrix
+
+
+def rca(counts: NDArray[Any]) -> NDArray[numpy.float64]:
+    """
+    Revealed comparative advantage (Balassa index) of a count matrix.
+
+    ``RCA[c, p] = (X[c, p] / X[c, :]) / (X[:, p] / X)``, zero for empty
+    rows and columns.
+
+    :param counts: country × category counts.
+    :return: RCA of every cell.
+    """
+    values = numpy.asarray(counts, dtype=numpy.float64)
+    total = values.sum()
+    row = values.sum(axis=1, keepdims=True)
+    column = values.sum(axis=0, keepdims=True)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        result = values * total / (row * column)
+    return numpy.nan_to_num(result, nan=0, posinf=0)
+
+
+def _standardize(values: NDArray[numpy.float64]) -> NDArray[numpy.float64]:
+    if not len(values) or values.std() == 0:
+        return numpy.zeros_like(values)
+    return (values - values.mean()) / values.std()
+
+
+def _eigenvector(
+    specialized: NDArray[numpy.float64],
+    diversity: NDArray[numpy.float64],
+    ubiquity: NDArray[numpy.float64],
+) -> NDArray[numpy.float64]:
+    # M~ = D_c^-1 M D_p^-1 M^T is similar to the symmetric
+    # S = D_c^-1/2 M D_p^-1 M^T D_c^-1/2, whose eigenvectors v give
+    # the ones of M~ as D_c^-1/2 v. ECI is the second largest one.
+    row_scale = numpy.sqrt(diversity)[:, None]
+    scaled = specialized / row_scale / numpy.sqrt(ubiquity)
+    _, vectors = numpy.linalg.eigh(scaled @ scaled.T)
+    return vectors[:, -2] / numpy.sqrt(diversity)
+
+
+def _reflections(
+    specialized: NDArray[numpy.float64],
+    diversity: NDArray[numpy.float64],
+    ubiquity: NDArray[numpy.float64],
+    iterations: int,
+) -> NDArray[numpy.float64]:
+    countries, products = diversity, ubiquity
+    for _ in range(iterations):
+        countries, products = (
+            specialized @ products / diversity,
+            specialized.T @ countries / ubiquity,
+        )
+    return countries
+
+
+def _orient(eci: Vector, diversity: Vector) -> Vector:
+    # ECI grows with diversity
+    centered = diversity - diversity.mean()
+    if numpy.dot(eci - eci.mean(), centered) < 0:
+        return -eci
+    return eci
+
+
+def complexity(  # noqa: WPS210
+    counts: NDArray[Any],
+    method: str = "eigenvector",
+    iterations: int = 18,
+    threshold: float = 1,
+) -> Complexity:
+    """
+    Economic and product complexity of a country × category count matrix.
+
+    Countries are specialized in the categories where their RCA reaches
+    ``threshold``. With ``eigenvector`` ECI is the eigenvector of the second
+    largest eigenvalue of ``M~ = D_c^-1 M D_p^-1 M^T``; with ``reflections``
+    it is diversity refined by ``iterations`` (even) steps of the method of
+    reflections. PCI is the mean ECI of the countries specialized in a
+    category. Both are standardized; ECI is oriented to grow with diversity.
+
+    Countries and categories without any specialization get no index.
+
+    :param counts: country × category counts.
+    :param method: "eigenvector" or "reflections".
+    :param iterations: steps of the method of reflections.
+    :param threshold: RCA threshold.
+    :raises ValueError: for an unknown method.
+    :return: ECI, PCI, and the row and column indices of ``counts`` they
+        belong to.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown complexity method {method}")
+    specialized = (rca(counts) >= threshold).astype(numpy.float64)
+    rows = numpy.flatnonzero(specialized.sum(axis=1))
+    specialized = specialized[rows]
+    columns = numpy.flatnonzero(specialized.sum(axis=0))
+    specialized = specialized[:, columns]
+
+    diversity = specialized.sum(axis=1)
+    ubiquity = specialized.sum(axis=0)
+    if len(rows) < 2:
+        eci = numpy.zeros(len(rows))
+    elif method == "eigenvector":
+        eci = _orient(_eigenvector(specialized, diversity, ubiquity), diversity)
+    else:
+        eci = _orient(
+            _reflections(specialized, diversity, ubiquity, iterations),
+            diversity,
+        )
+    pci = specialized.T @ eci / ubiquity
+    return _standardize(eci), _standardize(pci), rows, columns
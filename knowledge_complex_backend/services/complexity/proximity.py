@@ -0,0 +1,238 @@
+import hashlib
+from typing import Any, Optional
+
+import numpy
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.services.complexity.eci import rca
+
+# bytes of a matrix fingerprint
+_DIGEST_SIZE = 16
+
+# (category, proximity or density) pairs, highest first
+Pairs = list[tuple[str, float]]
+
+
+def fingerprint(
+    countries: NDArray[Any],
+    categories: NDArray[Any],
+    counts: NDArray[Any],
+) -> str:
+    """
+    Digest of a country × category count matrix and its labels.
+
+    :param countries: row labels.
+    :param categories: column labels.
+    :param counts: counts.
+    :return: hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    digest.update("\0".join(map(str, countries)).encode())
+    digest.update(b"\1")
+    digest.update("\0".join(map(str, categories)).encode())
+    digest.update(numpy.ascontiguousarray(counts, dtype=numpy.int64).tobytes())
+    return digest.hexdigest()
+
+
+class ProximityMatrix:
+    """
+    Product space of a country × category count matrix.
+
+    The proximity of two categories is the minimum conditional probability
+    of a country being specialized (RCA >= 1) in one given the other,
+    ``phi[p, q] = co[p, q] / max(k_p, k_q)``. Only the ``top_k`` closest
+    categories of each category are kept, as a float32 CSR matrix with
+    every row sorted by decreasing proximity.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        countries: NDArray[Any],
+        categories: NDArray[Any],
+        specialized: NDArray[numpy.bool_],
+        indptr: NDArray[numpy.int64],
+        indices: NDArray[numpy.int32],
+        values: NDArray[numpy.float32],
+        digest: str = "",
+    ) -> None:
+        self.countries = countries
+        self.categories = categories
+        self._specialized = specialized
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.digest = digest
+        self._country_lookup = {
+            str(label): code for code, label in enumerate(countries)
+        }
+        self._category_lookup = {
+            str(label): code for code, label in enumerate(categories)
+        }
+        # row of every stored entry, and the proximity sum of every row
+        self._rows = numpy.repeat(
+            numpy.arange(len(categories), dtype=numpy.int32),
+            numpy.diff(indptr),
+        )
+        self._row_sums = numpy.bincount(
+            self._rows,
+            weights=values,
+            minlength=len(categories),
+        )
+
+    @classmethod
+    def build(  # noqa: WPS210, WPS211
+        cls,
+        countries: NDArray[Any],
+        categories: NDArray[Any],
+        counts: NDArray[Any],
+        top_k: int = 50,
+        block: int = 256,
+    ) -> "ProximityMatrix":
+        """
+        Compute the proximities ``block`` categories at a time.
+
+        Only a ``block`` × categories slice of the co-occurrence matrix is
+        held at once, the ``top_k`` largest proximities of each row are
+        picked with ``argpartition``.
+
+        :param countries: row labels of ``counts``.
+        :param categories: column labels of ``counts``.
+        :param counts: country × category counts.
+        :param top_k: proximities kept per category.
+        :param block: categories computed at once.
+        :return: sparse proximity matrix.
+        """
+        specialized = rca(counts) >= 1
+        occurrences = specialized.astype(numpy.float32)
+        ubiquity = occurrences.sum(axis=0)
+        size = len(categories)
+        keep = max(min(top_k, size - 1), 0)
+
+        row_sizes = numpy.zeros(size, dtype=numpy.int64)
+        indices, values = [], []
+        for start in range(0, size, block):
+            rows = slice(start, min(start + block, size))
+            phi = _proximity_block(occurrences, ubiquity, rows)
+            top, top_values = _top_proximities(phi, keep)
+            present = top_values > 0
+            indices.append(top[present].astype(numpy.int32))
+            values.append(top_values[present])
+            row_sizes[rows] = present.sum(axis=1)
+
+        indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+        numpy.cumsum(row_sizes, out=indptr[1:])
+        return cls(
+            countries=numpy.asarray(countries),
+            categories=numpy.asarray(categories),
+            specialized=specialized,
+            indptr=indptr,
+            indices=numpy.concatenate(indices or [numpy.zeros(0, numpy.int32)]),
+            values=numpy.concatenate(values or [numpy.zeros(0, numpy.float32)]),
+            digest=fingerprint(countries, categories, counts),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the sparse matrix.
+
+        :return: bytes.
+        """
+        return self.indptr.nbytes + self.indices.nbytes + self.values.nbytes
+
+    def related_categories(self, category: str, limit: int) -> Optional[Pairs]:
+        """
+        Categories closest to ``category``.
+
+        :param category: category label.
+        :param limit: number of categories.
+        :return: ``(category, proximity)`` pairs, closest first, None for an
+            unknown category.
+        """
+        code = self._category_lookup.get(category)
+        if code is None:
+            return None
+        start = self.indptr[code]
+        stop = min(start + limit, self.indptr[code + 1])
+        row = slice(start, stop)
+        return self._pairs(self.indices[row], self.values[row])
+
+    def related_to_country(self, country: str, limit: int) -> Optional[Pairs]:
+        """
+        Categories a country is not specialized in, by relatedness density.
+
+        The density of a category is the share of its proximity that goes
+        to categories the country is specialized in.
+
+        :param country: country label.
+        :param limit: number of categories.
+        :return: ``(category, density)`` pairs, densest first, None for an
+            unknown country.
+        """
+        code = self._country_lookup.get(country)
+        if code is None:
+            return None
+        owned = self._specialized[code]
+        density = self._density(owned)
+        candidates = numpy.flatnonzero(~owned & (density > 0))  # noqa: WPS465
+        top = _densest(candidates, density[candidates], limit)
+        return self._pairs(top, density[top])
+
+    def _density(self, owned: NDArray[numpy.bool_]) -> NDArray[numpy.float64]:
+        weights = self.values * owned[self.indices]
+        sums = numpy.bincount(
+            self._rows,
+            weights=weights,
+            minlength=len(self.categories),
+        )
+        return sums / numpy.where(self._row_sums > 0, self._row_sums, 1)
+
+    def _pairs(self, codes: NDArray[Any], values: NDArray[Any]) -> Pairs:
+        return [
+            (str(self.categories[code]), round(float(value), 5))
+            for code, value in zip(codes, values)
+        ]
+
+
+def _proximity_block(
+    occurrences: NDArray[numpy.float32],
+    ubiquity: NDArray[numpy.float32],
+    rows: slice,
+) -> NDArray[numpy.float32]:
+    # proximities of the categories ``rows`` to every category
+    co = occurrences[:, rows].T @ occurrences
+    row_ubiquity = ubiquity[rows, None]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        phi = co / numpy.maximum(row_ubiquity, ubiquity)
+    phi = numpy.nan_to_num(phi, nan=0, posinf=0).astype(numpy.float32)
+    numpy.fill_diagonal(phi[:, rows], 0)
+    return phi
+
+
+def _densest(
+    codes: NDArray[numpy.intp],
+    density: NDArray[numpy.float64],
+    limit: int,
+) -> NDArray[numpy.intp]:
+    # the ``limit`` codes of highest density, densest first
+    if limit < len(codes):
+        top = numpy.argpartition(-density, limit - 1)[:limit]
+        codes, density = codes[top], density[top]
+    return codes[numpy.argsort(-density, kind="stable")]
+
+
+def _top_proximities(
+    phi: NDArray[numpy.float32],
+    keep: int,
+) -> tuple[NDArray[numpy.intp], NDArray[numpy.float32]]:
+    # the ``keep`` largest proximities of every row, largest first
+    if keep < phi.shape[1]:
+        partitioned = numpy.argpartition(-phi, keep - 1, axis=1)
+        top = partitioned[:, :keep]
+    else:
+        columns = numpy.arange(phi.shape[1])
+        top = numpy.broadcast_to(columns, phi.shape)
+    top_values = numpy.take_along_axis(phi, top, axis=1)
+    order = numpy.argsort(-top_values, axis=1, kind="stable")
+    top = numpy.take_along_axis(top, order, axis=1)
+    return top, numpy.take_along_axis(top_values, order, axis=1)
@@ -0,0 +1,169 @@
+import asyncio
+import collections
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import numpy
+from numpy.typing import NDArray
+
+METRICS = ("cosine", "jensen_shannon")
+
+# one similarity per country
+Scores = NDArray[numpy.floating[Any]]
+# (country, similarity) pairs
+Neighbours = list[tuple[str, float]]
+# (expiry, build) of a cached index, by index key
+Entry = tuple[float, asyncio.Future[Any]]
+Entries = collections.OrderedDict[Hashable, Entry]
+
+
+class CountrySimilarity:
+    """
+    Normalized country × category matrix answering similarity queries.
+
+    Rows are kept twice: as float32 unit vectors for the cosine, so a
+    query is one matrix-vector product, and as category shares for the
+    Jensen-Shannon divergence, which only reads the categories the query
+    country has.
+    """
+
+    def __init__(
+        self,
+        countries: NDArray[Any],
+        categories: NDArray[Any],
+        counts: NDArray[Any],
+    ) -> None:
+        counts = numpy.asarray(counts, dtype=numpy.float64)
+        keep = counts.sum(axis=1) > 0
+        self.countries = numpy.asarray(countries)[keep]
+        self.categories = numpy.asarray(categories)
+        counts = counts[keep]
+        self.shares = counts / counts.sum(axis=1, keepdims=True)
+        self.unit = _unit_rows(counts)
+        labels = [str(label) for label in self.countries]
+        self._lookup = {label: code for code, label in enumerate(labels)}
+
+    def similarities(
+        self,
+        country: str,
+        metric: str,
+    ) -> Optional[Scores]:
+        """
+        Similarity of every country to ``country``.
+
+        The cosine of the category counts, or one minus the Jensen-Shannon
+        divergence (base 2) of the category shares; both are within [0, 1].
+
+        :param country: country label.
+        :param metric: "cosine" or "jensen_shannon".
+        :raises ValueError: for an unknown metric.
+        :return: one similarity per country, None for an unknown country.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"unknown similarity metric {metric}")
+        code = self._lookup.get(country)
+        if code is None:
+            return None
+        if metric == "cosine":
+            return self.unit @ self.unit[code]
+
+        # JSD(p, q) = 1/2 sum h(q) + 1/2 ln 2 + sum_S h(p / 2) - h((p + q) / 2)
+        # with h(x) = x ln x and S the categories of q, the terms of the
+        # other categories cancel out.
+        query = self.shares[code]
+        support = numpy.flatnonzero(query)
+        query = query[support]
+        shares = self.shares[:, support]
+        divergence = (
+            0.5 * numpy.sum(_xlogx(query))
+            + 0.5 * numpy.log(2)
+            + numpy.sum(_mixture_terms(shares, query), axis=1)
+        ) / numpy.log(2)
+        return 1 - numpy.clip(divergence, 0, 1)
+
+    def most_similar(
+        self,
+        country: str,
+        limit: int,
+        metric: str = "cosine",
+    ) -> Optional[Neighbours]:
+        """
+        Countries closest to ``country``, itself excluded.
+
+        :param country: country label.
+        :param limit: number of countries.
+        :param metric: "cosine" or "jensen_shannon".
+        :return: ``(country, similarity)`` pairs, most similar first, None
+            for an unknown country.
+        """
+        scores = self.similarities(country, metric)
+        if scores is None:
+            return None
+        scores[self._lookup[country]] = -numpy.inf
+        count = min(limit, len(scores) - 1)
+        if count <= 0:
+            return []
+        candidates = numpy.argpartition(-scores, count - 1)[:count]
+        candidates = candidates[numpy.argsort(-scores[candidates], kind="stable")]
+        return [
+            (str(self.countries[code]), round(float(scores[code]), 5))
+            for code in candidates
+        ]
+
+
+def _unit_rows(counts: NDArray[numpy.float64]) -> NDArray[numpy.float32]:
+    norms = numpy.linalg.norm(counts, axis=1, keepdims=True)
+    return (counts / norms).astype(numpy.float32)
+
+
+def _xlogx(values: NDArray[numpy.float64]) -> NDArray[numpy.float64]:
+    safe = numpy.where(values > 0, values, 1)
+    return values * numpy.log(safe)
+
+
+def _mixture_terms(
+    shares: NDArray[numpy.float64],
+    query: NDArray[numpy.float64],
+) -> NDArray[numpy.float64]:
+    return _xlogx(shares / 2) - _xlogx((shares + query) / 2)
+
+
+class IndexCache:
+    """
+    Small in-process LRU of built indexes, each kept ``ttl`` seconds.
+
+    Concurrent requests for a missing key share one build.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Entries = collections.OrderedDict()
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached index of ``key``, built with ``build`` when missing or expired.
+
+        A failed build is not cached.
+
+        :param key: index key.
+        :param build: coroutine function building the index.
+        :raises Exception: the error of a failed build.
+        :return: index.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            entry = (time.monotonic() + self.ttl, asyncio.ensure_future(build()))
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        try:
+            return await asyncio.shield(entry[1])
+        except Exception:
+            if self._entries.get(key) is entry:
+                self._entries.pop(key)
+            raise
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from fastapi_cache import FastAPICache
+from fastapi_cache.backends import Backend
 from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioRedis
 from redis.asyncio import ConnectionPool
 
+from knowledge_complex_backend.services.cache import TwoTierBackend, dao_key_builder
 from knowledge_complex_backend.settings import settings
 
 
@@ -19,10 +21,23 @@ def init_redis(app: FastAPI) -> None:  # pragma: no cover
     # import logging
     # logging.info(str(settings.redis_url))
     # cache
-    redis = aioRedis.from_url(
-        str(settings.redis_url), encoding="utf8", decode_responses=True
+    # RedisBackend hands raw bytes to the JSON coder, so responses are not decoded
+    redis = aioRedis.from_url(str(settings.redis_url))
+    backend: Backend = RedisBackend(redis)
+    if settings.cache_local_max_bytes:
+        two_tier = TwoTierBackend(
+            redis,
+            max_bytes=settings.cache_local_max_bytes,
+            channel=f"{settings.cache_prefix}:invalidate",
+        )
+        two_tier.start()
+        backend = two_tier
+    app.state.cache_backend = backend
+    FastAPICache.init(
+        backend,
+        prefix=settings.cache_prefix,
+        key_builder=dao_key_builder,
     )
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
 
 
 async def shutdown_redis(app: FastAPI) -> None:  # pragma: no cover
@@ -31,4 +46,6 @@ async def shutdown_redis(app: FastAPI) -> None:  # pragma: no cover
 
     :param app: current FastAPI app.
     """
+    if isinstance(app.state.cache_backend, TwoTierBackend):
+        await app.state.cache_backend.stop()
     await app.state.redis_pool.disconnect()
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+from typing import Any, Optional, Sequence
+
+import aiomysql
+
+Row = tuple[Any, ...]
+
+
+class FakeCursor:
+    """Cursor over the rows its pool answers to the executed query."""
+
+    def __init__(self, conn: "FakeConnection") -> None:
+        self.conn = conn
+        self.rows: list[Row] = []
+        self.fetches: list[int] = []
+        self.closed = False
+
+    async def execute(self, sql: str, args: Any = None) -> None:
+        """
+        Run a query, failing like MySQL while the pool is down.
+
+        :param sql: query, ``LOCKED`` fails like a lock wait timeout.
+        :param args: query arguments.
+        :raises OperationalError: when the pool is down or the query locked.
+        """
+        if self.conn.pool.down:
+            raise aiomysql.OperationalError(2013, "Lost connection")
+        if sql == "LOCKED":
+            raise aiomysql.OperationalError(1205, "Lock wait timeout exceeded")
+        self.conn.queries.append(sql)
+        self.rows = self.conn.pool.answer(sql, args)
+
+    async def fetchall(self) -> list[Row]:
+        """
+        Remaining rows.
+
+        :return: rows.
+        """
+        rows = self.rows
+        self.rows = []
+        return rows
+
+    async def fetchmany(self, size: int) -> list[Row]:
+        """
+        Next rows.
+
+        :param size: rows to read.
+        :return: at most ``size`` rows.
+        """
+        self.fetches.append(size)
+        chunk = self.rows[:size]
+        self.rows = self.rows[size:]
+        return chunk
+
+    async def close(self) -> None:
+        """Close the cursor."""
+        self.closed = True
+
+
+class FakeConnection:
+    """Connection of a FakePool recording its queries and cursor class."""
+
+    def __init__(self, pool: "FakePool") -> None:
+        self.pool = pool
+        self.queries: list[str] = []
+        self.cursor_class: Any = None
+
+    async def cursor(self, cursor_class: Any = None) -> FakeCursor:
+        """
+        Open a cursor.
+
+        :param cursor_class: aiomysql cursor class, recorded.
+        :return: cursor.
+        """
+        self.cursor_class = cursor_class
+        cursor = FakeCursor(self)
+        self.pool.cursors.append(cursor)
+        return cursor
+
+
+class FakePool:  # noqa: WPS230
+    """
+    aiomysql like pool of ``maxsize`` connections answering ``rows``.
+
+    It can be taken down, its queries then lose their connection, or
+    refuse connections, like an unreachable replica.
+    """
+
+    def __init__(
+        self,
+        minsize: int = 1,
+        maxsize: int = 10,
+        rows: Optional[Sequence[Row]] = None,
+    ) -> None:
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.rows = [(1,)] if rows is None else list(rows)
+        self.free = [FakeConnection(self) for _ in range(maxsize)]
+        self.opened: set[FakeConnection] = set()
+        self.available = asyncio.Semaphore(maxsize)
+        self.cursors: list[FakeCursor] = []
+        self.acquired = 0
+        self.down = False
+        self.refused = False
+
+    @property
+    def size(self) -> int:
+        """
+        Opened connections.
+
+        :return: number of opened connections.
+        """
+        return len(self.opened)
+
+    @property
+    def freesize(self) -> int:
+        """
+        Opened connections that are not in use.
+
+        :return: number of idle connections.
+        """
+        in_use = sum(conn not in self.free for conn in self.opened)
+        return len(self.opened) - in_use
+
+    def answer(self, sql: str, args: Any) -> list[Row]:
+        """
+        Rows of a query.
+
+        :param sql: query.
+        :param args: query arguments.
+        :return: ``rows``, whatever the query.
+        """
+        return list(self.rows)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> Any:
+        """
+        Take a free connection, waiting for one when all are used.
+
+        :raises OperationalError: when connections are refused.
+        :yield: connection.
+        """
+        if self.refused:
+            raise aiomysql.OperationalError(2003, "Can't connect")
+        async with self.available:
+            conn = self.free.pop()
+            self.opened.add(conn)
+            self.acquired += 1
+            try:
+                yield conn
+            finally:
+                self.acquired -= 1
+                self.free.append(conn)
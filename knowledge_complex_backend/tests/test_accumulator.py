@@ -0,0 +1,86 @@
+import collections
+from typing import Any, Optional
+
+import numpy
+
+from knowledge_complex_backend.db.accumulator import TrendAccumulator, top_series
+
+
+def test_chunks_match_row_loop() -> None:
+    """Rows added in chunks sum like the per-row loop, out of range years dropped."""
+    rng = numpy.random.default_rng(0)
+    rows = [
+        (f"cat{key}", str(year), int(count))
+        for key, year, count in zip(
+            rng.integers(0, 30, 500),
+            rng.integers(1975, 2025, 500),
+            rng.integers(1, 100, 500),
+        )
+    ]
+    expected: dict[str, Any] = collections.defaultdict(
+        lambda: numpy.zeros(31, dtype=int),
+    )
+    for key, year, count in rows:
+        if 1980 <= int(year) <= 2010:
+            expected[key][int(year) - 1980] += count
+
+    trend = TrendAccumulator(1980, 31)
+    for start in range(0, len(rows), 64):
+        trend.add_rows(rows[start : start + 64])
+    trend.add_rows([])
+    result = trend.to_dict()
+
+    assert set(result) == {row[0] for row in rows}
+    for cat, series in expected.items():
+        assert result[cat].tolist() == series.tolist()
+
+
+def test_add_series_pads_and_cuts() -> None:
+    """Whole series are padded or cut to the accumulator length and summed per key."""
+    trend = TrendAccumulator(1990, 3)
+    short = [1, 2]
+    long_series = [1, 1, 1, 9]
+    exact = [1, 1, 1]
+    trend.add_series(["A", "B", "A"], [short, long_series, exact])
+
+    result = trend.to_dict()
+
+    assert result["A"].tolist() == [2, 3, 1]
+    assert result["B"].tolist() == [1, 1, 1]
+
+
+def test_null_keys() -> None:
+    """Rows with a NULL key are summed under None, like the per-row loop."""
+    trend = TrendAccumulator(1990, 2)
+    null_rows = [(None, 1990, 2), (None, 1991, 3)]
+    trend.add_rows([("A", 1990, 1), *null_rows])
+    trend.add_series([None, "B"], [[1, 1], [4, 4]])
+    trend.add_rows([("B", 1991, 1)])
+
+    result = trend.to_dict()
+
+    assert set(result) == {"A", "B", None}
+    assert result[None].tolist() == [3, 4]
+    assert result["B"].tolist() == [4, 5]
+
+
+def _keys(series: dict[Any, Any], limit: Optional[int] = None) -> list[Any]:
+    return [key for key, _ in top_series(series, limit)]
+
+
+def test_top_series() -> None:
+    """Series are ordered by last value, ties keep their order."""
+    series = {
+        "a": numpy.array([5, 1]),
+        "b": numpy.array([0, 7]),
+        "c": numpy.array([3, 1]),
+        "d": numpy.array([0, 4]),
+    }
+
+    assert _keys(series) == ["b", "d", "a", "c"]
+    assert _keys(series, 2) == ["b", "d"]
+    assert _keys(series, 3) == ["b", "d", "a"]
+    assert not top_series({}, 20)
+
+    tied = {key: numpy.array([1]) for key in range(100)}
+    assert _keys(tied, 20) == list(range(20))
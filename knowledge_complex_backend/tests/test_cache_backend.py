@@ -0,0 +1,77 @@
+import asyncio
+from typing import Any, AsyncGenerator
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from knowledge_complex_backend.services.cache import TwoTierBackend
+
+
+@pytest.fixture
+async def listening_backend(anyio_backend: Any) -> AsyncGenerator[Any, None]:
+    """
+    Backend of another worker, listening to the invalidations.
+
+    :yield: fake redis server and the listening backend.
+    """
+    server = FakeServer()
+    backend = TwoTierBackend(FakeRedis(server=server), 1024, "invalidate")
+    backend.start()
+    await asyncio.sleep(0.05)
+
+    yield server, backend
+
+    await backend.stop()
+
+
+@pytest.mark.anyio
+async def test_lru_budget(anyio_backend: Any) -> None:
+    """The local tier keeps the recent keys within budget."""
+    backend = TwoTierBackend(FakeRedis(), max_bytes=10, channel="invalidate")
+    await backend.set("a", b"1111", 60)
+    await backend.set("b", b"2222", 60)
+    await backend.get("a")
+    await backend.set("c", b"3333", 60)
+
+    assert (len(backend), backend.size) == (2, 8)
+    assert backend.stats["evicted"] == 1
+    # evicted keys are still read from redis
+    assert await backend.get("b") == b"2222"
+    assert backend.stats["l1_miss"] == 1
+
+
+@pytest.mark.anyio
+async def test_local_entries_expire(anyio_backend: Any, monkeypatch: Any) -> None:
+    """Expired local entries are read again from redis."""
+    backend = TwoTierBackend(FakeRedis(), max_bytes=10, channel="invalidate")
+    await backend.set("a", b"1111", 60)
+
+    now = asyncio.get_running_loop().time()
+    monkeypatch.setattr(
+        "knowledge_complex_backend.services.cache.backend.time.monotonic",
+        lambda: now + 3600,
+    )
+    await backend.remote.set("a", b"5555", 60)
+    ttl, payload = await backend.get_with_ttl("a")
+
+    assert payload == b"5555"
+    # the remaining TTL of redis, which may have ticked since the write
+    assert 59 <= ttl <= 60
+    assert await backend.get_with_ttl("missing") == (0, None)
+
+
+@pytest.mark.anyio
+async def test_writes_invalidate_other_workers(listening_backend: Any) -> None:
+    """A write in one worker drops the key from the local tier of the others."""
+    server, second = listening_backend
+    first = TwoTierBackend(FakeRedis(server=server), 1024, "invalidate")
+
+    await first.set("key", b"[1]", 60)
+    assert await second.get("key") == b"[1]"
+
+    await first.set("key", b"[2]", 60)
+    await asyncio.sleep(0.05)
+
+    assert second.stats["invalidated"] == 1
+    assert await second.get("key") == b"[2]"
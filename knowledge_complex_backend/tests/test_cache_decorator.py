@@ -0,0 +1,137 @@
+import asyncio
+from typing import Any, AsyncGenerator
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from knowledge_complex_backend.services.cache import (
+    TwoTierBackend,
+    Unordered,
+    cache,
+    cache_stats,
+    dao_key_builder,
+)
+
+
+@pytest.fixture
+async def fake_redis(anyio_backend: Any) -> AsyncGenerator[FakeRedis, None]:
+    """
+    Fake redis behind FastAPICache.
+
+    :yield: the fake redis client.
+    """
+    redis = FakeRedis()
+    FastAPICache.init(RedisBackend(redis), prefix="test", key_builder=dao_key_builder)
+    cache_stats.clear()
+
+    yield redis
+
+    FastAPICache.reset()
+    await redis.flushall()
+
+
+@pytest.mark.anyio
+async def test_concurrent_misses_run_once(fake_redis: FakeRedis) -> None:
+    """Identical concurrent misses share one computation."""
+    calls = []
+
+    @cache(expire=60)
+    async def slow_query(countries: Unordered[str]) -> list[str]:  # noqa: WPS430
+        calls.append(countries)
+        await asyncio.sleep(0.05)
+        return sorted(countries)
+
+    results = await asyncio.gather(
+        *(slow_query(["US", "CN"]) for _ in range(10)),
+        slow_query(countries=["CN", "US"]),
+    )
+
+    assert calls == [["US", "CN"]]
+    assert results == [["CN", "US"] for _ in range(11)]
+    assert (cache_stats["executed"], cache_stats["coalesced"]) == (1, 10)
+    assert await slow_query(["US", "CN"]) == ["CN", "US"]
+    assert cache_stats["hit"] == 1
+
+
+@pytest.mark.anyio
+async def test_waits_for_other_worker(fake_redis: FakeRedis) -> None:
+    """A miss whose key is locked elsewhere waits for the stored value."""
+    calls = []
+
+    @cache(expire=60)
+    async def query(year: int) -> int:  # noqa: WPS430
+        calls.append(year)
+        return year
+
+    key = dao_key_builder(query, "test:", args=(2000,), kwargs={})
+    await fake_redis.set(f"{key}:lock", "other-worker")
+
+    async def other_worker() -> None:  # noqa: WPS430
+        await asyncio.sleep(0.1)
+        await fake_redis.set(key, b"2000")
+
+    result, _ = await asyncio.gather(query(2000), other_worker())
+
+    assert result == 2000
+    assert not calls
+    assert cache_stats["remote_hit"] == 1
+
+
+@pytest.fixture
+async def stale_query(fake_redis: FakeRedis) -> tuple[Any, str]:
+    """
+    Cached function whose value is past its soft TTL.
+
+    :param fake_redis: fake redis behind FastAPICache.
+    :return: the function, returning 0 then 1 and so on, and its cache key.
+    """
+    versions = iter(range(10))
+
+    @cache(expire=60, soft_expire=10)
+    async def query() -> int:  # noqa: WPS430
+        return next(versions)
+
+    await query()
+    key = dao_key_builder(query, "test:", args=(), kwargs={})
+    await fake_redis.expire(key, 45)
+    return query, key
+
+
+@pytest.mark.anyio
+async def test_stale_value_is_served_and_refreshed(
+    fake_redis: FakeRedis,
+    stale_query: tuple[Any, str],
+) -> None:
+    """Past the soft TTL the old value is returned while it is recomputed."""
+    query, key = stale_query
+
+    stale = await asyncio.gather(query(), query())
+    await asyncio.sleep(0.05)
+
+    assert stale == [0, 0]
+    assert (cache_stats["stale"], cache_stats["executed"]) == (2, 2)
+    assert await query() == 1
+    assert await fake_redis.ttl(key) == 60
+
+
+@pytest.mark.anyio
+async def test_hits_are_private_copies(fake_redis: FakeRedis) -> None:
+    """Changing a returned value does not change the cached one."""
+    FastAPICache.init(
+        TwoTierBackend(fake_redis, max_bytes=1024, channel="invalidate"),
+        prefix="test",
+        key_builder=dao_key_builder,
+    )
+
+    @cache(expire=60)
+    async def query() -> dict[str, list[int]]:  # noqa: WPS430
+        return {"data": [1, 2]}
+
+    (await query())["data"].append(3)
+    first_hit = await query()
+    first_hit["data"].append(3)
+
+    assert await query() == {"data": [1, 2]}
+    assert cache_stats["hit"] == 2
@@ -0,0 +1,117 @@
+from typing import Any
+
+import pytest
+from pydantic import BaseModel
+
+from knowledge_complex_backend.services.cache import (
+    NotKeyed,
+    Unordered,
+    dao_key_builder,
+)
+from knowledge_complex_backend.settings import settings
+
+
+class WindowDTO(BaseModel):
+    """Stand-in for a DTO argument."""
+
+    start_year: int
+    end_year: int
+
+
+class DummyDAO:
+    """Stand-in for a DAO."""
+
+    async def ingredient(
+        self,
+        flow: str,
+        countries: Unordered[str],
+        years: Unordered[int],
+    ) -> None:
+        """Stand-in for a cached DAO method."""
+
+    async def ranked(self, flow: str, order: list[str], window: WindowDTO) -> None:
+        """Stand-in for a cached DAO method with order-sensitive arguments."""
+
+    async def related(self, node: str, driver: NotKeyed[Any]) -> None:
+        """Stand-in for a cached DAO method taking a driver."""
+
+
+def _key(method: Any, *args: Any, **kwargs: Any) -> str:
+    return dao_key_builder(
+        method,
+        "fastapi-cache:",
+        args=args,
+        kwargs=kwargs,
+    )
+
+
+def test_key_ignores_dao_instance() -> None:
+    """Fresh DAO instances share the same key."""
+    ingredient = DummyDAO.ingredient
+    assert _key(ingredient, DummyDAO(), "paper", ["US"], [2020]) == _key(
+        ingredient,
+        DummyDAO(),
+        "paper",
+        ["US"],
+        [2020],
+    )
+
+
+def test_key_canonicalizes_unordered_lists() -> None:
+    """Order and duplicates of Unordered lists and keyword calls are ignored."""
+    ingredient = DummyDAO.ingredient
+    key = _key(ingredient, DummyDAO(), "paper", ["US", "CN"], [2020, 2019])
+
+    assert key == _key(
+        ingredient,
+        DummyDAO(),
+        "paper",
+        ["CN", "US", "CN"],
+        [2019, 2020],
+    )
+    assert key == _key(
+        ingredient,
+        DummyDAO(),
+        flow="paper",
+        years=[2019, 2020],
+        countries=["CN", "US"],
+    )
+    export_key = _key(ingredient, DummyDAO(), "export", ["US", "CN"], [2020, 2019])
+    assert key != export_key
+
+
+def test_key_keeps_list_order_and_dto_fields() -> None:
+    """Other lists keep their order, DTOs are keyed by their fields."""
+    window = WindowDTO(start_year=2000, end_year=2010)
+    key = _key(DummyDAO.ranked, DummyDAO(), "paper", ["US", "CN"], window)
+
+    assert key != _key(DummyDAO.ranked, DummyDAO(), "paper", ["CN", "US"], window)
+    assert key != _key(
+        DummyDAO.ranked,
+        DummyDAO(),
+        "paper",
+        ["US", "CN"],
+        WindowDTO(start_year=2000, end_year=2020),
+    )
+
+
+def test_key_rejects_unknown_objects() -> None:
+    """Objects are either annotated as NotKeyed or rejected."""
+    related = DummyDAO.related
+    assert _key(related, DummyDAO(), "A", object()) == _key(
+        related,
+        DummyDAO(),
+        "A",
+        object(),
+    )
+    with pytest.raises(TypeError):
+        _key(DummyDAO.ranked, DummyDAO(), "paper", ["US"], object())
+
+
+def test_key_carries_namespace_and_version() -> None:
+    """Keys are prefixed with the namespace, version and function name."""
+    key = _key(DummyDAO.ingredient, DummyDAO(), "paper", ["US"], [2020])
+
+    assert key.startswith(
+        f"fastapi-cache:v{settings.cache_version}:{__name__}.DummyDAO.ingredient:",
+    )
@@ -0,0 +1,73 @@
+from typing import Any, AsyncGenerator
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+
+from knowledge_complex_backend.services.cache import cache, dao_key_builder
+from knowledge_complex_backend.services.cache.warmer import CacheWarmer, WarmEntry
+
+
+class FakeDAO:
+    """DAO with one working and one failing cached method."""
+
+    calls: list[str] = []
+
+    @cache(expire=60)
+    async def number_of_papers(self, flow: str) -> int:
+        """
+        Record the call.
+
+        :param flow: any string.
+        :return: its length.
+        """
+        self.calls.append(flow)
+        return len(flow)
+
+    @cache(expire=60)
+    async def broken(self) -> int:
+        """
+        Fail like a query on a down database.
+
+        :raises RuntimeError: always.
+        """
+        raise RuntimeError("database is down")
+
+
+@pytest.fixture
+async def fake_redis(anyio_backend: Any) -> AsyncGenerator[FakeRedis, None]:
+    """
+    Fake redis behind FastAPICache.
+
+    :yield: the fake redis client.
+    """
+    redis = FakeRedis()
+    FastAPICache.init(RedisBackend(redis), prefix="test", key_builder=dao_key_builder)
+
+    yield redis
+
+    FastAPICache.reset()
+    await redis.flushall()
+
+
+@pytest.mark.anyio
+async def test_warm_round_and_report(fake_redis: FakeRedis) -> None:
+    """A round caches every entry and records the failures."""
+    entries = [
+        WarmEntry("number_of_papers", {"flow": "paper"}),
+        WarmEntry("number_of_papers", {"flow": "import"}),
+        WarmEntry("broken"),
+    ]
+    warmer = CacheWarmer(FakeDAO, entries, fake_redis, "test")
+
+    await warmer.warm()
+    report = {status["name"]: status for status in await warmer.report()}
+
+    paper, broken = report["number_of_papers(flow=paper)"], report["broken()"]
+    assert paper["warm"] and paper["computed"]
+    assert not broken["warm"]
+    assert "database is down" in broken["error"]
+    # served from the cache without running the query again
+    assert await FakeDAO().number_of_papers("import") == 6
+    assert sorted(FakeDAO.calls) == ["import", "paper"]
@@ -0,0 +1,67 @@
+import numpy
+
+from knowledge_complex_backend.db.category_index import CategoryIndex
+
+# (cat, parent_cat, parent_level) rows of cat_ancestor
+ROWS = [
+    ("Chip", "Electronics", 1),
+    ("Chip", "Engineering", 0),
+    ("Laser", "Electronics", 1),
+    ("Laser", "Optics", 1),
+    ("Laser", "Engineering", 0),
+    ("Laser", "Physics", 0),
+    ("Lens", "Optics", 1),
+    ("Lens", "Physics", 0),
+    ("Electronics", "Engineering", 0),
+    ("Optics", "Engineering", 0),
+    ("Optics", "Physics", 0),
+]
+
+
+def test_ingredient_tree_dedupes_shared_leaves() -> None:
+    """Level 0 nodes dedupe leaves reached through several level 1 nodes."""
+    index = CategoryIndex(ROWS)
+
+    tree = index.ingredient_tree({"Chip": 2, "Laser": 3, "Unknown": 100})
+    via = index.l0_via_l1
+
+    parents = index.cats[via.rows]
+    leaves = index.cats[via.cols]
+    links = list(zip(parents, leaves))
+    assert links == [
+        ("Engineering", "Chip"),
+        ("Engineering", "Laser"),
+        ("Engineering", "Lens"),
+        ("Physics", "Laser"),
+        ("Physics", "Lens"),
+    ]
+    assert tree == [
+        {
+            "name": "Engineering",
+            "value": 5,
+            "children": [
+                {"name": "Electronics", "value": 5},
+                {"name": "Optics", "value": 3},
+            ],
+        },
+        {
+            "name": "Physics",
+            "value": 3,
+            "children": [{"name": "Optics", "value": 3}],
+        },
+    ]
+
+
+def test_level0_trend_sums_direct_ancestors() -> None:
+    """Yearly series are added into every level 0 ancestor."""
+    index = CategoryIndex(ROWS)
+
+    laser = numpy.array([1, 2])
+    lens = numpy.array([4, 8])
+    series = {"Laser": laser, "Lens": lens}
+    trend = index.level0_trend(series)
+
+    assert set(trend) == {"Engineering", "Physics"}
+    numpy.testing.assert_array_equal(trend["Engineering"], [1, 2])
+    numpy.testing.assert_array_equal(trend["Physics"], [5, 10])
+    assert not index.level0_trend({})
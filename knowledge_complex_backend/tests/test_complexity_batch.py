@@ -0,0 +1,169 @@
+from typing import Any
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from starlette import status
+
+from knowledge_complex_backend.db.dao.complexity_dao import ComplexityDAO
+from knowledge_complex_backend.services.cache import Unordered
+
+# DAO method and the arguments it was called with
+Call = tuple[str, dict[str, Any]]
+
+
+class FakeComplexityDAO:
+    """Records the dispatcher calls of the batch endpoint."""
+
+    def __init__(self) -> None:
+        self.calls: list[Call] = []
+
+    async def country_academic_trend(
+        self,
+        mode: str,
+        flow: str,
+        countries: Unordered[str],
+    ) -> dict[str, Any]:
+        """
+        Record the call.
+
+        :param mode: ignored.
+        :param flow: ignored.
+        :param countries: countries, served as the legend.
+        :return: trend response.
+        """
+        self.calls.append(("country_academic_trend", {"countries": countries}))
+        return {"legend": countries}
+
+    async def patent_ingredient(
+        self,
+        mode: str,
+        flow: str,
+        countries: Unordered[str],
+        year: int,
+    ) -> list[dict[str, Any]]:
+        """
+        Record the call, failing for the XX and YY countries.
+
+        :param mode: ignored.
+        :param flow: ignored.
+        :param countries: ``XX`` is unknown, ``YY`` loses its connection.
+        :param year: served as the value.
+        :raises HTTPException: for ``XX``.
+        :raises RuntimeError: for ``YY``.
+        :return: ingredient response.
+        """
+        self.calls.append(("patent_ingredient", {"year": year}))
+        if "XX" in countries:
+            raise HTTPException(status_code=404, detail="unknown country XX")
+        if "YY" in countries:
+            raise RuntimeError("connection lost")
+        return [{"name": "A", "value": year}]
+
+
+@pytest.fixture
+def fake_dao(fastapi_app: FastAPI) -> FakeComplexityDAO:
+    """
+    Fake DAO served to the complexity views.
+
+    :param fastapi_app: current application.
+    :return: the fake DAO.
+    """
+    dao = FakeComplexityDAO()
+    fastapi_app.dependency_overrides[ComplexityDAO] = lambda: dao
+    return dao
+
+
+@pytest.mark.anyio
+async def test_batch_dedupes_and_keeps_order(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    fake_dao: FakeComplexityDAO,
+) -> None:
+    """
+    Identical queries run once and every query gets its result.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param fake_dao: fake DAO.
+    """
+    trend = {"kind": "paper_ingredient_trend", "mode": "m", "flow": "paper"}
+    patent = {"kind": "patent_ingredient", "mode": "national_ipc", "flow": "patent"}
+
+    response = await client.post(
+        fastapi_app.url_path_for("batch"),
+        json={
+            "queries": [
+                {**trend, "countries": ["US", "CN"]},
+                {**patent, "countries": ["US"], "year": 2019},
+                {**trend, "countries": ["CN", "US"]},
+            ],
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"legend": ["US", "CN"]},
+        [{"name": "A", "value": 2019}],
+        {"legend": ["US", "CN"]},
+    ]
+    assert sorted(name for name, _ in fake_dao.calls) == [
+        "country_academic_trend",
+        "patent_ingredient",
+    ]
+
+
+@pytest.mark.anyio
+async def test_batch_rejects_unknown_kind(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    fake_dao: FakeComplexityDAO,
+) -> None:
+    """
+    Queries are validated against the DTO of their kind.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param fake_dao: fake DAO.
+    """
+    response = await client.post(
+        fastapi_app.url_path_for("batch"),
+        json={"queries": [{"kind": "unknown", "mode": "m", "flow": "paper"}]},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not fake_dao.calls
+
+
+@pytest.mark.anyio
+async def test_batch_isolates_failing_queries(
+    fastapi_app: FastAPI,
+    client: AsyncClient,
+    fake_dao: FakeComplexityDAO,
+) -> None:
+    """
+    A failing query gets an error entry, the other ones their results.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    :param fake_dao: fake DAO.
+    """
+    patent = {"kind": "patent_ingredient", "mode": "national_ipc", "flow": "patent"}
+
+    response = await client.post(
+        fastapi_app.url_path_for("batch"),
+        json={
+            "queries": [
+                {**patent, "countries": ["XX"], "year": 2019},
+                {**patent, "countries": ["US"], "year": 2019},
+                {**patent, "countries": ["YY"], "year": 2019},
+            ],
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {"error": {"status": 404, "detail": "unknown country XX"}},
+        [{"name": "A", "value": 2019}],
+        {"error": {"status": 500, "detail": "query failed"}},
+    ]
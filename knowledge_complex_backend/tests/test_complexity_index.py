@@ -0,0 +1,71 @@
+import numpy
+import pytest
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.services.complexity import complexity, count_matrix, rca
+
+
+def _nested_counts() -> NDArray[numpy.int64]:
+    # country c makes the categories below its diversity, with noise
+    rng = numpy.random.default_rng(1)
+    diversity = numpy.arange(2, 42)
+    categories = numpy.arange(60)
+    specialized = categories[None, :] < diversity[:, None]
+    noise = rng.integers(50, 100, specialized.shape)
+    return specialized * noise
+
+
+def _correlation(left: NDArray[numpy.float64], right: NDArray[numpy.float64]) -> float:
+    return float(numpy.corrcoef(left, right)[0, 1])
+
+
+def test_rca_and_count_matrix() -> None:
+    """Rows are pivoted and summed, RCA is the Balassa index."""
+    chip = [("US", "Chip", 1), ("US", "Chip", 2)]
+    laser = [("CN", "Laser", 3), ("US", "Laser", 1)]
+    countries, cats, counts = count_matrix([*chip, *laser])
+
+    assert countries.tolist() == ["CN", "US"]
+    assert cats.tolist() == ["Chip", "Laser"]
+    numpy.testing.assert_array_equal(counts, [[0, 3], [3, 1]])
+    shares = numpy.array([[0, 4], [4, 1]])
+    expected_rca = shares * 7 / 16
+    numpy.testing.assert_allclose(rca(counts), expected_rca)
+
+
+def test_indices_are_standardized() -> None:
+    """ECI and PCI cover the kept rows and columns, with mean 0 and std 1."""
+    eci, pci, rows, columns = complexity(_nested_counts())
+
+    assert eci.shape == rows.shape
+    assert pci.shape == columns.shape
+    assert eci.mean() == pytest.approx(0, abs=1e-9)
+    assert eci.std() == pytest.approx(1)
+
+
+def test_methods_agree_and_follow_diversity() -> None:
+    """Eigenvector and reflections give the same ranking, ECI grows with diversity."""
+    counts = _nested_counts()
+
+    eci, pci, rows, _ = complexity(counts)
+    reflected_eci, reflected_pci, _, _ = complexity(counts, "reflections", 20)
+    diversity = counts[rows].astype(bool).sum(axis=1)
+
+    assert _correlation(eci, reflected_eci) == pytest.approx(1, abs=1e-3)
+    assert _correlation(pci, reflected_pci) == pytest.approx(1, abs=1e-3)
+    assert _correlation(eci, diversity) == pytest.approx(1, abs=0.1)
+    # the rarest categories are the most complex
+    assert pci[-1] > pci[0]
+
+
+def test_degenerate_inputs() -> None:
+    """Too small matrices give zero indices, unknown methods are refused."""
+    eci, pci, _, _ = complexity(numpy.ones((1, 3)))
+
+    empty_eci = complexity(numpy.zeros((0, 0)))[0]
+
+    assert eci.tolist() == [0]
+    assert pci.tolist() == [0, 0, 0]
+    assert empty_eci.shape == (0,)
+    with pytest.raises(ValueError):
+        complexity(numpy.ones((2, 2)), method="pagerank")
@@ -0,0 +1,129 @@
+import collections
+from decimal import Decimal
+from typing import Any
+
+import numpy
+import pytest
+
+from knowledge_complex_backend.db.category_index import CategoryIndex
+from knowledge_complex_backend.db.cube import PaperCube
+from knowledge_complex_backend.db.dao.complexity_dao import ComplexityDAO
+from knowledge_complex_backend.rollup.catalog import RollupCatalog
+from knowledge_complex_backend.tests.conftest import FakePool
+
+ROWS = [
+    ("US", "Chip", "1980", 3),
+    ("US", "Chip", "1981", 4),
+    ("US", "Laser", "1981", 5),
+    ("CN", "Chip", "1981", 7),
+    ("CN", "Laser", "1982", 11),
+    ("GB", "Laser", "1980", 13),
+    ("CN", "Lens", "1982", 0),
+]
+
+# (cat, parent_cat, parent_level) rows of cat_ancestor
+ANCESTORS = [
+    ("Chip", "Electronics", 1),
+    ("Chip", "Engineering", 0),
+    ("Laser", "Optics", 1),
+    ("Laser", "Physics", 0),
+    ("Lens", "Glass", 1),
+    ("Lens", "Physics", 0),
+    ("Electronics", "Engineering", 0),
+    ("Optics", "Physics", 0),
+    ("Glass", "Physics", 0),
+]
+
+
+class TablePool(FakePool):
+    """Pool answering the per category query of the cube source table."""
+
+    def answer(self, sql: str, args: Any) -> list[tuple[Any, ...]]:
+        """
+        ``GROUP BY cat`` of ROWS, like MySQL.
+
+        :param sql: query.
+        :param args: countries, first and last year.
+        :return: category totals, zero ones included.
+        """
+        countries, first_year, last_year = args
+        totals: dict[str, int] = collections.defaultdict(int)
+        for country, cat, year, count in ROWS:
+            if country in countries and first_year <= int(year) <= last_year:
+                totals[cat] += count
+        return [(name, Decimal(total)) for name, total in totals.items()]
+
+
+def test_totals_match_row_sums() -> None:
+    """Category totals equal the sums over the matching rows."""
+    cube = PaperCube.from_rows(ROWS)
+
+    expected: dict[str, int] = collections.defaultdict(int)
+    for country, cat, year, count in ROWS:
+        if country in {"US", "CN"} and int(year) in {1981, 1982}:
+            expected[cat] += count
+
+    assert cube.totals("cat", ["US", "CN", "XX"], [1981, 1982]) == expected
+    laser = cube.totals("country", ["Laser"], [1980, 1981])
+    assert laser == {"GB": 13, "US": 5}
+
+
+def test_trend_is_clipped_to_year_range() -> None:
+    """Trend rows cover exactly the requested years."""
+    cube = PaperCube.from_rows(ROWS)
+
+    trend = cube.trend("cat", ["US", "GB"], 1981, 1982)
+
+    assert set(trend) == {"Chip", "Laser"}
+    numpy.testing.assert_array_equal(trend["Chip"], [4, 0])
+    numpy.testing.assert_array_equal(trend["Laser"], [5, 0])
+
+
+def test_empty_cube() -> None:
+    """Empty tables give empty answers."""
+    cube = PaperCube.from_rows([])
+
+    assert not cube.totals("cat", ["US"], [1980])
+    assert not cube.trend("country", ["Chip"], 1980, 1981)
+
+
+def test_matrix_sums_years_and_drops_empty_rows() -> None:
+    """The country × category matrix only keeps countries with counts."""
+    cube = PaperCube.from_rows(ROWS)
+
+    countries, cats, counts = cube.matrix([1981, 1982], ["Chip"])
+
+    assert countries.tolist() == ["CN", "US"]
+    assert cats.tolist() == ["Chip"]
+    numpy.testing.assert_array_equal(counts, [[7], [4]])
+
+
+@pytest.mark.anyio
+async def test_cube_and_sql_build_the_same_tree() -> None:
+    """Labels of the selected cells are kept even when their total is zero."""
+    cube = PaperCube.from_rows(ROWS)
+
+    def dao(paper_cubes: dict[str, PaperCube]) -> ComplexityDAO:  # noqa: WPS430
+        return ComplexityDAO(
+            pool=TablePool(),
+            paper_cubes=paper_cubes,
+            category_index=CategoryIndex(ANCESTORS),
+            patent_store={},
+            proximity={},
+            rollups=RollupCatalog(),
+        )
+
+    ingredient = ComplexityDAO.paper_ingredient_national_academic_disciplines
+    on_cube = await ingredient.__wrapped__(
+        dao({"paper": cube}),
+        "paper",
+        ["CN"],
+        [1981, 1982],
+    )
+    sql_dao = dao({})
+    on_sql = await ingredient.__wrapped__(sql_dao, "paper", ["CN"], [1981, 1982])
+    cn_totals = cube.totals("cat", ["CN"], [1982])
+
+    assert cn_totals == {"Laser": 11, "Lens": 0}
+    assert on_cube == on_sql
+    assert {"name": "Glass", "value": 0} in on_cube[-1]["children"]
@@ -0,0 +1,115 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from knowledge_complex_backend.db.pool import ManagedPool, current_pool_group
+from knowledge_complex_backend.settings import settings
+from knowledge_complex_backend.tests.conftest import FakePool
+
+
+async def _hold(pool: ManagedPool, group: str, release: asyncio.Event) -> None:
+    current_pool_group.set(group)
+    async with pool.acquire() as conn:
+        cur = await conn.cursor()
+        await cur.execute("SELECT 1")
+        await release.wait()
+
+
+def _usage(stats: dict[str, Any], group: str) -> tuple[int, int]:
+    group_stats = stats["groups"][group]
+    return group_stats["in_use"], group_stats["waiting"]
+
+
+@pytest.mark.anyio
+async def test_budget_spares_other_groups() -> None:
+    """A group over its budget waits while other groups still get connections."""
+    pool = ManagedPool(FakePool(minsize=1, maxsize=3), {"trend": 1})
+    release = asyncio.Event()
+
+    holders = [
+        asyncio.create_task(_hold(pool, group, release))
+        for group in ("trend", "trend", "default")
+    ]
+    await asyncio.sleep(0.01)
+
+    stats = pool.stats()
+    assert _usage(stats, "trend") == (1, 1)
+    in_use = stats["in_use"]
+    assert (_usage(stats, "default"), in_use) == ((1, 0), 2)
+
+    release.set()
+    await asyncio.gather(*holders)
+
+    stats = pool.stats()
+    in_use = stats["in_use"]
+    assert (_usage(stats, "trend"), in_use) == ((0, 0), 0)
+    trend = stats["groups"]["trend"]
+    counts = (trend["acquire_wait"]["count"], trend["query_time"]["count"])
+    assert counts == (2, 2)
+    assert stats["groups"]["default"]["budget"] is None
+
+
+@pytest.mark.anyio
+async def test_saturated_budgets_spare_default() -> None:
+    """With every budgeted group at its budget, the other routes still run."""
+    pool = ManagedPool(
+        FakePool(minsize=1, maxsize=settings.db_pool_maxsize),
+        settings.db_pool_budgets,
+    )
+    release = asyncio.Event()
+
+    holders = [
+        asyncio.create_task(_hold(pool, group, release))
+        for group, budget in settings.db_pool_budgets.items()
+        for _ in range(budget + 1)
+    ]
+    await asyncio.sleep(0.01)
+    stats = pool.stats()
+    assert all(
+        _usage(stats, group) == (budget, 1)
+        for group, budget in settings.db_pool_budgets.items()
+    )
+
+    done = asyncio.Event()
+    done.set()
+    await asyncio.wait_for(_hold(pool, "default", done), timeout=1)
+    release.set()
+    await asyncio.gather(*holders)
+
+
+@pytest.mark.anyio
+async def test_shared_budgets_span_both_pools() -> None:
+    """A group holds at most its budget over pools sharing the budgets."""
+    primary = ManagedPool(FakePool(minsize=1, maxsize=3), {"trend": 1})
+    read_pool = primary.sharing_budgets(FakePool(minsize=1, maxsize=3))
+    release = asyncio.Event()
+
+    holders = [
+        asyncio.create_task(_hold(pool, "trend", release))
+        for pool in (primary, read_pool)
+    ]
+    await asyncio.sleep(0.01)
+
+    assert primary.stats()["groups"]["trend"]["in_use"] == 1
+    assert read_pool.stats()["groups"]["trend"]["waiting"] == 1
+    assert read_pool.stats()["groups"]["trend"]["budget"] == 1
+    release.set()
+    await asyncio.gather(*holders)
+
+
+def test_budgets_must_leave_connections() -> None:
+    """Budgets taking the whole pool are rejected."""
+    with pytest.raises(ValueError, match="leave none"):
+        ManagedPool(FakePool(minsize=1, maxsize=6), {"trend": 4, "batch": 2})
+
+
+@pytest.mark.anyio
+async def test_prewarm_opens_minsize_connections() -> None:
+    """Prewarming checks minsize distinct connections."""
+    fake = FakePool(minsize=2, maxsize=4)
+
+    await ManagedPool(fake).prewarm()
+
+    assert fake.size == 2
+    assert all(conn.queries == ["SELECT 1"] for conn in fake.opened)
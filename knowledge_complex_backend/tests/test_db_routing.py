@@ -0,0 +1,95 @@
+import asyncio
+
+import aiomysql
+import pytest
+
+from knowledge_complex_backend.db.routing import RoutingPool
+from knowledge_complex_backend.tests.conftest import FakePool
+
+
+async def _hold(routing: RoutingPool, release: asyncio.Event) -> None:
+    async with routing.acquire():
+        await release.wait()
+
+
+@pytest.mark.anyio
+async def test_least_outstanding_balancing() -> None:
+    """Connections go to the replica with the fewest connections out."""
+    routing = RoutingPool([(name, FakePool()) for name in "abc"])
+    release = asyncio.Event()
+
+    holders = [asyncio.create_task(_hold(routing, release)) for _ in range(6)]
+    await asyncio.sleep(0)
+    assert [replica.outstanding for replica in routing.replicas] == [2, 2, 2]
+
+    routing.replicas[0].outstanding += 5
+    async with routing.acquire() as conn:
+        assert conn.pool is not routing.replicas[0].pool
+
+    release.set()
+    await asyncio.gather(*holders)
+    assert [replica.outstanding for replica in routing.replicas] == [5, 0, 0]
+
+
+@pytest.mark.anyio
+async def test_failed_replica_is_ejected_until_healthy() -> None:
+    """A replica losing connections gets no traffic until a check passes."""
+    down, up = FakePool(), FakePool()
+    routing = RoutingPool([("down", down), ("up", up)])
+    down.down = True
+
+    await routing.check(timeout=1)
+    assert [replica.healthy for replica in routing.replicas] == [False, True]
+    for _ in range(4):
+        async with routing.acquire() as conn:
+            assert conn.pool is up
+
+    down.down = False
+    await routing.check(timeout=1)
+    assert routing.stats()[0]["healthy"]
+    assert routing.stats()[0]["failures"] == 1
+
+
+@pytest.mark.anyio
+async def test_lost_connection_ejects_the_replica() -> None:
+    """A lost connection ejects its replica, with none left all are tried."""
+    replica = FakePool()
+    routing = RoutingPool([("only", replica)])
+    replica.down = True
+
+    with pytest.raises(aiomysql.OperationalError):
+        async with routing.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute("SELECT 1")
+
+    assert not routing.replicas[0].healthy
+    async with routing.acquire() as fallback:
+        assert fallback.pool is replica
+
+
+@pytest.mark.anyio
+async def test_query_errors_do_not_eject() -> None:
+    """
+    Server errors of a query leave the replica in rotation.
+
+    :raises ValueError: from the connection block, like an application error.
+    """
+    replica = FakePool()
+    routing = RoutingPool([("only", replica)])
+
+    with pytest.raises(aiomysql.OperationalError):
+        async with routing.acquire() as conn:
+            cur = await conn.cursor()
+            await cur.execute("LOCKED")
+    with pytest.raises(ValueError):
+        async with routing.acquire():
+            raise ValueError
+
+    assert routing.stats()[0]["healthy"]
+    assert routing.stats()[0]["outstanding"] == 0
+
+    replica.refused = True
+    with pytest.raises(aiomysql.OperationalError):
+        async with routing.acquire() as refused:
+            await refused.cursor()
+    assert not routing.stats()[0]["healthy"]
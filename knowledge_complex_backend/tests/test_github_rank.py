@@ -0,0 +1,47 @@
+import numpy
+import pytest
+
+from knowledge_complex_backend.db.github_rank import (
+    GITHUB_QUARTERS,
+    MISSING_RANK,
+    GithubRank,
+)
+
+FIRST, LAST = GITHUB_QUARTERS[0], GITHUB_QUARTERS[-1]
+
+# (quarter, tag, pci, rank) rows of rank_github_pci
+ROWS = [
+    (FIRST, "rust", 0.123456, 3),
+    (LAST, "rust", 0.5, 80),
+    (FIRST, "cobol", 0.9, 120),
+    (LAST, "go", 0.75, 10),
+    (FIRST, "perl", 0.2, 40),
+    ("2008Q3", "go", 9.0, 1),
+]
+
+
+def test_top_tags_ordered_by_last_quarter() -> None:
+    """Tags ranked in the top 50 once are ordered by their latest value."""
+    ranks = GithubRank.from_rows(ROWS)
+
+    response = ranks.response(ranks.by_last_quarter(ranks.top(50)), digits=5)
+
+    assert response["legend"] == ["go", "rust", "perl"]
+    assert response["year"][0] == 2008
+    rust = response["data"][1]
+    assert rust[0] == pytest.approx(0.12346)
+    assert rust[-1] == pytest.approx(0.5)
+    missing = [MISSING_RANK for _ in GITHUB_QUARTERS[1:]]
+    assert response["rank"][2] == [40, *missing]
+
+
+def test_countries_keep_row_order() -> None:
+    """Without filtering every entity is served in the order of its first row."""
+    ranks = GithubRank.from_rows(ROWS)
+
+    response = ranks.response(numpy.arange(len(ranks.entities)), digits=3)
+
+    assert response["legend"] == ["rust", "cobol", "go", "perl"]
+    assert response["data"][2][-1] == pytest.approx(0.75)
+    empty = GithubRank.from_rows([]).response(numpy.arange(0), digits=3)
+    assert not empty["legend"]
@@ -0,0 +1,337 @@
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy
+import pytest
+
+from knowledge_complex_backend.db.dao.gpc_dao import GpcDAO
+from knowledge_complex_backend.db.gpc_graph import CSRGraph, analogies
+
+
+def sample_graph() -> CSRGraph:
+    """
+    Pages 1..5, one relationship has an end outside the snapshot.
+
+    :return: graph.
+    """
+    return CSRGraph.build(
+        ids=[5, 3, 1, 2, 4],
+        titles=["E", "C", "A", "B", "D"],
+        zh_titles=[None, "丙", None, None, None],
+        sources=[1, 1, 2, 3, 1, 4, 2, 3],
+        targets=[2, 3, 3, 4, 4, 99, 5, 5],
+        weights=[0.5, 0.2, 0.3, 0.6, 0.8, 0.1, 0.4, 0.45],
+    )
+
+
+def _node(graph: CSRGraph, page_id: int) -> int:
+    node = graph.node(page_id)
+    assert node is not None
+    return node
+
+
+def _uncached(method: Any) -> Any:
+    return method.__wrapped__
+
+
+def test_snapshot_round_trip(tmp_path: Path) -> None:
+    """Neighbor lists are symmetric, sorted by weight and memory-mapped."""
+    sample_graph().save(tmp_path / "gpc")
+    graph = CSRGraph.open(tmp_path / "gpc")
+
+    indices, weights = graph.neighbors(_node(graph, 1))
+    dtypes = (graph.indices.dtype.name, graph.weights.dtype.name)
+    other_indices = graph.neighbors(_node(graph, 4))[0]
+    assert (len(graph), dtypes) == (5, ("int32", "float32"))
+    assert graph.ids[indices].tolist() == [3, 2, 4]
+    assert weights.tolist() == pytest.approx([0.2, 0.5, 0.8])
+    assert graph.ids[other_indices].tolist() == [3, 1]
+
+
+def test_snapshot_lookups() -> None:
+    """Pages, weights and titles are looked up by node."""
+    graph = sample_graph()
+    node = _node(graph, 1)
+
+    assert graph.node(99) is None
+    assert graph.weight(_node(graph, 3), node) == pytest.approx(0.2)
+    assert graph.weight(_node(graph, 5), node) is None
+    assert graph.title(_node(graph, 3), zh=True) == "丙"
+    assert graph.title(node, zh=True) == "A"
+
+
+@pytest.mark.anyio
+async def test_gpc_queries_on_snapshot() -> None:
+    """Pages of the snapshot are answered without Neo4j."""
+    dao = GpcDAO(es=None, neo4j_driver=None, graph=sample_graph())
+
+    last_token = await _uncached(GpcDAO.get_last_token_by_page_id)(
+        dao,
+        "A",
+        1,
+        0.2,
+        0.5,
+    )
+    two_token = await _uncached(GpcDAO.get_two_token_by_page_id)(dao, 2, 3)
+    # a=1, b=2, x=3: d1 = w(1, 2) = 0.5, d2 = w(1, 3) = 0.2
+    abxy = await _uncached(GpcDAO.get_abxy_token_by_page_id_v2)(dao, 1, 2, 3, 0.3)
+
+    assert last_token == [
+        [1, "A", 3, "C", 0.2],
+        [1, "A", 2, "B", 0.5],
+    ]
+    assert two_token == [[2, "B", 3, "C", 0.3]]
+    assert await dao.get_relationships_weight(2, 4) == 1
+    assert abxy == {
+        "d1": 0.5,
+        "d2": 0.2,
+        "data": [{"weight_1": 0.4, "weight_2": 0.45, "title": "E"}],
+    }
+
+
+def test_neighbors_between() -> None:
+    """Weight ranges are inclusive."""
+    graph = sample_graph()
+
+    indices, weights = graph.neighbors_between(_node(graph, 3), 0.2, 0.45)
+
+    assert graph.ids[indices].tolist() == [1, 2, 5]
+    assert weights.tolist() == pytest.approx([0.2, 0.3, 0.45])
+    assert not graph.neighbors_between(_node(graph, 3), 0.7, 0.9)[0].size
+
+
+@pytest.mark.anyio
+async def test_weight_range_pages() -> None:
+    """Weight ranges are paginated, and can only be counted."""
+    dao = GpcDAO(es=None, neo4j_driver=None, graph=sample_graph())
+    last_token = _uncached(GpcDAO.get_last_token_by_page_id)
+
+    page = await last_token(dao, "C", 3, 0.2, 0.45, limit=1, offset=1)
+    count = await last_token(dao, "C", 3, 0.2, 0.45, count_only=True)
+    rest = await last_token(dao, "C", 3, 0.2, 0.45, offset=2)
+
+    assert page == [[3, "C", 2, "B", 0.3]]
+    assert count == {"count": 3}
+    assert rest == [[3, "C", 5, "E", 0.45]]
+
+
+def test_analogies_intersect_and_rank() -> None:
+    """Candidates are in both windows, once each, closest to (d2, d1) first."""
+    # 9 is twice in the window of B, its smallest weight is kept
+    b_window = (
+        numpy.array([9, 7, 1, 8, 9]),
+        numpy.array([0.5, 0.2, 0.3, 0.4, 0.3]),
+    )
+    x_window = (
+        numpy.array([8, 9, 7, 1]),
+        numpy.array([0.5, 0.5, 0.6, 0.1]),
+    )
+
+    ids, to_b, to_x, scores = analogies(
+        b_window,
+        x_window,
+        d1=0.5,
+        d2=0.3,
+        exclude=[1],
+    )
+    best = analogies(b_window, x_window, d1=0.5, d2=0.3, limit=1)
+
+    assert ids.tolist() == [9, 8, 7]
+    assert to_b.tolist() == pytest.approx([0.3, 0.4, 0.2])
+    assert to_x.tolist() == pytest.approx([0.5, 0.5, 0.6])
+    assert scores.tolist() == pytest.approx([0, 0.1, 0.2])
+    assert best[0].tolist() == [9]
+
+
+class FakeResult:
+    """Records of a Cypher query."""
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self.records = records
+
+    def __aiter__(self) -> Any:
+        return self._iterate()
+
+    async def _iterate(self) -> Any:
+        for record in self.records:
+            yield record
+
+
+class FakeSession:
+    """Session answering the GPC queries from a graph."""
+
+    def __init__(self, graph: CSRGraph) -> None:
+        self.graph = graph
+
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass  # noqa: WPS420
+
+    async def run(self, query: str, **params: Any) -> Any:
+        """
+        Answer a query from its parameters.
+
+        :param query: Cypher, ignored.
+        :param params: query parameters.
+        :return: records.
+        """
+        ids = params.get("ids")
+        if ids is not None:
+            return FakeResult(
+                [
+                    self._candidate(params["startID"], page, params["zh"])
+                    for page in ids
+                ],
+            )
+        pairs = params.get("pairs")
+        if pairs is not None:
+            return FakeResult(self._related(pairs))
+        indices, weights = self.graph.neighbors_between(
+            _node(self.graph, params["startID"]),
+            params["low"],
+            params["high"],
+        )
+        return FakeResult(
+            [
+                {
+                    "id": int(self.graph.ids[node]),
+                    "title": self.graph.title(node),
+                    "weight": weight,
+                }
+                for node, weight in zip(indices, weights)
+            ],
+        )
+
+    def _candidate(self, start: int, page: int, zh: bool) -> dict[str, Any]:
+        node = self.graph.node(page)
+        if node is None:
+            return {"id": page, "missing": True, "title": None, "weight": None}
+        return {
+            "id": page,
+            "missing": False,
+            "title": self.graph.title(node, zh=zh),
+            "weight": self._weight(start, page),
+        }
+
+    def _related(self, pairs: list[list[int]]) -> list[dict[str, Any]]:
+        records = []
+        for page_a, page_b in pairs:
+            weight = self._weight(page_a, page_b)
+            if weight is not None:
+                records.append({"a": page_a, "b": page_b, "weight": weight})
+        return records
+
+    def _weight(self, page_a: int, page_b: int) -> Optional[float]:
+        node_a = self.graph.node(page_a)
+        node_b = self.graph.node(page_b)
+        if node_a is None or node_b is None:
+            return None
+        return self.graph.weight(node_a, node_b)
+
+
+class FakeDriver:
+    """Neo4j driver over a graph."""
+
+    def __init__(self, graph: CSRGraph) -> None:
+        self.graph = graph
+
+    def session(self, database: str) -> FakeSession:
+        """
+        Open a session.
+
+        :param database: database name, ignored.
+        :return: session.
+        """
+        return FakeSession(self.graph)
+
+
+@pytest.mark.anyio
+async def test_analogies_on_snapshot_and_neo4j(monkeypatch: Any) -> None:
+    """The snapshot and two window queries on Neo4j give the same candidates."""
+    local = GpcDAO(es=None, neo4j_driver=None, graph=sample_graph())
+    remote = GpcDAO(es=None, neo4j_driver=FakeDriver(sample_graph()), graph=None)
+    # d1 and d2 of the remote DAO go through the cached single weight query
+    monkeypatch.setattr(
+        remote,
+        "get_relationships_weight",
+        local.get_relationships_weight,
+    )
+
+    abxy_v3 = _uncached(GpcDAO.get_abxy_token_by_page_id_v3)
+    abxy = await abxy_v3(local, 1, 2, 3, 0.3)
+    remote_abxy = await abxy_v3(remote, 1, 2, 3, 0.3)
+    abxy_v2 = await _uncached(GpcDAO.get_abxy_token_by_page_id_v2)(remote, 1, 2, 3, 0.3)
+
+    assert abxy == {
+        "d1": 0.5,
+        "d2": 0.2,
+        "data": [
+            {"id": 5, "title": "E", "weight_1": 0.4, "weight_2": 0.45, "score": 0.25},
+        ],
+    }
+    assert remote_abxy == abxy
+    assert abxy_v2 == {
+        "d1": 0.5,
+        "d2": 0.2,
+        "data": [{"weight_1": 0.4, "weight_2": 0.45, "title": "E"}],
+    }
+
+
+@pytest.mark.anyio
+async def test_distance_matrix() -> None:
+    """Pairs are looked up at once, unrelated pages are at distance 1."""
+    graph = sample_graph()
+    local = GpcDAO(es=None, neo4j_driver=None, graph=graph)
+    remote = GpcDAO(es=None, neo4j_driver=FakeDriver(graph), graph=None)
+    distance_matrix = _uncached(GpcDAO.get_distance_matrix)
+
+    nodes = [_node(graph, page_id) for page_id in (4, 1, 3)]
+    matrix = graph.distance_matrix(nodes)
+    result = await distance_matrix(local, [3, 1, 4, 1])
+    remote_result = await distance_matrix(remote, [4, 3, 1])
+    unrelated = await distance_matrix(local, [2, 4])
+
+    assert matrix.dtype.name == "float32"
+    assert matrix.ravel().tolist() == pytest.approx(
+        [0, 0.8, 0.6, 0.8, 0, 0.2, 0.6, 0.2, 0],
+    )
+    assert result == {
+        "ids": [1, 3, 4],
+        "matrix": [[0, 0.2, 0.8], [0.2, 0, 0.6], [0.8, 0.6, 0]],
+    }
+    assert remote_result == result
+    assert unrelated["matrix"] == [[0, 1], [1, 0]]
+
+
+@pytest.mark.anyio
+async def test_nearest_in_set() -> None:
+    """Candidates are ranked by distance, unrelated then missing ones last."""
+    graph = sample_graph()
+    local = GpcDAO(es=None, neo4j_driver=None, graph=graph)
+    remote = GpcDAO(es=None, neo4j_driver=FakeDriver(graph), graph=None)
+    nearest_in_set = _uncached(GpcDAO.get_nearest_in_set)
+
+    found = [_node(graph, 2), _node(graph, 5)]
+    distances = graph.distances(_node(graph, 1), found)
+    # duplicated, unsorted and with the page itself
+    candidate_ids = [5, 4, 99, 3, 1, 2, 3]
+    result = await nearest_in_set(local, 1, candidate_ids)
+    remote_result = await nearest_in_set(remote, 1, [2, 3, 4, 5, 99])
+    zh_titles = await nearest_in_set(local, 1, [3], zh=True)
+
+    assert distances.tolist() == [pytest.approx(0.5), 1]
+    assert result == [
+        {"id": 3, "title": "C", "weight": 0.2},
+        {"id": 2, "title": "B", "weight": 0.5},
+        {"id": 4, "title": "D", "weight": 0.8},
+        {"id": 5, "title": "E", "weight": 1},
+        {"id": 99, "title": None, "weight": None},
+    ]
+    assert remote_result == result
+    assert zh_titles[0]["title"] == "丙"
+    assert await nearest_in_set(remote, 1, [3, 2], zh=True) == [
+        {"id": 3, "title": "丙", "weight": 0.2},
+        {"id": 2, "title": "B", "weight": 0.5},
+    ]
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import numpy
+
+from knowledge_complex_backend.db.accumulator import TrendAccumulator
+from knowledge_complex_backend.db.patent_store import (
+    PATENT_END_YEAR,
+    PATENT_START_YEAR,
+    PatentSeriesTable,
+)
+
+COLUMNS = ("country_code", "ipc_prefix", "ipc_level")
+
+# (country_code, ipc_prefix, ipc_level, data) rows, data starts in 1990
+ROWS = [
+    ("US", "A", 1, "[1, 2, 3]"),
+    ("US", "B", 1, "[4, 5, 6]"),
+    ("CN", "A", 1, "[7, 8]"),
+    ("CN", "A01", 2, "[100, 100, 100]"),
+]
+
+
+def test_year_and_trend_totals() -> None:
+    """Masked rows are summed per group, short series are zero padded."""
+    table = PatentSeriesTable.from_rows(COLUMNS, ROWS)
+    mask = table.mask(country_code=["US", "CN", "XX"], ipc_level=[1])
+
+    assert table.year_totals("ipc_prefix", mask, 1992) == {"A": 3, "B": 6}
+
+    mask &= ~table.mask(country_code=["US"])
+    trend = table.trend_totals("ipc_prefix", mask, 1989, 1992)
+    assert set(trend) == {"A"}
+    numpy.testing.assert_array_equal(trend["A"], [0, 7, 8, 0])
+
+
+def test_trend_totals_match_the_sql_accumulator() -> None:
+    """Series longer than the response are cut like the SQL fallback does."""
+    long_series = json.dumps(list(range(40)))
+    rows = [*ROWS, ("CN", "B", 1, long_series)]
+    table = PatentSeriesTable.from_rows(COLUMNS, rows)
+    accumulator = TrendAccumulator(
+        PATENT_START_YEAR,
+        PATENT_END_YEAR - PATENT_START_YEAR + 1,
+    )
+    level1 = [row for row in rows if row[2] == 1]
+    accumulator.add_series(
+        [row[1] for row in level1],
+        [json.loads(row[-1]) for row in level1],
+    )
+
+    trend = table.trend_totals("ipc_prefix", table.mask(ipc_level=[1]))
+    expected = accumulator.to_dict()
+
+    assert set(trend) == set(expected)
+    for ipc_prefix, series in expected.items():
+        numpy.testing.assert_array_equal(trend[ipc_prefix], series)
+
+
+def test_sidecars_round_trip(tmp_path: Path) -> None:
+    """Saved tables are memory-mapped back unless the fingerprint changed."""
+    table = PatentSeriesTable.from_rows(COLUMNS, ROWS)
+    path = tmp_path / "patents_country_ipc_trend"
+    table.save(path, "4:2023-01-01")
+
+    opened = PatentSeriesTable.open(path, "4:2023-01-01")
+
+    assert opened is not None
+    assert isinstance(opened.matrix, numpy.memmap)
+    mask = opened.mask(country_code=["US"])
+    assert opened.year_totals("country_code", mask, 1990) == {"US": 5}
+    assert PatentSeriesTable.open(path, "5:2023-01-02") is None
+    assert PatentSeriesTable.open(tmp_path / "missing", "4:2023-01-01") is None
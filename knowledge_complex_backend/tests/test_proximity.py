@@ -0,0 +1,70 @@
+import numpy
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.services.complexity import ProximityMatrix, rca
+
+
+def _counts() -> NDArray[numpy.int64]:
+    rng = numpy.random.default_rng(7)
+    present = rng.integers(0, 10, (40, 300)) < 3
+    return rng.integers(0, 20, present.shape) * present
+
+
+def _categories(size: int) -> NDArray[numpy.str_]:
+    return numpy.array([f"cat{code}" for code in range(size)])
+
+
+def _dense_proximity(counts: NDArray[numpy.int64]) -> NDArray[numpy.float64]:
+    specialized = (rca(counts) >= 1).astype(float)
+    ubiquity = specialized.sum(axis=0)
+    co = specialized.T @ specialized
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        phi = co / numpy.maximum.outer(ubiquity, ubiquity)
+    phi = numpy.nan_to_num(phi)
+    numpy.fill_diagonal(phi, 0)
+    return phi
+
+
+def test_blocks_keep_the_top_proximities() -> None:
+    """Blockwise top-k rows hold the largest proximities of the dense matrix."""
+    counts = _counts()
+    categories = _categories(counts.shape[1])
+    matrix = ProximityMatrix.build(
+        numpy.arange(40).astype(str),
+        categories,
+        counts,
+        top_k=10,
+        block=64,
+    )
+    phi = _dense_proximity(counts)
+
+    assert matrix.values.dtype == numpy.float32
+    assert matrix.indptr[-1] <= 10 * len(categories)
+    for code in (0, 150, 299):
+        related = matrix.related_categories(f"cat{code}", 5)
+        assert related is not None
+        values = [value for _, value in related]
+        assert values == sorted(values, reverse=True)
+        largest = -numpy.sort(-phi[code])
+        numpy.testing.assert_allclose(values, largest[:5], atol=1e-5)
+    assert matrix.related_categories("missing", 5) is None
+
+
+def test_country_density_skips_owned_categories() -> None:
+    """Countries get the densest categories they are not specialized in."""
+    counts = _counts()
+    countries = numpy.arange(40).astype(str)
+    categories = _categories(counts.shape[1])
+    matrix = ProximityMatrix.build(countries, categories, counts, top_k=300)
+    phi = _dense_proximity(counts)
+    owned = rca(counts)[3] >= 1
+
+    related = matrix.related_to_country("3", 5)
+    assert related is not None
+
+    density = phi @ owned / phi.sum(axis=1)
+    density[owned] = -1
+    densest = numpy.argsort(-density, kind="stable")[:5]
+    names = [name for name, _ in related]
+    assert names == [f"cat{code}" for code in densest]
+    assert matrix.related_to_country("XX", 5) is None
@@ -0,0 +1,61 @@
+from knowledge_complex_backend.db.query_builder import AggregateQuery
+
+
+def test_contiguous_years_use_between() -> None:
+    """A year range is rendered as BETWEEN whatever its order."""
+    query = AggregateQuery(
+        "artSizeByCatAndCtryAndYear",
+        group_by=["cat", "year"],
+        filters={"country": ["US", "CN"]},
+        years=[1982, 1980, 1981, 1981],
+    )
+
+    sql, args = query.sql()
+
+    assert sql == (
+        "SELECT c.cat, c.year, SUM(c.count) AS total "  # noqa: WPS323
+        "FROM artSizeByCatAndCtryAndYear as c "
+        "WHERE c.country IN %s AND c.year BETWEEN %s AND %s "
+        "GROUP BY c.cat, c.year"
+    )
+    assert args == [["US", "CN"], 1980, 1982]
+
+
+def test_sparse_years_limit_and_empty_filters() -> None:
+    """Sparse years use IN, limits order by total, empty lists match nothing."""
+    sql, args = AggregateQuery(
+        "importBetweenCtryAndYear",
+        group_by=["countryB"],
+        filters={"countryA": ["US"]},
+        years=[2000, 2010],
+        limit=20,
+    ).sql()
+
+    assert sql.endswith(
+        "WHERE c.countryA IN %s AND c.year IN %s "  # noqa: WPS323
+        "GROUP BY c.countryB ORDER BY total DESC LIMIT 20",
+    )
+    assert args == [["US"], [2000, 2010]]
+
+    empty = AggregateQuery("t", group_by=["cat"], filters={"country": []})
+    sql, args = empty.sql()
+    assert "WHERE 1 = 0 GROUP BY" in sql
+    assert not args
+
+
+def test_order_by_columns() -> None:
+    """Rows are sorted in MySQL, by total first when limited."""
+    sql, _ = AggregateQuery(
+        "artSizeByCtryAndYear",
+        group_by=["country", "year"],
+        order_by=["country", "year"],
+    ).sql()
+    limited, _ = AggregateQuery(
+        "t",
+        group_by=["cat"],
+        limit=5,
+        order_by=["cat"],
+    ).sql()
+
+    assert sql.endswith("GROUP BY c.country, c.year ORDER BY c.country, c.year")
+    assert limited.endswith("ORDER BY total DESC, c.cat LIMIT 5")
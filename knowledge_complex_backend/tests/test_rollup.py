@@ -0,0 +1,121 @@
+import sqlite3
+from typing import Any
+
+import aiomysql
+import numpy
+import pytest
+
+from knowledge_complex_backend.db.category_index import CategoryIndex
+from knowledge_complex_backend.rollup import (
+    ROLLUP_VERSION,
+    RollupCatalog,
+    rollup_tables,
+)
+from knowledge_complex_backend.tests.conftest import FakePool
+
+_INSERT_COUNTS_SQL = "INSERT INTO {table} VALUES (?, ?, ?, ?)"
+
+
+def test_rollup_tables() -> None:
+    """Category rollups join cat_ancestor at their level and are indexed."""
+    tables = rollup_tables("export")
+
+    l1 = tables["country_l1_year"]
+    sql = l1.create_sql("rollup_export_country_l1_year__new")
+    assert (l1.name, l1.source) == (
+        "rollup_export_country_l1_year",
+        "exportByCtryAndCatAndYear",
+    )
+    assert "FROM exportByCtryAndCatAndYear as s" in sql
+    assert "a.parent_level = 1" in sql
+    assert sql.startswith(
+        "CREATE TABLE rollup_export_country_l1_year__new "
+        "(PRIMARY KEY (country, cat, year), KEY (cat, year)) AS",
+    )
+    assert sorted(tables) == [
+        "cat_country",
+        "country_l0_year",
+        "country_l1_year",
+        "country_year",
+    ]
+
+
+def _empty_series() -> list[int]:
+    return [0, 0]
+
+
+def test_category_rollup_matches_live_trend() -> None:
+    """Duplicate cat_ancestor rows are counted like the live level 0 trend."""
+    ancestors = [
+        ("Chip", "Engineering", 0),
+        ("Chip", "Engineering", 0),
+        ("Laser", "Engineering", 0),
+        ("Laser", "Physics", 0),
+        ("Chip", "Electronics", 1),
+    ]
+    counts = [
+        ("US", "Chip", 2000, 2),
+        ("US", "Laser", 2000, 3),
+        ("US", "Chip", 2001, 5),
+    ]
+    table = rollup_tables("paper")["country_l0_year"]
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE cat_ancestor (cat, parent_cat, parent_level)")
+    db.execute(f"CREATE TABLE {table.source} (country, cat, year, count)")
+    db.executemany("INSERT INTO cat_ancestor VALUES (?, ?, ?)", ancestors)
+    db.executemany(_INSERT_COUNTS_SQL.format(table=table.source), counts)
+
+    rollup: dict[str, list[int]] = {}
+    for _, cat, year, count in db.execute(table.select):
+        rollup.setdefault(cat, _empty_series())[year - 2000] = count
+    chip = numpy.array([2, 5])
+    laser = numpy.array([3, 0])
+    live = CategoryIndex(ancestors).level0_trend({"Chip": chip, "Laser": laser})
+
+    assert rollup == {parent: trend.tolist() for parent, trend in live.items()}
+    assert rollup == {"Engineering": [7, 10], "Physics": [3, 0]}
+
+
+def test_catalog_keeps_up_to_date_rollups() -> None:
+    """Rollups of another version or of a changed source are ignored."""
+    paper, export = "artSizeByCatAndCtryAndYear", "exportByCtryAndCatAndYear"
+    built = (ROLLUP_VERSION, "3:9:2", 2000, 2002)
+    catalog = RollupCatalog(
+        [
+            ("rollup_paper_country_l0_year", paper, *built),
+            ("rollup_paper_cat_country", paper, *built),
+            ("rollup_paper_country_l1_year", paper, ROLLUP_VERSION - 1, *built[1:]),
+            ("rollup_export_cat_country", export, *built),
+        ],
+        {paper: "3:9:2", export: "4:9:2"},
+    )
+
+    assert catalog.table("paper", "country_l0_year") == "rollup_paper_country_l0_year"
+    assert catalog.table("paper", "country_l1_year") is None
+    assert catalog.table("export", "cat_country") is None
+    # all-years totals only answer queries covering every year
+    assert catalog.table("paper", "cat_country", range(1990, 2010)) is not None
+    assert catalog.table("paper", "cat_country", [2000, 2002]) is None
+
+
+class MissingTablePool(FakePool):
+    """Pool of a database where the rollups were never built."""
+
+    def answer(self, sql: str, args: Any) -> list[Any]:
+        """
+        Fail like a query of a missing table.
+
+        :param sql: query.
+        :param args: query arguments.
+        :raises ProgrammingError: always.
+        """
+        raise aiomysql.ProgrammingError(1146, "Table doesn't exist")
+
+
+@pytest.mark.anyio
+async def test_catalog_without_version_table() -> None:
+    """Without a version table no rollup is used."""
+    catalog = await RollupCatalog.load(MissingTablePool())
+
+    assert not catalog.fresh
+    assert catalog.table("paper", "country_l0_year") is None
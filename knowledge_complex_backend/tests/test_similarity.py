@@ -0,0 +1,103 @@
+import asyncio
+import functools
+
+import numpy
+import pytest
+from numpy.typing import NDArray
+
+from knowledge_complex_backend.services.complexity import CountrySimilarity, IndexCache
+
+COUNTRIES = numpy.array(["US", "CN", "GB", "DE", "XX"])
+CATEGORIES = numpy.arange(30)
+
+
+def _counts() -> NDArray[numpy.int64]:
+    rng = numpy.random.default_rng(3)
+    shape = (len(COUNTRIES), len(CATEGORIES))
+    present = rng.integers(0, 5, shape) < 3
+    counts = rng.integers(0, 50, shape) * present
+    counts[4] = 0
+    return counts
+
+
+def _kl(values: NDArray[numpy.float64], middle: NDArray[numpy.float64]) -> float:
+    present = values > 0
+    ratios = values[present] / middle[present]
+    return float(numpy.sum(values[present] * numpy.log2(ratios)))
+
+
+def _jensen_shannon(
+    first: NDArray[numpy.float64],
+    second: NDArray[numpy.float64],
+) -> float:
+    middle = (first + second) / 2
+    return (_kl(first, middle) + _kl(second, middle)) / 2
+
+
+def _cosine(first: NDArray[numpy.int64], second: NDArray[numpy.int64]) -> float:
+    norms = numpy.linalg.norm(first) * numpy.linalg.norm(second)
+    return float(first @ second / norms)
+
+
+async def _build(builds: list[int]) -> int:
+    builds.append(1)
+    await asyncio.sleep(0)
+    return len(builds)
+
+
+async def _fail() -> int:
+    raise RuntimeError("boom")
+
+
+def test_similarities_match_direct_formulas() -> None:
+    """Cosine and Jensen-Shannon agree with their textbook definitions."""
+    counts = _counts()
+    index = CountrySimilarity(COUNTRIES, CATEGORIES, counts)
+    known = counts[:4]
+    shares = known / known.sum(axis=1, keepdims=True)
+
+    cosine = index.similarities("CN", "cosine")
+    jensen_shannon = index.similarities("CN", "jensen_shannon")
+    assert cosine is not None
+    assert jensen_shannon is not None
+
+    for code in range(4):
+        expected = _cosine(counts[code], counts[1])
+        divergence = _jensen_shannon(shares[code], shares[1])
+        assert cosine[code] == pytest.approx(expected, abs=1e-6)
+        assert jensen_shannon[code] == pytest.approx(1 - divergence, abs=1e-9)
+    assert index.similarities("XX", "cosine") is None
+
+
+def test_most_similar_excludes_the_country() -> None:
+    """The query country is left out and results are ordered."""
+    index = CountrySimilarity(COUNTRIES, CATEGORIES, _counts())
+
+    result = index.most_similar("US", 10, "jensen_shannon")
+    assert result is not None
+
+    names = [name for name, _ in result]
+    values = [value for _, value in result]
+    assert "US" not in names
+    assert len(result) == 3
+    assert values == sorted(values, reverse=True)
+
+
+@pytest.mark.anyio
+async def test_index_cache_shares_builds() -> None:
+    """Concurrent gets share one build, failures and old keys are dropped."""
+    cache = IndexCache(maxsize=2, ttl=60)
+    builds: list[int] = []
+    build = functools.partial(_build, builds)
+
+    first = cache.get("a", build)
+    second = cache.get("a", build)
+    shared = await asyncio.gather(first, second)
+    assert list(shared) == [1, 1]
+    with pytest.raises(RuntimeError):
+        await cache.get("b", _fail)
+    await cache.get("c", build)
+    await cache.get("d", build)
+
+    assert len(builds) == 3
+    assert len(cache) == 2
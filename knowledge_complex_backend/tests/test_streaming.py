@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import aiomysql
+import pytest
+
+from knowledge_complex_backend.db.query_builder import AggregateQuery
+from knowledge_complex_backend.db.streaming import chunk_size_for, stream_rows
+from knowledge_complex_backend.settings import settings
+from knowledge_complex_backend.tests.conftest import FakePool
+
+
+@pytest.mark.anyio
+async def test_rows_are_read_in_chunks() -> None:
+    """Rows come from an SSCursor, chunk by chunk, and the cursor is closed."""
+    rows = [("US", "2000", Decimal(3)) for _ in range(5)]
+    pool = FakePool(rows=[*rows, ("CN", "2001", 4)])
+
+    query = AggregateQuery("t", group_by=["country", "year"])
+    async with query.chunks(pool, chunk_size=4) as rows_chunks:
+        chunks = [chunk async for chunk in rows_chunks]
+
+    cursor = pool.cursors[0]
+    assert cursor.conn.cursor_class is aiomysql.SSCursor
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    assert chunks[0][0] == ("US", "2000", 3)
+    assert isinstance(chunks[0][0][-1], int)
+    assert (cursor.fetches, cursor.closed) == ([4, 4, 4], True)
+
+
+@pytest.mark.anyio
+async def test_leaving_early_releases_the_connection() -> None:
+    """The cursor is closed and the connection released on break."""
+    pool = FakePool(rows=[(index,) for index in range(10)])
+
+    async with stream_rows(pool, "SELECT 1", None, chunk_size=3) as chunks:
+        async for rows in chunks:
+            assert rows == [(0,), (1,), (2,)]
+            break
+        assert pool.acquired == 1
+
+    cursor = pool.cursors[0]
+    assert cursor.closed
+    assert pool.acquired == 0
+    assert len(cursor.rows) == 7
+
+
+@pytest.mark.anyio
+async def test_errors_release_the_connection() -> None:
+    """
+    The cursor is closed and the connection released on error.
+
+    :raises ZeroDivisionError: while the rows are read.
+    """
+    pool = FakePool(rows=[(index,) for index in range(10)])
+
+    with pytest.raises(ZeroDivisionError):
+        async with stream_rows(pool, "SELECT 1", None, chunk_size=3) as chunks:
+            await anext(chunks)
+            raise ZeroDivisionError
+
+    assert pool.cursors[0].closed
+    assert pool.acquired == 0
+
+
+def test_chunk_size_per_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Queries without their own chunk size use the default one."""
+    monkeypatch.setattr(settings, "db_stream_chunk_size", 100)
+    monkeypatch.setattr(settings, "db_stream_chunk_sizes", {"subject_pci": 7})
+
+    assert chunk_size_for("subject_pci") == 7
+    assert chunk_size_for("paper_trend") == 100
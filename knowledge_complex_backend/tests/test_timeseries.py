@@ -0,0 +1,100 @@
+from typing import Any
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+from knowledge_complex_backend.db.dao.complexity_dao import ComplexityDAO
+from knowledge_complex_backend.db.github_rank import MISSING_RANK
+from knowledge_complex_backend.db.timeseries import TimeWindow
+
+ECI = {
+    "legend": ["US", "CN"],
+    "year": [2010, 2011, 2012, 2013, 2014, 2015, 2016],
+    "rank": [
+        [1, 1, 2, 2, 1, 1, 1],
+        [2, 2, 1, MISSING_RANK, 2, 2, 2],
+    ],
+    "data": [
+        [1.0, 1.0, 0.5, 0.5, 1.0, 0.5, 0.5],
+        [0.5, 0.5, 1.0, 0, 0.5, 1.0, 0],
+    ],
+}
+
+TREND = {
+    "legend": ["A", "B"],
+    "data": [
+        [2010, 2011, 2012, 2013],
+        [1, 2, 3, 4],
+        [0, 5, 0, 5],
+    ],
+}
+
+
+def test_yearly_window_slices_without_reranking() -> None:
+    """A yearly window keeps the stored values and ranks of its years."""
+    result = TimeWindow(2012, 2013).apply_ranked(ECI, index=True)
+
+    assert result["year"] == [2012, 2013]
+    assert result["rank"] == [[2, 2], [1, MISSING_RANK]]
+    assert result["data"] == [[0.5, 0.5], [1.0, 0]]
+    assert TimeWindow().apply_ranked(ECI, index=True) is ECI
+
+
+def test_five_year_bins_rerank_mean_indices() -> None:
+    """Indices are averaged over the years they exist, then ranked again."""
+    result = TimeWindow(2011, None, "5-year").apply_ranked(ECI, index=True)
+
+    assert result["year"] == ["2011-2015", "2016-2016"]
+    assert result["data"] == [[0.7, 0.5], [0.75, 0]]
+    assert result["rank"] == [[2, 1], [1, 2]]
+
+
+def test_trend_aggregations() -> None:
+    """Counts are summed per bin or accumulated, indices can not accumulate."""
+    assert TimeWindow(2011, 2013, "cumulative").apply_trend(TREND)["data"] == [
+        [2011, 2012, 2013],
+        [2, 5, 9],
+        [5, 5, 10],
+    ]
+    assert TimeWindow(None, None, "5-year").apply_trend(TREND)["data"] == [
+        ["2010-2013"],
+        [10],
+        [10],
+    ]
+    with pytest.raises(ValueError):
+        TimeWindow(aggregation="cumulative").apply_ranked(ECI, index=True)
+
+
+class FakeComplexityDAO:
+    """Serves a fixed ECI response."""
+
+    async def country_eci(self) -> dict[str, Any]:
+        """
+        Fixed response.
+
+        :return: ECI response.
+        """
+        return ECI
+
+
+@pytest.mark.anyio
+async def test_country_eci_window(fastapi_app: FastAPI, client: AsyncClient) -> None:
+    """
+    The window comes from the query string and is validated.
+
+    :param fastapi_app: current application.
+    :param client: client for the app.
+    """
+    fastapi_app.dependency_overrides[ComplexityDAO] = FakeComplexityDAO
+    url = fastapi_app.url_path_for("country_eci")
+
+    response = await client.get(url, params={"start_year": 2015})
+    cumulative = await client.get(url, params={"aggregation": "cumulative"})
+    inverted = await client.get(url, params={"start_year": 2015, "end_year": 2012})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["year"] == [2015, 2016]
+    assert cumulative.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert inverted.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
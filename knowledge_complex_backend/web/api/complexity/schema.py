@@ -1,6 +1,12 @@
-from typing import Optional
+from typing import Annotated, Any, Literal, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, root_validator
+
+from knowledge_complex_backend.db.timeseries import TimeWindow
+
+# years of the paper counts
+FIRST_YEAR = 1980
+LAST_YEAR = 2022
 
 
 class PaperIngredientDTO(BaseModel):
@@ -21,7 +27,41 @@ class SubjectIngredientDTO(BaseModel):
     years: Optional[list[int]]
 
 
-class PaperIngredientTrendDTO(BaseModel):
+class TimeWindowDTO(BaseModel):
+    """Optional year window and aggregation of a yearly response."""
+
+    start_year: Optional[int]
+    end_year: Optional[int]
+    aggregation: Literal["yearly", "5-year", "cumulative"] = "yearly"
+
+    @root_validator(skip_on_failure=True)
+    def check_window(cls, values: dict[str, Any]) -> dict[str, Any]:  # noqa: N805
+        """
+        Refuse windows ending before they start.
+
+        :param values: validated fields.
+        :raises ValueError: when start_year is after end_year.
+        :return: the fields.
+        """
+        start_year, end_year = values.get("start_year"), values.get("end_year")
+        if start_year is not None and end_year is not None and start_year > end_year:
+            raise ValueError("start_year is after end_year")
+        return values
+
+    def window(self) -> TimeWindow:
+        """
+        Window of the request.
+
+        :return: time window.
+        """
+        return TimeWindow(self.start_year, self.end_year, self.aggregation)
+
+
+# fields of TimeWindowDTO, not passed to the DAO
+WINDOW_FIELDS = frozenset(TimeWindowDTO.__fields__)
+
+
+class PaperIngredientTrendDTO(TimeWindowDTO):
     """DTO for paper ingredient values."""
 
     mode: str  # national_academic_disciplines, national_between_countries
@@ -38,7 +78,7 @@ class PaperIngredientTrendDTO(BaseModel):
         }
 
 
-class SubjectIngredientTrendDTO(BaseModel):
+class SubjectIngredientTrendDTO(TimeWindowDTO):
     """DTO for Subject ingredient values."""
 
     mode: str  # national_academic_disciplines, national_between_countries
@@ -64,7 +104,7 @@ class PatentIngredientDTO(BaseModel):
     year: Optional[int]
 
 
-class PatentIngredientTrendDTO(BaseModel):
+class PatentIngredientTrendDTO(TimeWindowDTO):
     """DTO patent ingredient values."""
 
     mode: str  # national_ipc, national_between_countries
@@ -79,3 +119,115 @@ class PatentIngredientTrendDTO(BaseModel):
                 "countries": ["US", "CN"],
             },
         }
+
+
+class ComplexityIndexDTO(BaseModel):
+    """DTO for ECI / PCI computed over a year window."""
+
+    dataset: Literal["paper", "patent"] = "paper"
+    start_year: int = Field(..., ge=FIRST_YEAR, le=LAST_YEAR)
+    end_year: int = Field(..., ge=FIRST_YEAR, le=LAST_YEAR)
+    # subset of level 2 categories (or IPC prefixes), all of them by default
+    categories: Optional[list[str]] = Field(None, min_items=2)
+    method: Literal["eigenvector", "reflections"] = "eigenvector"
+    # even number of reflections
+    iterations: int = Field(18, ge=2, le=100, multiple_of=2)  # noqa: WPS432
+
+    @root_validator(skip_on_failure=True)
+    def check_window(cls, values: dict[str, Any]) -> dict[str, Any]:  # noqa: N805
+        """
+        Refuse windows ending before they start.
+
+        :param values: validated fields.
+        :raises ValueError: when start_year is after end_year.
+        :return: the fields.
+        """
+        if values["start_year"] > values["end_year"]:
+            raise ValueError("start_year is after end_year")
+        return values
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "dataset": "paper",
+                "start_year": 2010,
+                "end_year": 2020,
+                "method": "eigenvector",
+            },
+        }
+
+
+class PaperIngredientQuery(PaperIngredientDTO):
+    """Paper ingredient query of a batch."""
+
+    kind: Literal["paper_ingredient"]
+
+
+class PaperIngredientTrendQuery(PaperIngredientTrendDTO):
+    """Paper ingredient trend query of a batch."""
+
+    kind: Literal["paper_ingredient_trend"]
+
+
+class SubjectIngredientQuery(SubjectIngredientDTO):
+    """Subject ingredient query of a batch."""
+
+    kind: Literal["subject_ingredient"]
+
+
+class SubjectIngredientTrendQuery(SubjectIngredientTrendDTO):
+    """Subject ingredient trend query of a batch."""
+
+    kind: Literal["subject_ingredient_trend"]
+
+
+class PatentIngredientQuery(PatentIngredientDTO):
+    """Patent ingredient query of a batch."""
+
+    kind: Literal["patent_ingredient"]
+
+
+class PatentIngredientTrendQuery(PatentIngredientTrendDTO):
+    """Patent ingredient trend query of a batch."""
+
+    kind: Literal["patent_ingredient_trend"]
+
+
+BatchQuery = Annotated[
+    Union[
+        PaperIngredientQuery,
+        PaperIngredientTrendQuery,
+        SubjectIngredientQuery,
+        SubjectIngredientTrendQuery,
+        PatentIngredientQuery,
+        PatentIngredientTrendQuery,
+    ],
+    Field(discriminator="kind"),
+]
+
+
+class BatchDTO(BaseModel):
+    """DTO for several ingredient queries answered at once."""
+
+    queries: list[BatchQuery] = Field(..., min_items=1, max_items=100)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "queries": [
+                    {
+                        "kind": "paper_ingredient_trend",
+                        "mode": "national_academic_disciplines",
+                        "flow": "paper",
+                        "countries": ["US", "CN"],
+                    },
+                    {
+                        "kind": "patent_ingredient",
+                        "mode": "national_ipc",
+                        "flow": "patent",
+                        "countries": ["US"],
+                        "year": 2019,
+                    },
+                ],
+            },
+        }
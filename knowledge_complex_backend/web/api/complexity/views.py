@@ -1,18 +1,93 @@
-from fastapi import APIRouter
+import asyncio
+import functools
+import json
+import logging
+from typing import Any, Awaitable, Callable, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
 from fastapi.param_functions import Depends
 
 from knowledge_complex_backend.db.dao.complexity_dao import ComplexityDAO
-from knowledge_complex_backend.web.api.complexity.schema import (
+from knowledge_complex_backend.db.dependencies import pool_group
+from knowledge_complex_backend.db.timeseries import TimeWindow
+from knowledge_complex_backend.services.cache import canonical_arguments
+from knowledge_complex_backend.settings import settings
+from knowledge_complex_backend.web.api.complexity.schema import (  # noqa: WPS235
+    FIRST_YEAR,
+    LAST_YEAR,
+    WINDOW_FIELDS,
+    BatchDTO,
+    ComplexityIndexDTO,
     PaperIngredientDTO,
     PaperIngredientTrendDTO,
     PatentIngredientDTO,
     PatentIngredientTrendDTO,
     SubjectIngredientDTO,
     SubjectIngredientTrendDTO,
+    TimeWindowDTO,
 )
 
 router = APIRouter()
 
+# the trend scans and batches get a connection budget of their own,
+# so they can not starve the ECI/PCI endpoints
+TREND_POOL = [Depends(pool_group("trend"))]
+BATCH_POOL = [Depends(pool_group("batch"))]
+
+# neighbours returned by /related, by default and at most
+RELATED_LIMIT = 20
+RELATED_MAX_LIMIT = 500
+
+# /similar_countries: default window start, neighbours by default and at most
+SIMILAR_START_YEAR = 2010
+SIMILAR_LIMIT = 10
+SIMILAR_MAX_LIMIT = 300
+
+# batch query key -> its running query
+Pending = dict[str, Awaitable[Any]]
+
+# batch query kind -> ComplexityDAO method answering it
+BATCH_METHODS = {
+    "paper_ingredient": "paper_ingredient",
+    "paper_ingredient_trend": "country_academic_trend",
+    "subject_ingredient": "subject_ingredient",
+    "subject_ingredient_trend": "subject_academic_trend",
+    "patent_ingredient": "patent_ingredient",
+    "patent_ingredient_trend": "country_ipc_trend",
+}
+
+
+def time_window(
+    start_year: Optional[int] = None,
+    end_year: Optional[int] = None,
+    aggregation: Literal["yearly", "5-year", "cumulative"] = "yearly",
+) -> TimeWindow:
+    """
+    Year window of a yearly response, from the query string.
+
+    :param start_year: first year, unbounded by default.
+    :param end_year: last year, unbounded by default.
+    :param aggregation: yearly, 5-year or cumulative.
+    :raises HTTPException: when the window is empty.
+    :returns: the window, the full range by default.
+    """
+    if start_year is not None and end_year is not None and start_year > end_year:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="start_year is after end_year",
+        )
+    return TimeWindow(start_year, end_year, aggregation)
+
+
+def _indices(window: TimeWindow, result: Any) -> Any:
+    try:
+        return window.apply_ranked(result, index=True)
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+
 
 @router.get("/test")
 async def test(
@@ -28,13 +103,22 @@ async def test(
 
 @router.get("/number_of_papers_per_year_by_country_dx")
 async def number_of_papers_per_year_by_country_dx(
-    flow="paper",
+    flow: str = "paper",
+    window: TimeWindow = Depends(time_window),
     complex_dao: ComplexityDAO = Depends(),
 ) -> None:
     """
     flow in str elem: release, import, export
+
+    :param flow: release, import or export.
+    :param window: year window and aggregation of the response.
+    :param complex_dao: complexity DAO.
+    :returns: papers per year of every country, with their rank.
     """
-    return await complex_dao.number_of_papers_per_year_by_country_dx(flow)
+    return window.apply_ranked(
+        await complex_dao.number_of_papers_per_year_by_country_dx(flow),
+        index=False,
+    )
 
 
 @router.post("/paper_ingredient")
@@ -55,48 +139,56 @@ async def subject_ingredient_country_to_country(
 
 @router.get("/country_eci")
 async def country_eci(
+    window: TimeWindow = Depends(time_window),
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.country_eci()
+    return _indices(window, await complex_dao.country_eci())
 
 
 @router.get("/subject_pci")
 async def subject_pci(
+    window: TimeWindow = Depends(time_window),
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.subject_pci()
+    return _indices(window, await complex_dao.subject_pci())
 
 
-@router.post("/paper_ingredient_trend")
+@router.post("/paper_ingredient_trend", dependencies=TREND_POOL)
 async def paper_ingredient_country_to_country_trend(
     dto: PaperIngredientTrendDTO,
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.country_academic_trend(**dto.dict())
+    return dto.window().apply_trend(
+        await complex_dao.country_academic_trend(**dto.dict(exclude=WINDOW_FIELDS)),
+    )
 
 
-@router.post("/subject_ingredient_trend")
+@router.post("/subject_ingredient_trend", dependencies=TREND_POOL)
 async def subject_ingredient_country_to_country_trend(
     dto: SubjectIngredientTrendDTO,
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.subject_academic_trend(**dto.dict())
+    return dto.window().apply_trend(
+        await complex_dao.subject_academic_trend(**dto.dict(exclude=WINDOW_FIELDS)),
+    )
 
 
 @router.get("/github_country_eci")
 async def github_country_eci(
     filter_cat: int,
+    window: TimeWindow = Depends(time_window),
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.github_country_eci(filter_cat)
+    return _indices(window, await complex_dao.github_country_eci(filter_cat))
 
 
 @router.get("/github_tag_pci")
 async def github_tag_pci(
     filter_cat: int,
+    window: TimeWindow = Depends(time_window),
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.github_tag_pci(filter_cat)
+    return _indices(window, await complex_dao.github_tag_pci(filter_cat))
 
 
 @router.post("/patent_ingredient")
@@ -107,9 +199,213 @@ async def patent_ingredient_country_to_country(
     return await complex_dao.patent_ingredient(**dto.dict())
 
 
-@router.post("/patent_ingredient_trend")
+@router.post("/patent_ingredient_trend", dependencies=TREND_POOL)
 async def patent_ingredient_country_to_country_trend(
     dto: PatentIngredientTrendDTO,
     complex_dao: ComplexityDAO = Depends(),
 ):
-    return await complex_dao.country_ipc_trend(**dto.dict())
+    return dto.window().apply_trend(
+        await complex_dao.country_ipc_trend(**dto.dict(exclude=WINDOW_FIELDS)),
+    )
+
+
+@router.post("/complexity_index", dependencies=TREND_POOL)
+async def complexity_index(
+    dto: ComplexityIndexDTO,
+    complex_dao: ComplexityDAO = Depends(),
+) -> dict[str, Any]:
+    """
+    ECI and PCI computed from the country × category counts of a year window.
+
+    :param dto: year window, categories and method.
+    :param complex_dao: DAO computing the indices.
+    :returns: countries and categories with their index, highest first.
+    """
+    return await complex_dao.complexity_index(**dto.dict())
+
+
+@router.get("/related")
+async def related(
+    node: str,
+    kind: Literal["category", "country"] = "category",
+    dataset: Literal["paper", "patent"] = "paper",
+    limit: int = Query(RELATED_LIMIT, ge=1, le=RELATED_MAX_LIMIT, alias="k"),
+    complex_dao: ComplexityDAO = Depends(),
+) -> list[dict[str, Any]]:
+    """
+    Product space neighbours of a category or a country.
+
+    For a category, the categories with the highest proximity; for a
+    country, the categories it is not specialized in with the highest
+    relatedness density.
+
+    :param node: category or country label.
+    :param kind: kind of ``node``.
+    :param dataset: counts the product space is built from.
+    :param limit: number of neighbours, the ``k`` query parameter.
+    :param complex_dao: DAO holding the product spaces.
+    :raises HTTPException: for an unknown node.
+    :returns: names with their proximity or density, highest first.
+    """
+    result = await complex_dao.related(dataset, kind, node, limit)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"unknown {kind} {node}",
+        )
+    return result
+
+
+@router.get("/similar_countries", dependencies=TREND_POOL)
+async def similar_countries(  # noqa: WPS211
+    country: str,
+    flow: Literal["paper", "export", "import"] = "paper",
+    start_year: int = Query(
+        SIMILAR_START_YEAR,
+        ge=FIRST_YEAR,
+        le=LAST_YEAR,
+    ),
+    end_year: int = Query(
+        LAST_YEAR,
+        ge=FIRST_YEAR,
+        le=LAST_YEAR,
+    ),
+    metric: Literal["cosine", "jensen_shannon"] = "cosine",
+    limit: int = Query(SIMILAR_LIMIT, ge=1, le=SIMILAR_MAX_LIMIT, alias="k"),
+    complex_dao: ComplexityDAO = Depends(),
+) -> list[Any]:
+    """
+    Countries whose research profile is closest to ``country``.
+
+    Profiles are the category counts of a flow over a year window.
+
+    :param country: country.
+    :param flow: paper, export or import.
+    :param start_year: first year of the window.
+    :param end_year: last year of the window.
+    :param metric: cosine or jensen_shannon.
+    :param limit: number of countries, the ``k`` query parameter.
+    :param complex_dao: complexity DAO.
+    :raises HTTPException: for a reversed window or an unknown country.
+    :returns: countries with their similarity, most similar first.
+    """
+    if start_year > end_year:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="start_year is after end_year",
+        )
+    result = await complex_dao.similar_countries(
+        country,
+        flow,
+        start_year,
+        end_year,
+        metric,
+        limit,
+    )
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"unknown country {country}",
+        )
+    return result
+
+
+async def _limited(
+    semaphore: asyncio.Semaphore,
+    query: Callable[[], Awaitable[Any]],
+) -> Any:
+    async with semaphore:
+        return await query()
+
+
+def _batch_error(error: Exception) -> dict[str, Any]:
+    if isinstance(error, HTTPException):
+        return {"error": {"status": error.status_code, "detail": error.detail}}
+    return {"error": {"status": 500, "detail": "query failed"}}
+
+
+def _plan_batch(
+    complex_dao: ComplexityDAO,
+    queries: list[Any],
+    semaphore: asyncio.Semaphore,
+) -> tuple[Pending, list[str]]:
+    pending: Pending = {}
+    keys = []
+    for query in queries:
+        key, call = _bind(complex_dao, query)
+        keys.append(key)
+        if key not in pending:
+            pending[key] = _limited(semaphore, call)
+    return pending, keys
+
+
+def _bind(complex_dao: ComplexityDAO, query: Any) -> tuple[str, Callable[[], Any]]:
+    method = getattr(complex_dao, BATCH_METHODS[query.kind])
+    params = query.dict(exclude={"kind", *WINDOW_FIELDS})
+    key = json.dumps(
+        [query.kind, canonical_arguments(method, (), params)],
+        sort_keys=True,
+    )
+    return key, functools.partial(method, **params)
+
+
+async def _gather_batch(pending: Pending) -> tuple[dict[str, Any], set[str]]:
+    outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+    settled = dict(zip(pending, outcomes))
+    failed = {key for key in settled if isinstance(settled[key], Exception)}
+    return {key: _settle(key, settled[key]) for key in settled}, failed
+
+
+def _settle(key: str, outcome: Any) -> Any:
+    if isinstance(outcome, Exception):
+        logging.error(
+            "batch query %s failed",  # noqa: WPS323
+            key,
+            exc_info=outcome,
+        )
+        return _batch_error(outcome)
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+def _answers(
+    queries: list[Any],
+    keys: list[str],
+    results: dict[str, Any],
+    failed: set[str],
+) -> list[Any]:
+    return [
+        # trend queries carry a window over their {"legend", "data"} response
+        query.window().apply_trend(results[key])
+        if isinstance(query, TimeWindowDTO) and key not in failed
+        else results[key]
+        for query, key in zip(queries, keys)
+    ]
+
+
+@router.post("/batch", dependencies=BATCH_POOL)
+async def batch(
+    dto: BatchDTO,
+    complex_dao: ComplexityDAO = Depends(),
+) -> list[Any]:
+    """
+    Answers several ingredient queries in one request.
+
+    Identical queries are run once, the others run concurrently,
+    ``batch_concurrency`` at a time. Each query takes its own connection
+    from the pool, within the budget of the batch group.
+    Trend queries differing only by their year window share one query.
+
+    A failing query does not fail the batch: its entry is
+    ``{"error": {"status", "detail"}}`` and the other queries keep their
+    results.
+
+    :param dto: queries of the batch.
+    :param complex_dao: DAO answering the queries.
+    :returns: one result per query, in order.
+    """
+    semaphore = asyncio.Semaphore(settings.batch_concurrency)
+    pending, keys = _plan_batch(complex_dao, dto.queries, semaphore)
+    results, failed = await _gather_batch(pending)
+    return _answers(dto.queries, keys, results, failed)
@@ -1,7 +1,8 @@
 import json
 import logging
+from typing import Any, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from fastapi.param_functions import Depends
 
 from knowledge_complex_backend.db.dao.gpc_dao import GpcDAO
@@ -10,6 +11,9 @@ from knowledge_complex_backend.db.dao.gpc_dao import GpcDAO
 
 router = APIRouter()
 
+# pages of /distance_matrix at most, the matrix grows with their square
+DISTANCE_MATRIX_MAX_IDS = 500
+
 
 @router.get("/test")
 async def test(
@@ -30,17 +34,37 @@ async def suggestion(
 
 
 @router.get("/last_token")
-async def last_token(
+async def last_token(  # noqa: WPS211
     token: str = "",
     tokenID: int = 0,
     distanceStart: float = 0,
     distanceEnd: float = 1,
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    count: bool = False,
     gpc_dao: GpcDAO = Depends(),
 ):
-    """搜索最近的 token"""
-
+    """
+    搜索最近的 token, 按距离排序.
+
+    :param token: token 的标题.
+    :param tokenID: token 的 page id.
+    :param distanceStart: 最小距离.
+    :param distanceEnd: 最大距离.
+    :param limit: 每页的 token 数, 默认不分页.
+    :param offset: 跳过的 token 数.
+    :param count: 只返回数量.
+    :param gpc_dao: GPC DAO.
+    :return: token 列表, count 时为 {"count": 数量}.
+    """
     return await gpc_dao.get_last_token_by_page_id(
-        token, tokenID, distanceStart, distanceEnd
+        token,
+        tokenID,
+        distanceStart,
+        distanceEnd,
+        limit,
+        offset,
+        count,
     )
 
 
@@ -55,19 +79,70 @@ async def two_token(
 
 
 @router.get("/abxy_token")
-async def abxy_token(
+async def abxy_token(  # noqa: WPS211
     token_a: str = "",
     token_b: str = "",
     token_x: str = "",
     floatRange: float = 0.1,
+    limit: Optional[int] = Query(None, ge=1),
     gpc_dao: GpcDAO = Depends(),
 ):
-
-    return await gpc_dao.get_abxy_token_by_page_id_v2(
-        token_a, token_b, token_x, floatRange
+    """
+    A:B::X:Y, 按偏差从小到大返回 Y.
+
+    :param token_a: A 的 page id.
+    :param token_b: B 的 page id.
+    :param token_x: X 的 page id.
+    :param floatRange: Y 到 B, X 的距离与 d2, d1 的最大偏差.
+    :param limit: 最多返回的 Y 数, 默认全部返回.
+    :param gpc_dao: GPC DAO.
+    :return: d1, d2 和 Y 列表.
+    """
+    return await gpc_dao.get_abxy_token_by_page_id_v3(
+        token_a,
+        token_b,
+        token_x,
+        floatRange,
+        limit,
     )
 
 
+@router.get("/distance_matrix")
+async def distance_matrix(
+    ids: list[int] = Query(..., min_items=1, max_items=DISTANCE_MATRIX_MAX_IDS),
+    gpc_dao: GpcDAO = Depends(),
+) -> dict[str, Any]:
+    """
+    一组 page 两两之间的距离矩阵, 没有关系时为 1, 按 id 排序.
+
+    :param ids: page ids.
+    :param gpc_dao: GPC DAO.
+    :return: 排序去重的 page ids 和距离矩阵.
+    """
+    return await gpc_dao.get_distance_matrix(ids)
+
+
+@router.get("/nearest_in_set")
+async def nearest_in_set(
+    token_id: int = Query(..., alias="tokenID"),
+    ids: list[int] = Query(..., min_items=1, max_items=1000),
+    zh: bool = False,
+    gpc_dao: GpcDAO = Depends(),
+) -> list[dict[str, Any]]:
+    """
+    Ids 中与 tokenID 最近的 token, 按距离从小到大排序.
+
+    不存在的 token 标题和距离为 None.
+
+    :param token_id: token 的 page id.
+    :param ids: 候选 token 的 page ids.
+    :param zh: 优先返回中文标题.
+    :param gpc_dao: GPC DAO.
+    :return: 候选 token 的 id, 标题和距离.
+    """
+    return await gpc_dao.get_nearest_in_set(token_id, ids, zh)
+
+
 # @router.get("/number_of_papers_per_year_by_country_dx")
 # async def number_of_papers_per_year_by_country_dx(
 #     flow = "paper",
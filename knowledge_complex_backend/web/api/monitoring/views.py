@@ -1,4 +1,11 @@
-from fastapi import APIRouter
+import os
+from typing import Any
+
+from fastapi import APIRouter, Request
+
+from knowledge_complex_backend.db.pool import ManagedPool
+from knowledge_complex_backend.db.routing import RoutingPool
+from knowledge_complex_backend.services.cache import TwoTierBackend, cache_stats
 
 router = APIRouter()
 
@@ -10,3 +17,65 @@ def health_check() -> None:
 
     It returns 200 if the project is healthy.
     """
+
+
+@router.get("/cache_stats")
+def get_cache_stats(request: Request) -> dict[str, Any]:
+    """
+    Cache counters of the worker serving the request.
+
+    ``executed`` counts the misses that ran the query, ``coalesced`` the
+    misses that awaited a query already running in this worker and
+    ``remote_hit`` the ones that waited for another worker. ``local`` holds
+    the counters and size of the in-process tier when it is enabled.
+
+    :param request: current request.
+    :returns: counters and the pid of the worker.
+    """
+    stats: dict[str, Any] = {"pid": os.getpid(), **cache_stats}
+    backend = getattr(request.app.state, "cache_backend", None)
+    if isinstance(backend, TwoTierBackend):
+        stats["local"] = {
+            "keys": len(backend),
+            "bytes": backend.size,
+            **backend.stats,
+        }
+    return stats
+
+
+@router.get("/cache_warmer")
+async def get_cache_warmer(request: Request) -> list[dict[str, Any]]:
+    """
+    Entries kept warm by the cache warmer.
+
+    :param request: current request.
+    :returns: last refresh and current TTL of every entry,
+        empty when the warmer is disabled.
+    """
+    warmer = getattr(request.app.state, "cache_warmer", None)
+    if warmer is None:
+        return []
+    return await warmer.report()
+
+
+@router.get("/db_pool")
+def get_db_pool_stats(request: Request) -> dict[str, Any]:
+    """
+    Gauges of the MySQL pool and per route group metrics of the worker.
+
+    ``acquire_wait`` is the time spent waiting for a connection, within
+    the budget of the group, ``query_time`` the time of ``execute``.
+
+    :param request: current request.
+    :returns: pool sizes and the metrics of every group, under ``read``
+        the same for the replica pool with the state of every replica,
+        empty when the pool is not managed.
+    """
+    pool = getattr(request.app.state, "mysql_pool", None)
+    if not isinstance(pool, ManagedPool):
+        return {}
+    stats = {"pid": os.getpid(), **pool.stats()}
+    read_pool = getattr(request.app.state, "mysql_read_pool", pool)
+    if read_pool is not pool and isinstance(read_pool.pool, RoutingPool):
+        stats["read"] = {**read_pool.stats(), "replicas": read_pool.pool.stats()}
+    return stats